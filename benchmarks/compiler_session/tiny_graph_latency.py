@@ -0,0 +1,90 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Per-compile latency of tiny graphs with and without a `CompilerSession`.
+
+Compiles a small elementwise graph repeatedly through `fx.export_and_import`
+(export excluded: the same `ExportedProgram` is reused) once with a fresh
+context per compile and once through a shared `CompilerSession`.
+
+  python benchmarks/compiler_session/tiny_graph_latency.py --ops 1 8 32
+"""
+
+import argparse
+import time
+
+
+def _make_program(num_ops: int):
+    import torch
+
+    class Chain(torch.nn.Module):
+        def forward(self, x):
+            for _ in range(num_ops):
+                x = torch.tanh(x) + 1.0
+            return x
+
+    return torch.export.export(Chain(), (torch.randn(4, 8),))
+
+
+def _mean_ms(fn, iterations: int) -> float:
+    # Warm up caches shared by both configurations (e.g. torch decompositions).
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1e3 / iterations
+
+
+def main(args: argparse.Namespace):
+    from torch_mlir import fx
+    from torch_mlir.compiler_session import CompilerSession
+
+    print(
+        f"{'ops':>6s} {'output_type':>18s} {'fresh_ms':>10s} "
+        f"{'session_ms':>10s} {'speedup':>8s}"
+    )
+    for num_ops in args.ops:
+        prog = _make_program(num_ops)
+        for output_type in args.output_types:
+            fresh_ms = _mean_ms(
+                lambda: fx.export_and_import(prog, output_type=output_type),
+                args.iterations,
+            )
+            session = CompilerSession()
+            session_ms = _mean_ms(
+                lambda: fx.export_and_import(
+                    prog, output_type=output_type, session=session
+                ),
+                args.iterations,
+            )
+            print(
+                f"{num_ops:>6d} {output_type:>18s} {fresh_ms:>10.2f} "
+                f"{session_ms:>10.2f} {fresh_ms / session_ms:>7.2f}x"
+            )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--ops",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Graph sizes (in elementwise op pairs) to benchmark",
+    )
+    parser.add_argument(
+        "--output-types",
+        nargs="+",
+        default=["torch", "linalg-on-tensors"],
+        help="Output types to lower to",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=50, help="Compiles per configuration"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,87 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Per-stage overhead of the repro snapshot in `run_pipeline_with_repro_report`.
+
+Builds a synthetic torch-dialect module with a chain of elementwise ops and
+compares the cost of snapshotting it by cloning (what
+`run_pipeline_with_repro_report` does) and by printing it (what it used to do)
+with the cost of a cheap pipeline stage run through
+`run_pipeline_with_repro_report`.
+
+  python benchmarks/compiler_utils/repro_snapshot_overhead.py --ops 10000 100000
+"""
+
+import argparse
+import time
+
+
+def _make_module(context, num_ops: int):
+    from torch_mlir import ir
+
+    ty = "!torch.vtensor<[8,128],f32>"
+    lines = [f"func.func @main(%arg0: {ty}) -> {ty} {{"]
+    prev = "%arg0"
+    for i in range(num_ops):
+        lines.append(f"  %{i} = torch.aten.tanh {prev} : {ty} -> {ty}")
+        prev = f"%{i}"
+    lines.append(f"  return {prev} : {ty}")
+    lines.append("}")
+    return ir.Module.parse("\n".join(lines), context=context)
+
+
+def _best_time(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(args: argparse.Namespace):
+    from torch_mlir import ir
+    from torch_mlir.compiler_utils import run_pipeline_with_repro_report
+    from torch_mlir.dialects import torch as torch_d
+
+    print(f"{'ops':>10s} {'clone_s':>10s} {'get_asm_s':>10s} {'stage_s':>10s}")
+    for num_ops in args.ops:
+        context = ir.Context()
+        torch_d.register_dialect(context)
+        module = _make_module(context, num_ops)
+        clone_s = _best_time(lambda: module.operation.clone().erase(), args.repeat)
+        asm_s = _best_time(
+            lambda: module.operation.get_asm(
+                large_elements_limit=10, enable_debug_info=True
+            ),
+            args.repeat,
+        )
+        stage_s = _best_time(
+            lambda: run_pipeline_with_repro_report(
+                module, "builtin.module(symbol-dce)", "benchmark stage"
+            ),
+            args.repeat,
+        )
+        print(f"{num_ops:>10d} {clone_s:>10.3f} {asm_s:>10.3f} {stage_s:>10.3f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--ops",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Module sizes (in ops) to benchmark",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions (best is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
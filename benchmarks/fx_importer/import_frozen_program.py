@@ -0,0 +1,105 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Measures frozen-weight import cost as a function of parameter count.
+
+Each configuration runs in a fresh subprocess so that the reported peak RSS
+(`ru_maxrss`) is attributable to that configuration alone.
+
+  python benchmarks/fx_importer/import_frozen_program.py --params 1e6 1e7 1e8
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+
+
+def _run_single(num_params: int, dtype_name: str):
+    import torch
+    import torch.nn as nn
+
+    from torch_mlir import ir
+    from torch_mlir.dialects import torch as torch_d
+    from torch_mlir.extras.fx_importer import FxImporter
+
+    dtype = getattr(torch, dtype_name)
+    # A stack of square linear layers of width 1024 (~1M parameters each).
+    width = 1024
+    num_layers = max(1, num_params // (width * width))
+
+    class Stack(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.layers = nn.ModuleList(
+                [nn.Linear(width, width, bias=False) for _ in range(num_layers)]
+            )
+
+        def forward(self, x):
+            for layer in self.layers:
+                x = layer(x)
+            return x
+
+    model = Stack().to(dtype)
+    prog = torch.export.export(model, (torch.randn(1, width, dtype=dtype),))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    context = ir.Context()
+    torch_d.register_dialect(context)
+    start = time.perf_counter()
+    FxImporter(context=context).import_frozen_program(prog)
+    elapsed = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    weight_mb = num_layers * width * width * model.layers[0].weight.element_size()
+    weight_mb /= 1024 * 1024
+    # ru_maxrss is reported in KiB on Linux.
+    print(
+        f"{num_layers * width * width:>14,d} {dtype_name:>10s} {weight_mb:>10.1f} "
+        f"{elapsed:>10.3f} {rss_before / 1024:>12.1f} {rss_after / 1024:>12.1f}"
+    )
+
+
+def main(args: argparse.Namespace):
+    if args.single is not None:
+        _run_single(int(args.single), args.dtype)
+        return
+    print(
+        f"{'params':>14s} {'dtype':>10s} {'weights_mb':>10s} "
+        f"{'import_s':>10s} {'rss_pre_mb':>12s} {'rss_peak_mb':>12s}"
+    )
+    sys.stdout.flush()
+    for num_params in args.params:
+        subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                str(int(float(num_params))),
+                "--dtype",
+                args.dtype,
+            ],
+            check=True,
+        )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--params",
+        nargs="+",
+        default=["1e6", "1e7", "1e8"],
+        help="Approximate parameter counts to benchmark",
+    )
+    parser.add_argument(
+        "--dtype", default="float32", help="Torch dtype name of the weights"
+    )
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
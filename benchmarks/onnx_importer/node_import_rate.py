@@ -0,0 +1,77 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Per-node import rate of the ONNX importer on large synthetic graphs.
+
+Builds shape-inferred chains of elementwise nodes (so that every value has
+value_info, as produced by the import tool) and reports the time spent in
+`NodeImporter.import_all` and the resulting nodes per second.
+
+  python benchmarks/onnx_importer/node_import_rate.py --nodes 10000 100000
+"""
+
+import argparse
+import time
+
+
+def _make_chain_model(num_nodes: int):
+    import onnx
+    from onnx import TensorProto
+    from onnx.helper import make_graph, make_model, make_node, make_tensor_value_info
+
+    op_types = ["Relu", "Neg", "Abs", "Sigmoid"]
+    nodes = []
+    prev = "X"
+    for i in range(num_nodes):
+        nodes.append(make_node(op_types[i % len(op_types)], [prev], [f"v{i}"]))
+        prev = f"v{i}"
+    graph = make_graph(
+        nodes,
+        "chain",
+        [make_tensor_value_info("X", TensorProto.FLOAT, [8, 128])],
+        [make_tensor_value_info(prev, TensorProto.FLOAT, [8, 128])],
+    )
+    return onnx.shape_inference.infer_shapes(make_model(graph))
+
+
+def main(args: argparse.Namespace):
+    from torch_mlir.dialects import torch as torch_d
+    from torch_mlir.extras import onnx_importer
+    from torch_mlir.ir import Context
+
+    print(f"{'nodes':>10s} {'import_s':>10s} {'nodes_per_s':>12s}")
+    for num_nodes in args.nodes:
+        model_proto = _make_chain_model(num_nodes)
+        best = None
+        for _ in range(args.repeat):
+            context = Context()
+            torch_d.register_dialect(context)
+            model_info = onnx_importer.ModelInfo(model_proto)
+            m = model_info.create_module(context=context).operation
+            start = time.perf_counter()
+            imp = onnx_importer.NodeImporter.define_function(model_info.main_graph, m)
+            imp.import_all()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{num_nodes:>10d} {best:>10.3f} {num_nodes / best:>12.0f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Graph sizes (in nodes) to benchmark",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions (best is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,116 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Compares textual vs. bytecode output of torch-mlir-import-onnx.
+
+Runs the import tool once per output format in a child process and reports
+wall time, peak RSS of the child and the output size. If no model is given, a
+synthetic model with `--weights-mb` of initializers stored as external data is
+generated.
+
+  python benchmarks/onnx_importer/output_format.py [model.onnx]
+"""
+
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _make_synthetic_model(path: Path, weights_mb: int, num_layers: int):
+    import numpy
+    import onnx
+    from onnx import numpy_helper, TensorProto
+    from onnx.helper import make_graph, make_model, make_node, make_tensor_value_info
+
+    width = int((weights_mb * 1024 * 1024 / 4 / num_layers) ** 0.5)
+    initializers = []
+    nodes = []
+    prev = "X"
+    for i in range(num_layers):
+        w = numpy.random.rand(width, width).astype(numpy.float32)
+        initializers.append(numpy_helper.from_array(w, name=f"W{i}"))
+        nodes.append(make_node("MatMul", [prev, f"W{i}"], [f"Y{i}"]))
+        prev = f"Y{i}"
+    graph = make_graph(
+        nodes,
+        "synthetic",
+        [make_tensor_value_info("X", TensorProto.FLOAT, [1, width])],
+        [make_tensor_value_info(prev, TensorProto.FLOAT, [1, width])],
+        initializers,
+    )
+    onnx.save(
+        make_model(graph),
+        path,
+        save_as_external_data=True,
+        location=path.name + ".data",
+    )
+
+
+def _run(model: Path, output: Path, extra_args):
+    cmd = [
+        sys.executable,
+        "-m",
+        "torch_mlir.tools.import_onnx",
+        str(model),
+        "-o",
+        str(output),
+    ] + extra_args
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"Import failed: {' '.join(cmd)}")
+    # ru_maxrss is reported in KiB on Linux.
+    return elapsed, rusage.ru_maxrss / 1024, output.stat().st_size / (1024 * 1024)
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        model = args.model
+        if model is None:
+            model = temp_dir / "synthetic.onnx"
+            _make_synthetic_model(model, args.weights_mb, args.num_layers)
+        print(
+            f"{'format':>10s} {'wall_s':>10s} {'peak_rss_mb':>12s} {'output_mb':>10s}"
+        )
+        for name, suffix, extra_args in [
+            ("text", ".mlir", []),
+            ("bytecode", ".mlirbc", ["--emit-bytecode"]),
+        ]:
+            elapsed, rss_mb, size_mb = _run(
+                model, temp_dir / f"out{suffix}", extra_args + args.import_args
+            )
+            print(f"{name:>10s} {elapsed:>10.3f} {rss_mb:>12.1f} {size_mb:>10.1f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model", nargs="?", type=Path, help="ONNX model to import")
+    parser.add_argument(
+        "--weights-mb",
+        type=int,
+        default=512,
+        help="Size of the initializers of the synthetic model",
+    )
+    parser.add_argument(
+        "--num-layers", type=int, default=8, help="Layers of the synthetic model"
+    )
+    parser.add_argument(
+        "--import-args",
+        nargs=argparse.REMAINDER,
+        default=[],
+        help="Additional arguments forwarded to the import tool",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
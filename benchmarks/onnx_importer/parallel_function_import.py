@@ -0,0 +1,94 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Scaling of parallel ONNX function expansion import with the worker count.
+
+Generates a synthetic model with `--num-functions` MeanVarianceNormalization
+nodes, each with a distinct input shape (and hence a distinct function
+specialization), imports it with `--num-workers` set to each of the given
+values and checks that the output matches the serial import.
+
+  python benchmarks/onnx_importer/parallel_function_import.py --workers 0 2 4 8
+"""
+
+import argparse
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _make_synthetic_model(path: Path, num_functions: int):
+    import onnx
+    from onnx import TensorProto
+    from onnx.helper import make_graph, make_model, make_node, make_tensor_value_info
+
+    inputs = []
+    outputs = []
+    nodes = []
+    for i in range(num_functions):
+        shape = [1, i + 1, 4, 4]
+        inputs.append(make_tensor_value_info(f"X{i}", TensorProto.FLOAT, shape))
+        outputs.append(make_tensor_value_info(f"Y{i}", TensorProto.FLOAT, shape))
+        nodes.append(make_node("MeanVarianceNormalization", [f"X{i}"], [f"Y{i}"]))
+    graph = make_graph(nodes, "many_functions", inputs, outputs)
+    onnx.save(make_model(graph), path)
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        model = temp_dir / "many_functions.onnx"
+        _make_synthetic_model(model, args.num_functions)
+        reference = None
+        print(f"{'workers':>8s} {'wall_s':>10s} {'speedup':>8s} {'matches':>8s}")
+        for workers in args.workers:
+            output = temp_dir / f"out_{workers}.mlir"
+            start = time.perf_counter()
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "torch_mlir.tools.import_onnx",
+                    str(model),
+                    "-o",
+                    str(output),
+                    "--num-workers",
+                    str(workers),
+                ],
+                check=True,
+            )
+            elapsed = time.perf_counter() - start
+            text = output.read_text()
+            if reference is None:
+                reference = (elapsed, text)
+            print(
+                f"{workers:>8d} {elapsed:>10.3f} {reference[0] / elapsed:>8.2f} "
+                f"{str(text == reference[1]):>8s}"
+            )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--num-functions",
+        type=int,
+        default=256,
+        help="Number of distinct function specializations in the model",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[0, 1, 2, 4, 8],
+        help="Worker counts to benchmark (0 is the serial import, used as"
+        " reference)",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,89 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Per-call overhead of invoking RefBackend functions with numpy vs. tensors.
+
+Compiles a cheap elementwise model with many inputs and measures the median
+time per call through the numpy calling convention (including the
+tensor <-> numpy conversion the e2e configs used to do) and through
+`RefBackendInvoker.invoke_tensors`.
+
+  python benchmarks/refbackend/invocation_overhead.py --inputs 1 8 32
+"""
+
+import argparse
+import statistics
+import time
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(args: argparse.Namespace):
+    import torch
+
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.configs.utils import (
+        recursively_convert_to_numpy,
+        recursively_convert_from_numpy,
+    )
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    class Sum(torch.nn.Module):
+        def forward(self, *xs):
+            return sum(xs)
+
+    print(f"{'inputs':>7s} {'numel':>8s} {'numpy_us':>10s} {'tensor_us':>10s}")
+    backend = RefBackendLinalgOnTensorsBackend()
+    for num_inputs in args.inputs:
+        inputs = [torch.randn(args.numel) for _ in range(num_inputs)]
+        module = fx.export_and_import(Sum(), *inputs, output_type="linalg-on-tensors")
+        invoker = backend.load(backend.compile(module))
+
+        def via_numpy():
+            numpy_inputs = recursively_convert_to_numpy(inputs)
+            return recursively_convert_from_numpy(invoker.main(*numpy_inputs))
+
+        numpy_s = _median_time(via_numpy, args.warmup, args.iterations)
+        tensor_s = _median_time(
+            lambda: invoker.invoke_tensors("main", inputs),
+            args.warmup,
+            args.iterations,
+        )
+        print(
+            f"{num_inputs:>7d} {args.numel:>8d} "
+            f"{numpy_s * 1e6:>10.1f} {tensor_s * 1e6:>10.1f}"
+        )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--inputs",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Numbers of function arguments to benchmark",
+    )
+    parser.add_argument("--numel", type=int, default=16, help="Elements per argument")
+    parser.add_argument("--warmup", type=int, default=10, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=1000, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
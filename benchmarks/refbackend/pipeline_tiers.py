@@ -0,0 +1,123 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime of the RefBackend lowering tiers vs. eager PyTorch.
+
+Compiles small matmul, conv and elementwise models through the FX importer and
+runs them with the default (scalar loops) RefBackend pipeline, the optimized
+(tiled + vectorized) pipeline and, if an OpenMP runtime is given, the parallel
+pipeline. Reports compile time and the median time per invocation.
+
+  python benchmarks/refbackend/pipeline_tiers.py \\
+      --openmp-lib /path/to/llvm/lib/libomp.so
+"""
+
+import argparse
+import statistics
+import time
+
+
+def _make_models():
+    import torch
+    import torch.nn as nn
+
+    class Matmul(nn.Module):
+        def forward(self, a, b):
+            return torch.mm(a, b)
+
+    class Conv(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.conv = nn.Conv2d(32, 32, 3, padding=1)
+
+        def forward(self, x):
+            return self.conv(x)
+
+    class Elementwise(nn.Module):
+        def forward(self, x, y):
+            return torch.tanh(x) * y + x
+
+    return {
+        "matmul": (Matmul(), (torch.randn(256, 256), torch.randn(256, 256))),
+        "conv": (Conv().eval(), (torch.randn(1, 32, 56, 56),)),
+        "elementwise": (Elementwise(), (torch.randn(1024, 1024),) * 2),
+    }
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(args: argparse.Namespace):
+    import torch
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    tiers = {
+        "default": {},
+        "optimized": {"optimize": True},
+    }
+    if args.openmp_lib:
+        tiers["parallel"] = {"parallel": True, "shared_libs": [args.openmp_lib]}
+
+    print(f"{'model':<12s} {'tier':<10s} {'compile_s':>10s} {'run_ms':>10s}")
+    for name, (model, inputs) in _make_models().items():
+        if args.models and name not in args.models:
+            continue
+        with torch.no_grad():
+            eager = _median_time(lambda: model(*inputs), args.warmup, args.iterations)
+        print(f"{name:<12s} {'eager':<10s} {'-':>10s} {eager * 1e3:>10.3f}")
+        np_inputs = [t.numpy() for t in inputs]
+        for tier, options in tiers.items():
+            start = time.perf_counter()
+            module = fx.export_and_import(
+                model, *inputs, output_type="linalg-on-tensors"
+            )
+            backend = RefBackendLinalgOnTensorsBackend(
+                generate_runtime_verification=False,
+                opt_level=args.opt_level,
+                **options,
+            )
+            invoker = backend.load(backend.compile(module))
+            compile_s = time.perf_counter() - start
+            run = _median_time(
+                lambda: invoker.main(*np_inputs), args.warmup, args.iterations
+            )
+            print(f"{name:<12s} {tier:<10s} {compile_s:>10.2f} {run * 1e3:>10.3f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--models",
+        nargs="*",
+        choices=["matmul", "conv", "elementwise"],
+        help="Models to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--openmp-lib",
+        help="Path to the OpenMP runtime library; enables the parallel tier",
+    )
+    parser.add_argument(
+        "--opt-level", type=int, default=3, help="ExecutionEngine opt level"
+    )
+    parser.add_argument("--warmup", type=int, default=2, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=10, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,143 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime and peak memory of `tm_tensor.attention` on the RefBackend.
+
+Compiles `torch.nn.functional.scaled_dot_product_attention` (lowered through
+`tm_tensor.attention`) for each sequence length, checks it against eager
+PyTorch and reports the median time per call and the peak RSS. Each
+configuration runs in a fresh subprocess so that the reported peak RSS
+(`ru_maxrss`) is attributable to that configuration alone. Note that with
+`--mask causal` the conversion to `tm_tensor.attention` materializes the full
+mask, so memory grows quadratically regardless of the lowering.
+
+  python benchmarks/tm_tensor/attention_lowering.py --seq-lens 512 2048 8192 16384
+"""
+
+import argparse
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _run_single(args: argparse.Namespace):
+    import torch
+    import torch.nn.functional as F
+
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    seq_len = args.single
+    shape = (args.heads, seq_len, args.head_dim)
+    query, key, value = (torch.randn(shape) for _ in range(3))
+    inputs = [query, key, value]
+    if args.mask == "bool":
+        inputs.append(torch.rand(args.heads, seq_len, seq_len) > 0.1)
+
+    class Attention(torch.nn.Module):
+        def forward(self, query, key, value, mask=None):
+            return F.scaled_dot_product_attention(
+                query, key, value, attn_mask=mask, is_causal=args.mask == "causal"
+            )
+
+    module = fx.export_and_import(
+        Attention(), *inputs, output_type="linalg-on-tensors", func_name="attention"
+    )
+    backend = RefBackendLinalgOnTensorsBackend()
+    invoker = backend.load(backend.compile(module))
+    # Inputs (and the mask in particular) are not part of the lowering's
+    # footprint.
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    result = invoker.invoke_tensors("attention", inputs)
+    torch.testing.assert_close(result, Attention()(*inputs), rtol=1e-4, atol=1e-4)
+    elapsed = _median_time(
+        lambda: invoker.invoke_tensors("attention", inputs),
+        args.warmup,
+        args.iterations,
+    )
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in KiB on Linux.
+    print(
+        f"{seq_len:>8d} {args.mask:>7s} {elapsed * 1e3:>10.1f} "
+        f"{rss_before / 1024:>12.1f} {rss_after / 1024:>12.1f}"
+    )
+
+
+def main(args: argparse.Namespace):
+    if args.single is not None:
+        _run_single(args)
+        return
+    print(
+        f"{'seq_len':>8s} {'mask':>7s} {'call_ms':>10s} "
+        f"{'rss_pre_mb':>12s} {'rss_peak_mb':>12s}"
+    )
+    sys.stdout.flush()
+    for seq_len in args.seq_lens:
+        subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--single",
+                str(seq_len),
+                "--heads",
+                str(args.heads),
+                "--head-dim",
+                str(args.head_dim),
+                "--mask",
+                args.mask,
+                "--warmup",
+                str(args.warmup),
+                "--iterations",
+                str(args.iterations),
+            ],
+            check=True,
+        )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--seq-lens",
+        type=int,
+        nargs="+",
+        default=[512, 1024, 2048, 4096, 8192, 16384],
+        help="Query and key sequence lengths to benchmark",
+    )
+    parser.add_argument(
+        "--heads", type=int, default=4, help="Batch size times number of heads"
+    )
+    parser.add_argument("--head-dim", type=int, default=64, help="Head dimension")
+    parser.add_argument(
+        "--mask",
+        choices=["none", "bool", "causal"],
+        default="none",
+        help="Attention mask to apply",
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=3, help="Timed runs (median is reported)"
+    )
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
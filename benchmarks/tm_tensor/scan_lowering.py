@@ -0,0 +1,120 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime of `tm_tensor.scan` on the RefBackend lowering tiers.
+
+Compiles `torch.cumsum` (lowered through `tm_tensor.scan`) along the last
+dimension of a (batch, length) input for each scan length and batch size,
+checks it against eager PyTorch and reports the median time per call for the
+default and optimized RefBackend pipelines and, if an OpenMP runtime is given,
+the parallel pipeline. Long scans over small batches use the blocked parallel
+scan lowering; large batches keep the sequential scan of each line.
+
+  python benchmarks/tm_tensor/scan_lowering.py --lengths 4096 1048576 \\
+      --batches 1 8 256 --openmp-lib /path/to/llvm/lib/libomp.so
+"""
+
+import argparse
+import statistics
+import time
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(args: argparse.Namespace):
+    import torch
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    class Cumsum(torch.nn.Module):
+        def forward(self, x):
+            return torch.cumsum(x, dim=-1)
+
+    tiers = {
+        "default": {},
+        "optimized": {"optimize": True},
+    }
+    if args.openmp_lib:
+        tiers["parallel"] = {"parallel": True, "shared_libs": [args.openmp_lib]}
+    dtype = getattr(torch, args.dtype)
+
+    print(f"{'length':>9s} {'batch':>6s} {'tier':<10s} {'run_ms':>10s}")
+    for length in args.lengths:
+        for batch in args.batches:
+            if dtype.is_floating_point:
+                x = torch.randn(batch, length, dtype=dtype)
+            else:
+                x = torch.randint(-100, 100, (batch, length), dtype=dtype)
+            model = Cumsum()
+            expected = model(x)
+            eager = _median_time(lambda: model(x), args.warmup, args.iterations)
+            print(f"{length:>9d} {batch:>6d} {'eager':<10s} {eager * 1e3:>10.3f}")
+            for tier, options in tiers.items():
+                module = fx.export_and_import(
+                    model, x, output_type="linalg-on-tensors", func_name="cumsum"
+                )
+                backend = RefBackendLinalgOnTensorsBackend(
+                    generate_runtime_verification=False, **options
+                )
+                invoker = backend.load(backend.compile(module))
+                result = invoker.invoke_tensors("cumsum", [x])
+                # The blocked scan adds floating-point values in another order.
+                torch.testing.assert_close(
+                    result, expected, rtol=1e-4, atol=1e-3 * length**0.5
+                )
+                run = _median_time(
+                    lambda: invoker.invoke_tensors("cumsum", [x]),
+                    args.warmup,
+                    args.iterations,
+                )
+                print(f"{length:>9d} {batch:>6d} {tier:<10s} {run * 1e3:>10.3f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=[1024, 16384, 262144, 1048576],
+        help="Scan lengths to benchmark",
+    )
+    parser.add_argument(
+        "--batches",
+        type=int,
+        nargs="+",
+        default=[1, 8, 64],
+        help="Batch sizes (number of independent scans) to benchmark",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "int64"],
+        default="float32",
+        help="Element type of the scanned input",
+    )
+    parser.add_argument(
+        "--openmp-lib",
+        help="Path to the OpenMP runtime library; enables the parallel tier",
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=5, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
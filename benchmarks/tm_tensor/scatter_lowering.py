@@ -0,0 +1,135 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime of `tm_tensor.scatter` on the RefBackend lowering tiers.
+
+Compiles large `index_put` (unique indices), accumulating `index_put`
+(repeated indices, as in an embedding backward) and `scatter_add` workloads,
+all lowered through `tm_tensor.scatter`, checks them against eager PyTorch and
+reports the median time per call for the default and optimized RefBackend
+pipelines and, if an OpenMP runtime is given, the parallel pipeline (which is
+the one that runs the scatter loops on multiple threads).
+
+  python benchmarks/tm_tensor/scatter_lowering.py --sizes 65536 1048576 \\
+      --openmp-lib /path/to/llvm/lib/libomp.so
+"""
+
+import argparse
+import statistics
+import time
+
+WORKLOADS = ["index_put", "index_put_accumulate", "scatter_add"]
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _make_workload(name: str, size: int, width: int):
+    import torch
+
+    class IndexPut(torch.nn.Module):
+        def __init__(self, accumulate: bool):
+            super().__init__()
+            self.accumulate = accumulate
+
+        def forward(self, dest, indices, values):
+            return dest.index_put((indices,), values, accumulate=self.accumulate)
+
+    class ScatterAdd(torch.nn.Module):
+        def forward(self, dest, indices, values):
+            return dest.scatter_add(0, indices, values)
+
+    dest = torch.randn(size, width)
+    values = torch.randn(size, width)
+    if name == "index_put":
+        return IndexPut(False), (dest, torch.randperm(size), values)
+    # Repeated indices: on average every destination row gets one update, some
+    # get several.
+    if name == "index_put_accumulate":
+        return IndexPut(True), (dest, torch.randint(0, size, (size,)), values)
+    return ScatterAdd(), (dest, torch.randint(0, size, (size, width)), values)
+
+
+def main(args: argparse.Namespace):
+    import torch
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    tiers = {
+        "default": {},
+        "optimized": {"optimize": True},
+    }
+    if args.openmp_lib:
+        tiers["parallel"] = {"parallel": True, "shared_libs": [args.openmp_lib]}
+
+    print(f"{'workload':<22s} {'size':>9s} {'tier':<10s} {'run_ms':>10s}")
+    for name in args.workloads:
+        for size in args.sizes:
+            model, inputs = _make_workload(name, size, args.width)
+            with torch.no_grad():
+                expected = model(*inputs)
+                eager = _median_time(
+                    lambda: model(*inputs), args.warmup, args.iterations
+                )
+            print(f"{name:<22s} {size:>9d} {'eager':<10s} {eager * 1e3:>10.3f}")
+            for tier, options in tiers.items():
+                module = fx.export_and_import(
+                    model, *inputs, output_type="linalg-on-tensors", func_name=name
+                )
+                backend = RefBackendLinalgOnTensorsBackend(
+                    generate_runtime_verification=False, **options
+                )
+                invoker = backend.load(backend.compile(module))
+                result = invoker.invoke_tensors(name, list(inputs))
+                # Accumulation order differs between tiers (and from eager).
+                torch.testing.assert_close(result, expected, rtol=1e-4, atol=1e-4)
+                run = _median_time(
+                    lambda: invoker.invoke_tensors(name, list(inputs)),
+                    args.warmup,
+                    args.iterations,
+                )
+                print(f"{name:<22s} {size:>9d} {tier:<10s} {run * 1e3:>10.3f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workloads",
+        nargs="+",
+        choices=WORKLOADS,
+        default=WORKLOADS,
+        help="Workloads to benchmark",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1 << 14, 1 << 16, 1 << 18, 1 << 20],
+        help="Number of updated rows (and of destination rows)",
+    )
+    parser.add_argument("--width", type=int, default=16, help="Row width")
+    parser.add_argument(
+        "--openmp-lib",
+        help="Path to the OpenMP runtime library; enables the parallel tier",
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=5, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
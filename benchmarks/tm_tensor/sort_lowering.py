@@ -0,0 +1,107 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime of `torch.sort` lowered through `tm_tensor.sort` on the RefBackend.
+
+Compiles `torch.sort` along the last dimension of a `[batch, length]` input
+for every combination of `--batches` and `--lengths`, checks the result
+against eager PyTorch (with `stable=True`, so ties must come out in the same
+order) and reports the median time per call of the compiled function and of
+eager PyTorch. Inputs are drawn from a small range of integers so that they
+contain many ties. Run it on builds before and after a change to the
+`tm_tensor.sort` lowering to compare them.
+
+  python benchmarks/tm_tensor/sort_lowering.py --lengths 16 256 4096 --batches 1 64
+"""
+
+import argparse
+import statistics
+import time
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(args: argparse.Namespace):
+    import torch
+
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    class Sort(torch.nn.Module):
+        def forward(self, x):
+            return torch.sort(x, dim=-1, descending=args.descending)
+
+    print(
+        f"{'batch':>6s} {'length':>7s} {'compiled_us':>12s} "
+        f"{'eager_us':>10s} {'ns/(n log n)':>13s}"
+    )
+    backend = RefBackendLinalgOnTensorsBackend()
+    for batch in args.batches:
+        for length in args.lengths:
+            x = torch.randint(0, max(2, length // 4), (batch, length)).float()
+            module = fx.export_and_import(
+                Sort(), x, output_type="linalg-on-tensors", func_name="sort"
+            )
+            invoker = backend.load(backend.compile(module))
+            values, indices = invoker.invoke_tensors("sort", [x])
+            expected = torch.sort(x, dim=-1, descending=args.descending, stable=True)
+            if not (
+                torch.equal(values, expected.values)
+                and torch.equal(indices, expected.indices)
+            ):
+                raise RuntimeError(f"Wrong result for batch={batch} length={length}")
+
+            compiled_s = _median_time(
+                lambda: invoker.invoke_tensors("sort", [x]),
+                args.warmup,
+                args.iterations,
+            )
+            eager_s = _median_time(lambda: Sort()(x), args.warmup, args.iterations)
+            n_log_n = batch * length * max(1, (length - 1).bit_length())
+            print(
+                f"{batch:>6d} {length:>7d} {compiled_s * 1e6:>12.1f} "
+                f"{eager_s * 1e6:>10.1f} {compiled_s * 1e9 / n_log_n:>13.2f}"
+            )
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=[8, 64, 512, 4096],
+        help="Sizes of the sorted dimension",
+    )
+    parser.add_argument(
+        "--batches",
+        type=int,
+        nargs="+",
+        default=[1, 32],
+        help="Numbers of independent rows sorted per call",
+    )
+    parser.add_argument(
+        "--descending", action="store_true", help="Sort in descending order"
+    )
+    parser.add_argument("--warmup", type=int, default=3, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=20, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,128 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Runtime of `tm_tensor.topk` on the RefBackend vs. K.
+
+`torch.kthvalue` is the op lowered through `tm_tensor.topk` (it selects the k
+smallest elements and then takes their maximum), so this compiles
+`torch.kthvalue` along the last dimension of a `[batch, length]` input for K
+from 1 up to `length / 2`, checks the result against eager PyTorch and
+reports the median time per call. To compare two lowerings, run it on the
+build with the old lowering with `--save old.json`, then on the new one with
+`--baseline old.json`, which adds a speedup column.
+
+  python benchmarks/tm_tensor/topk_lowering.py --length 4096 --save old.json
+  python benchmarks/tm_tensor/topk_lowering.py --length 4096 --baseline old.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+
+def _median_time(fn, warmup: int, iterations: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _k_values(length: int):
+    """1, 2, 4, ... up to length / 2."""
+    k = 1
+    while k <= max(1, length // 2):
+        yield k
+        k *= 2
+
+
+def main(args: argparse.Namespace):
+    import torch
+
+    from torch_mlir import fx
+    from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+        RefBackendLinalgOnTensorsBackend,
+    )
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    class Kthvalue(torch.nn.Module):
+        def __init__(self, k: int):
+            super().__init__()
+            self.k = k
+
+        def forward(self, x):
+            return torch.kthvalue(x, self.k, dim=-1)
+
+    print(
+        f"{'batch':>6s} {'length':>7s} {'k':>6s} {'compiled_us':>12s} "
+        f"{'eager_us':>10s} {'speedup':>8s}"
+    )
+    backend = RefBackendLinalgOnTensorsBackend()
+    results = {}
+    x = torch.randn(args.batch, args.length)
+    for k in _k_values(args.length):
+        module = fx.export_and_import(
+            Kthvalue(k), x, output_type="linalg-on-tensors", func_name="kthvalue"
+        )
+        invoker = backend.load(backend.compile(module))
+        values, indices = invoker.invoke_tensors("kthvalue", [x])
+        expected = torch.kthvalue(x, k, dim=-1)
+        if not (
+            torch.equal(values, expected.values)
+            and torch.equal(indices.to(expected.indices.dtype), expected.indices)
+        ):
+            raise RuntimeError(f"Wrong result for k={k}")
+
+        compiled_s = _median_time(
+            lambda: invoker.invoke_tensors("kthvalue", [x]),
+            args.warmup,
+            args.iterations,
+        )
+        eager_s = _median_time(lambda: Kthvalue(k)(x), args.warmup, args.iterations)
+        key = f"{args.batch}x{args.length}:{k}"
+        results[key] = compiled_s
+        speedup = (
+            f"{baseline[key] / compiled_s:>7.2f}x" if key in baseline else f"{'-':>8s}"
+        )
+        print(
+            f"{args.batch:>6d} {args.length:>7d} {k:>6d} "
+            f"{compiled_s * 1e6:>12.1f} {eager_s * 1e6:>10.1f} {speedup}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--length", type=int, default=4096, help="Size of the reduced dimension"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=8, help="Number of independent rows"
+    )
+    parser.add_argument("--save", help="JSON file to write the compiled timings to")
+    parser.add_argument(
+        "--baseline",
+        help="JSON file written by --save on another build, to compare with",
+    )
+    parser.add_argument("--warmup", type=int, default=3, help="Warmup runs")
+    parser.add_argument(
+        "--iterations", type=int, default=20, help="Timed runs (median is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,81 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Compile time of lowering a transformer to the torch backend contract.
+
+Imports a stack of `nn.TransformerEncoderLayer`s with the FX importer and
+times the torch backend pipeline (which runs the shape and dtype reification
+passes on every fixpoint iteration of `torch-lower-to-backend-contract`), as
+well as the reification passes on their own. Run it against two builds to
+compare changes to the abstract interpretation library handling.
+
+  python benchmarks/torch_dialect/backend_contract_compile_time.py --layers 4 16
+"""
+
+import argparse
+import time
+
+
+def _import_transformer(num_layers: int, d_model: int):
+    import torch
+    import torch.nn as nn
+    from torch_mlir import fx
+
+    layer = nn.TransformerEncoderLayer(
+        d_model=d_model, nhead=8, dim_feedforward=4 * d_model, batch_first=True
+    )
+    model = nn.TransformerEncoder(layer, num_layers=num_layers).eval()
+    x = torch.randn(2, 128, d_model)
+    return fx.export_and_import(model, x)
+
+
+def _time_pipeline(module, pipeline: str, repeat: int) -> float:
+    from torch_mlir import ir
+    from torch_mlir.passmanager import PassManager
+
+    best = None
+    asm = module.operation.get_asm(binary=True)
+    for _ in range(repeat):
+        m = ir.Module.parse(asm, context=module.context)
+        pm = PassManager.parse(pipeline, context=module.context)
+        start = time.perf_counter()
+        pm.run(m.operation)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(args: argparse.Namespace):
+    from torch_mlir.fx import _torch_backend_pipeline
+
+    reify = (
+        "builtin.module(torch-reify-shape-calculations,torch-reify-dtype-calculations)"
+    )
+    print(f"{'layers':>8s} {'backend_s':>10s} {'reify_s':>10s}")
+    for num_layers in args.layers:
+        module = _import_transformer(num_layers, args.d_model)
+        backend = _time_pipeline(module, _torch_backend_pipeline(), args.repeat)
+        reify_s = _time_pipeline(module, reify, args.repeat)
+        print(f"{num_layers:>8d} {backend:>10.3f} {reify_s:>10.3f}")
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--layers",
+        type=int,
+        nargs="+",
+        default=[2, 8, 24],
+        help="Numbers of encoder layers to benchmark",
+    )
+    parser.add_argument("--d-model", type=int, default=256, help="Model width")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions (best is reported)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,47 @@
+/*===-- torch-mlir-c/PassProfiling.h - Pass profiling -------------*- C -*-===*\
+|*                                                                            *|
+|* Part of the LLVM Project, under the Apache License v2.0 with LLVM          *|
+|* Exceptions.                                                                *|
+|* See https://llvm.org/LICENSE.txt for license information.                  *|
+|* SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception                    *|
+|*                                                                            *|
+\*===----------------------------------------------------------------------===*/
+
+#ifndef TORCHMLIR_C_PASSPROFILING_H
+#define TORCHMLIR_C_PASSPROFILING_H
+
+#include "mlir-c/Pass.h"
+#include "mlir-c/Support.h"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/** A profiler recording the time, op counts and memory use of each pass run
+ * by a pass manager. It is owned by the pass manager it is attached to. */
+typedef struct TorchMlirPassProfiler {
+  void *ptr;
+} TorchMlirPassProfiler;
+
+/** Attaches a new profiler to `passManager`, which takes ownership of it.
+ * Passes of nested and dynamic pipelines are recorded as children of the pass
+ * that runs them. Enabling the profiler makes every pass walk its IR unit
+ * twice to count ops. */
+MLIR_CAPI_EXPORTED TorchMlirPassProfiler
+torchMlirPassManagerAddProfiler(MlirPassManager passManager);
+
+/** Prints the profile recorded so far as JSON through `callback`. */
+MLIR_CAPI_EXPORTED void
+torchMlirPassProfilerPrintAsJSON(TorchMlirPassProfiler profiler,
+                                 MlirStringCallback callback, void *userData);
+
+/** Discards the profile recorded so far. Must not be called while the pass
+ * manager is running. */
+MLIR_CAPI_EXPORTED void
+torchMlirPassProfilerReset(TorchMlirPassProfiler profiler);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // TORCHMLIR_C_PASSPROFILING_H
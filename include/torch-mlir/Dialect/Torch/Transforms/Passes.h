@@ -66,6 +66,21 @@ struct TorchLoweringPipelineOptions
       *this, "extra-library",
       llvm::cl::desc("Filename of MLIR module for splicing into the abstract "
                      "interpretation library.")};
+
+  // The `incremental` and `record-statistics` options of
+  // LowerToBackendContract.
+  Option<bool> incremental{
+      *this, "incremental",
+      llvm::cl::desc("After the first iteration of the simplification "
+                     "pipeline, only re-simplify functions that do not "
+                     "satisfy the backend contract yet."),
+      llvm::cl::init(false)};
+  Option<bool> recordStatistics{
+      *this, "record-statistics",
+      llvm::cl::desc("Attach per-iteration statistics of the simplification "
+                     "pipeline (as JSON) to the module in the "
+                     "`torch.backend_contract_statistics` attribute."),
+      llvm::cl::init(false)};
 };
 
 /// Creates a pipeline that lowers the object graph IR that is produced by
@@ -145,11 +160,14 @@ std::unique_ptr<OperationPass<ModuleOp>> createEraseModuleInitializerPass();
 
 std::unique_ptr<OperationPass<ModuleOp>> createLowerToBackendContractPass(
     int maxIterations, bool decompose, bool shapeDtypeRefine,
-    ArrayRef<std::string> backendLegalOps, StringRef extraLibrary);
+    ArrayRef<std::string> backendLegalOps, StringRef extraLibrary,
+    bool incremental, bool recordStatistics);
 
 std::unique_ptr<OperationPass<ModuleOp>>
 createVerifyBackendContractNoDecompositionsPass();
 
+// Returns the abstract interpretation library as MLIR text. It is parsed once
+// per pass manager (see `AbstractInterpLibrary::load`), not on every run.
 StringRef getAbstractInterpLibrary();
 
 static const char kTorchOpPrefix[] = R"(torch.)";
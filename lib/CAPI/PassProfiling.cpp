@@ -0,0 +1,216 @@
+//===- PassProfiling.cpp - C Interface for pass profiling -----------------===//
+//
+// Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+// See https://llvm.org/LICENSE.txt for license information.
+// SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+// Also available under a BSD-style license. See LICENSE.
+//
+//===----------------------------------------------------------------------===//
+
+#include "torch-mlir-c/PassProfiling.h"
+
+#include "mlir/CAPI/Pass.h"
+#include "mlir/CAPI/Support.h"
+#include "mlir/CAPI/Utils.h"
+#include "mlir/Pass/PassInstrumentation.h"
+#include "mlir/Pass/PassManager.h"
+#include "llvm/ADT/DenseMap.h"
+#include "llvm/Support/JSON.h"
+#include "llvm/Support/Threading.h"
+
+#include <chrono>
+#include <fstream>
+#include <mutex>
+
+#if defined(__linux__)
+#include <unistd.h>
+#endif
+
+using namespace mlir;
+
+namespace {
+
+// Returns the resident set size of the process, or -1 if unknown.
+int64_t getResidentSetBytes() {
+#if defined(__linux__)
+  std::ifstream statm("/proc/self/statm");
+  int64_t sizePages, residentPages;
+  if (statm >> sizePages >> residentPages)
+    return residentPages * sysconf(_SC_PAGESIZE);
+#endif
+  return -1;
+}
+
+int64_t countOps(Operation *op) {
+  int64_t count = 0;
+  op->walk([&](Operation *) { ++count; });
+  return count;
+}
+
+// Aggregated measurements for one pass of a pipeline, under one parent.
+struct ProfileNode {
+  std::string name;
+  std::string opName;
+  int64_t count = 0;
+  double timeMs = 0;
+  int64_t opsBefore = 0;
+  int64_t opsAfter = 0;
+  int64_t maxRssBytes = -1;
+  bool failed = false;
+  // Children in order of first execution.
+  std::vector<std::unique_ptr<ProfileNode>> children;
+  llvm::DenseMap<const Pass *, ProfileNode *> childIndex;
+
+  ProfileNode *getOrCreateChild(Pass *pass, StringRef opName) {
+    // When running on multiple threads, the pass manager runs clones of the
+    // passes of a nested pipeline; they are aggregated with the original.
+    ProfileNode *&child = childIndex[pass->getThreadingSiblingOrThis()];
+    if (!child) {
+      children.push_back(std::make_unique<ProfileNode>());
+      child = children.back().get();
+      StringRef argument = pass->getArgument();
+      child->name = (argument.empty() ? pass->getName() : argument).str();
+      child->opName = opName.str();
+    }
+    return child;
+  }
+
+  llvm::json::Value toJSON() const {
+    llvm::json::Array childValues;
+    for (const auto &child : children)
+      childValues.push_back(child->toJSON());
+    llvm::json::Object result{{"pass", name},
+                              {"op", opName},
+                              {"count", count},
+                              {"time_ms", timeMs},
+                              {"ops_before", opsBefore},
+                              {"ops_after", opsAfter},
+                              {"failed", failed},
+                              {"children", std::move(childValues)}};
+    if (maxRssBytes >= 0)
+      result["rss_bytes"] = maxRssBytes;
+    return result;
+  }
+};
+
+class PassProfiler : public PassInstrumentation {
+public:
+  void runBeforePipeline(std::optional<OperationName> name,
+                         const PipelineParentInfo &parentInfo) override {
+    std::lock_guard<std::mutex> lock(mutex);
+    ProfileNode *parent = &root;
+    if (parentInfo.parentPass) {
+      // The parent pass is running (on `parentThreadID`) the pipeline that is
+      // starting on this thread.
+      for (const ActivePass &active :
+           llvm::reverse(threads[parentInfo.parentThreadID].active)) {
+        if (active.pass == parentInfo.parentPass) {
+          parent = active.node;
+          break;
+        }
+      }
+    }
+    threads[llvm::get_threadid()].pipelineParents.push_back(parent);
+  }
+
+  void runAfterPipeline(std::optional<OperationName> name,
+                        const PipelineParentInfo &parentInfo) override {
+    std::lock_guard<std::mutex> lock(mutex);
+    threads[llvm::get_threadid()].pipelineParents.pop_back();
+  }
+
+  void runBeforePass(Pass *pass, Operation *op) override {
+    int64_t ops = countOps(op);
+    std::lock_guard<std::mutex> lock(mutex);
+    ThreadState &thread = threads[llvm::get_threadid()];
+    ProfileNode *parent =
+        thread.pipelineParents.empty() ? &root : thread.pipelineParents.back();
+    ProfileNode *node =
+        parent->getOrCreateChild(pass, op->getName().getStringRef());
+    node->opsBefore += ops;
+    thread.active.push_back({pass, node, std::chrono::steady_clock::now()});
+  }
+
+  void runAfterPass(Pass *pass, Operation *op) override {
+    finishPass(op, /*failed=*/false);
+  }
+
+  void runAfterPassFailed(Pass *pass, Operation *op) override {
+    finishPass(op, /*failed=*/true);
+  }
+
+  void print(llvm::raw_ostream &os) {
+    std::lock_guard<std::mutex> lock(mutex);
+    llvm::json::Array passes;
+    for (const auto &child : root.children)
+      passes.push_back(child->toJSON());
+    os << llvm::json::Value(std::move(passes));
+  }
+
+  // Must not be called while the pass manager is running.
+  void reset() {
+    std::lock_guard<std::mutex> lock(mutex);
+    root = ProfileNode();
+  }
+
+private:
+  struct ActivePass {
+    Pass *pass;
+    ProfileNode *node;
+    std::chrono::steady_clock::time_point start;
+  };
+  struct ThreadState {
+    // The nodes of the passes currently running on this thread.
+    SmallVector<ActivePass> active;
+    // The node under which passes of the innermost pipeline running on this
+    // thread are recorded.
+    SmallVector<ProfileNode *> pipelineParents;
+  };
+
+  void finishPass(Operation *op, bool failed) {
+    auto end = std::chrono::steady_clock::now();
+    // Counting the ops of a failed pass's IR is not meaningful (and the IR
+    // may be invalid).
+    int64_t ops = failed ? 0 : countOps(op);
+    int64_t rss = getResidentSetBytes();
+    std::lock_guard<std::mutex> lock(mutex);
+    ActivePass active = threads[llvm::get_threadid()].active.pop_back_val();
+    ProfileNode *node = active.node;
+    node->count += 1;
+    node->timeMs +=
+        std::chrono::duration<double, std::milli>(end - active.start).count();
+    node->opsAfter += ops;
+    node->maxRssBytes = std::max(node->maxRssBytes, rss);
+    node->failed |= failed;
+  }
+
+  std::mutex mutex;
+  ProfileNode root;
+  llvm::DenseMap<uint64_t, ThreadState> threads;
+};
+
+PassProfiler *unwrap(TorchMlirPassProfiler profiler) {
+  return static_cast<PassProfiler *>(profiler.ptr);
+}
+
+} // namespace
+
+TorchMlirPassProfiler
+torchMlirPassManagerAddProfiler(MlirPassManager passManager) {
+  auto profiler = std::make_unique<PassProfiler>();
+  TorchMlirPassProfiler result{profiler.get()};
+  unwrap(passManager)->addInstrumentation(std::move(profiler));
+  return result;
+}
+
+void torchMlirPassProfilerPrintAsJSON(TorchMlirPassProfiler profiler,
+                                      MlirStringCallback callback,
+                                      void *userData) {
+  detail::CallbackOstream stream(callback, userData);
+  unwrap(profiler)->print(stream);
+  stream.flush();
+}
+
+void torchMlirPassProfilerReset(TorchMlirPassProfiler profiler) {
+  unwrap(profiler)->reset();
+}
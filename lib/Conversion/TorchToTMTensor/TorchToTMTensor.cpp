@@ -233,7 +233,7 @@ static Value createTMTensorScatterOp(
 
 static Value createTMTensorScanOp(
     OpBuilder &b, Location loc, Value input, Value output, Value accumulator,
-    int64_t dim, bool inclusive,
+    int64_t dim, bool inclusive, bool associative,
     function_ref<void(OpBuilder &, Location, Value, Value)> bodyBuild) {
   auto inputType = cast<RankedTensorType>(input.getType());
   auto accType = cast<RankedTensorType>(accumulator.getType());
@@ -241,7 +241,7 @@ static Value createTMTensorScanOp(
   auto scanOp = b.create<TMTensor::ScanOp>(
       loc, TypeRange{inputType, accType}, input,
       ValueRange{output, accumulator}, b.getI64IntegerAttr(dim),
-      b.getBoolAttr(inclusive));
+      b.getBoolAttr(inclusive), associative ? b.getUnitAttr() : UnitAttr());
 
   Region &scanOpRegion = scanOp.getRegion();
   auto &scanOpBlock = scanOpRegion.emplaceBlock();
@@ -1601,6 +1601,9 @@ public:
 
     Value result = createTMTensorScanOp(
         rewriter, loc, input, output, acc, dim, /*inclusive=*/true,
+        // Reassociating floating-point products only changes rounding, and
+        // allows long scans to be parallelized.
+        /*associative=*/true,
         [](OpBuilder &b, Location loc, Value input, Value acc) {
           Value prod =
               (isa<mlir::FloatType>(input.getType())
@@ -1690,6 +1693,9 @@ public:
 
     Value result = createTMTensorScanOp(
         rewriter, loc, input, output, acc, dim, /*inclusive=*/true,
+        // Reassociating floating-point sums only changes rounding, and allows
+        // long scans to be parallelized.
+        /*associative=*/true,
         [](OpBuilder &b, Location loc, Value input, Value acc) {
           Value sum =
               (isa<mlir::FloatType>(input.getType())
@@ -154,47 +154,9 @@ bool AttentionOp::payloadUsesValueFromOperand(OpOperand *opOperand) {
   return operand == getQuery() || operand == getKey() || operand == getValue();
 }
 
-// Performs a matmul between lhs and rhs
-// Note that "transposed" means the last two dims of rhs are swapped
-static void matmul(OpBuilder &b, Location loc, Value lhs, ValueRange lhsSizes,
-                   Value rhs, ValueRange rhsSizes, Value output,
-                   ValueRange outputSizes, bool transposed = false) {
-  auto elementType = cast<MemRefType>(lhs.getType()).getElementType();
-  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
-  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
-  auto rank = outputSizes.size();
-  Value reductionDimSize = lhsSizes[lhsSizes.size() - 1];
-
-  // Loop over output
-  b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(rank, zero), outputSizes,
-      SmallVector<Value>(rank, one),
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        Value acc = b.create<arith::ConstantOp>(
-            loc, elementType, b.getFloatAttr(elementType, 0.0));
-        Value sum =
-            b.create<scf::ForOp>(
-                 loc, zero, reductionDimSize, one, SmallVector<Value>{acc},
-                 [&](OpBuilder &b, Location loc, Value i, ValueRange accs) {
-                   SmallVector<Value> lhsIVs(localIVs), rhsIVs(localIVs);
-                   lhsIVs[lhsIVs.size() - 1] = i;
-                   rhsIVs[rhsIVs.size() - 2] = i;
-                   if (transposed)
-                     std::swap(rhsIVs[rhsIVs.size() - 1],
-                               rhsIVs[rhsIVs.size() - 2]);
-
-                   Value acc = accs[0];
-                   Value rElem = b.create<memref::LoadOp>(loc, lhs, lhsIVs);
-                   Value cElem = b.create<memref::LoadOp>(loc, rhs, rhsIVs);
-                   Value x = b.create<arith::MulFOp>(loc, rElem, cElem);
-                   x = b.create<arith::AddFOp>(loc, x, acc);
-
-                   b.create<scf::YieldOp>(loc, x);
-                 })
-                ->getResult(0);
-        b.create<memref::StoreOp>(loc, sum, output, localIVs);
-      });
-}
+// Number of keys processed at once by the attention lowering. The scores of a
+// query against one tile of keys are kept in a scratch buffer of this size.
+static constexpr int64_t kAttentionKeyTileSize = 64;
 
 LogicalResult AttentionOp::generateScalarImplementation(OpBuilder &b,
                                                         Location loc,
@@ -209,194 +171,204 @@ LogicalResult AttentionOp::generateScalarImplementation(OpBuilder &b,
 
   Value output = getOutput();
   auto queryType = cast<MemRefType>(query.getType());
-  auto keyType = cast<MemRefType>(key.getType());
-  auto valueType = cast<MemRefType>(value.getType());
   auto maskType = mask ? cast<MemRefType>(mask.getType()) : MemRefType();
-  auto queryRank = queryType.getRank();
-  auto keyRank = keyType.getRank();
-  auto valueRank = valueType.getRank();
-  auto keySizes = keyType.getShape();
+  int64_t queryRank = queryType.getRank();
+  int64_t keyRank = cast<MemRefType>(key.getType()).getRank();
+  int64_t valueRank = cast<MemRefType>(value.getType()).getRank();
   Type elementType = queryType.getElementType();
 
+  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  Value tileSize = b.create<arith::ConstantIndexOp>(loc, kAttentionKeyTileSize);
   Value zeroF = b.create<arith::ConstantOp>(loc, elementType,
                                             b.getFloatAttr(elementType, 0.0));
   Value negInfF = b.create<arith::ConstantOp>(
       loc, elementType,
       b.getFloatAttr(elementType, -std::numeric_limits<double>::infinity()));
 
-  // TODO: This needs to be fixed, it assumes everything is dynamic however if
-  // any shapes are static the `memref.alloc` generated is illegal.
-  SmallVector<Value> queryDynSizes, keyDynSizes, valueDynSizes, outputDynSizes;
-  for (auto i = 0; i < queryRank; i++)
-    queryDynSizes.push_back(b.create<memref::DimOp>(loc, query, i));
-  for (auto i = 0; i < keyRank; i++)
-    keyDynSizes.push_back(b.create<memref::DimOp>(loc, key, i));
-  for (auto i = 0; i < valueRank; i++)
-    valueDynSizes.push_back(b.create<memref::DimOp>(loc, value, i));
-  for (auto i = 0; i < queryRank; i++)
-    outputDynSizes.push_back(b.create<memref::DimOp>(loc, output, i));
-
-  // weight = query @ key
-  auto weightRank = queryRank;
-  auto weightSizes = SmallVector<int64_t>(queryType.getShape());
-  weightSizes[weightRank - 1] = keySizes[keyRank - 2];
-  auto weightType = MemRefType::get(weightSizes, queryType.getElementType());
-
-  // Setup the weight dynamic sizes:
-  SmallVector<Value> weightDynSizes(queryDynSizes);
-  weightDynSizes[weightRank - 1] = keyDynSizes[keyRank - 2];
-
-  SmallVector<Value> weightFilteredDynSizes;
-  for (int i = 0; i < weightRank; ++i)
-    if (weightSizes[i] == ShapedType::kDynamic)
-      weightFilteredDynSizes.push_back(weightDynSizes[i]);
-
-  Value weight =
-      b.create<memref::AllocOp>(loc, weightType, weightFilteredDynSizes);
-  matmul(b, loc, query, queryDynSizes, key, keyDynSizes, weight, weightDynSizes,
-         /*transposed=*/true);
-
-  // weight = softmax(weight)
-  Value dim = weightDynSizes[weightRank - 1];
+  // Loops over the batch dimensions and the query sequence length are
+  // parallel.
+  SmallVector<Value> rowSizes;
+  for (int64_t i = 0; i < queryRank - 1; ++i)
+    rowSizes.push_back(getDimValue(b, loc, query, i));
+  Value headDim = getDimValue(b, loc, query, queryRank - 1);
+  Value keySeqLen = getDimValue(b, loc, key, keyRank - 2);
+  Value valueDim = getDimValue(b, loc, value, valueRank - 1);
   Value scaleFactor = b.create<math::SqrtOp>(
       loc, b.create<arith::UIToFPOp>(
                loc, elementType,
-               b.create<arith::IndexCastUIOp>(loc, b.getI32Type(),
-                                              queryDynSizes[queryRank - 1])));
-
-  // weight = (weight - max(weight)) / math.sqrt(querySizes[-1])
-  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
-  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
-  b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(weightRank, zero), weightDynSizes,
-      SmallVector<Value>(weightRank, one),
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        Value x = b.create<memref::LoadOp>(loc, weight, localIVs);
-        x = b.create<arith::DivFOp>(loc, x, scaleFactor);
-        b.create<memref::StoreOp>(loc, x, weight, localIVs);
-      });
-
-  // Apply mask to weights if mask is given
-  if (mask) {
-    b.create<scf::ParallelOp>(
-        loc, SmallVector<Value>(weightRank, zero), weightDynSizes,
-        SmallVector<Value>(weightRank, one),
-        [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-          Value weightValue = b.create<memref::LoadOp>(loc, weight, localIVs);
-          Value maskValue = b.create<memref::LoadOp>(loc, mask, localIVs);
-          if (maskType.getElementType().isInteger(1)) {
-            maskValue =
-                b.create<arith::SelectOp>(loc, maskValue, zeroF, negInfF);
-          }
-          Value maskedWeight =
-              b.create<arith::AddFOp>(loc, weightValue, maskValue);
-          b.create<memref::StoreOp>(loc, maskedWeight, weight, localIVs);
-        });
-  }
-
-  // calculate max(weight)
-  Value init = b.create<memref::LoadOp>(loc, weight,
-                                        SmallVector<Value>(weightRank, zero));
-  Value globalMax =
-      b.create<scf::ParallelOp>(
-           loc, SmallVector<Value>(weightRank, zero), weightDynSizes,
-           SmallVector<Value>(weightRank, one), init,
-           [&](OpBuilder &b, Location loc, ValueRange localIVs,
-               ValueRange accs) {
-             auto reduceOp = b.create<scf::ReduceOp>(loc, init);
-             // Build reduce body.
-             Block &reductionBody = reduceOp.getReductions()[0].front();
-             auto bodyBuilder = OpBuilder::atBlockEnd(&reductionBody);
-             Value acc = reductionBody.getArgument(0);
-             Value x =
-                 bodyBuilder.create<memref::LoadOp>(loc, weight, localIVs);
-             Value max = bodyBuilder.create<arith::MaximumFOp>(loc, x, acc);
-             bodyBuilder.create<scf::ReduceReturnOp>(loc, max);
-           })
-          .getResult(0);
-  // weight = (weight - max(weight)) / math.sqrt(querySizes[-1])
-  b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(weightRank, zero), weightDynSizes,
-      SmallVector<Value>(weightRank, one),
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        Value x = b.create<memref::LoadOp>(loc, weight, localIVs);
-        x = b.create<arith::SubFOp>(loc, x, globalMax);
-        b.create<memref::StoreOp>(loc, x, weight, localIVs);
-      });
-  // calculate exp(weight)
-  SmallVector<Value> min(weightRank, zero),
-      max(weightDynSizes.begin(), weightDynSizes.end()), steps(weightRank, one);
-  b.create<scf::ParallelOp>(
-      loc, min, max, steps,
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        Value x = b.create<memref::LoadOp>(loc, weight, localIVs);
-        x = b.create<math::ExpOp>(loc, x);
-        b.create<memref::StoreOp>(loc, x, weight, localIVs);
-      });
-
-  llvm::SmallVector<Value> expWeightDynDims(weightFilteredDynSizes);
-  if (weightSizes.back() == ShapedType::kDynamic)
-    expWeightDynDims.resize(expWeightDynDims.size() - 1);
-
-  Value expWeightSum = b.create<memref::AllocOp>(
-      loc,
-      MemRefType::get(
-          SmallVector<int64_t>(weightSizes.begin(), weightSizes.end() - 1),
-          elementType),
-      expWeightDynDims);
-  b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(weightRank - 1, zero),
-      SmallVector<Value>{weightDynSizes.begin(), weightDynSizes.end() - 1},
-      SmallVector<Value>(weightRank - 1, one),
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        b.create<memref::StoreOp>(loc, zeroF, expWeightSum, localIVs);
-      });
-  // Loop over all dims but -1
+               b.create<arith::IndexCastUIOp>(loc, b.getI32Type(), headDim)));
+
+  // Each query row streams over the keys and values one tile at a time,
+  // keeping the running maximum and sum of exp(score - maximum) and
+  // accumulating the unnormalized output in the output row. Whenever the
+  // maximum grows, the sum and the accumulated output are rescaled. Only the
+  // scores of a single tile are stored, so memory use is independent of the
+  // sequence lengths.
   b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(weightRank - 1, zero),
-      SmallVector<Value>(weightDynSizes.begin(), weightDynSizes.end() - 1),
-      SmallVector<Value>(weightRank - 1, one),
-      [&](OpBuilder &b, Location loc, ValueRange outsideDims) {
-        // Sum over last dim
-        b.create<scf::ParallelOp>(
-            loc, zero, dim, one,
-            [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-              SmallVector<Value> coords(outsideDims);
-              coords.push_back(localIVs[0]);
-              Value x =
-                  b.create<memref::LoadOp>(loc, expWeightSum, outsideDims);
-              Value y = b.create<memref::LoadOp>(loc, weight, coords);
-              Value sum = b.create<arith::AddFOp>(loc, x, y);
-              b.create<memref::StoreOp>(loc, sum, expWeightSum, outsideDims);
+      loc, SmallVector<Value>(queryRank - 1, zero), rowSizes,
+      SmallVector<Value>(queryRank - 1, one),
+      [&](OpBuilder &b, Location loc, ValueRange rowIVs) {
+        ValueRange batchIVs = rowIVs.drop_back();
+        Value row = rowIVs.back();
+        auto indices = [&](ArrayRef<Value> last) {
+          SmallVector<Value> result(batchIVs);
+          llvm::append_range(result, last);
+          return result;
+        };
+        auto forLoop = [&](OpBuilder &b, Location loc, Value lb, Value ub,
+                           ValueRange iterArgs,
+                           function_ref<SmallVector<Value>(
+                               OpBuilder &, Location, Value, ValueRange)>
+                               body) {
+          return b
+              .create<scf::ForOp>(
+                  loc, lb, ub, one, iterArgs,
+                  [&](OpBuilder &b, Location loc, Value iv, ValueRange args) {
+                    b.create<scf::YieldOp>(loc, body(b, loc, iv, args));
+                  })
+              .getResults();
+        };
+
+        Value scores = b.create<memref::AllocOp>(
+            loc, MemRefType::get({kAttentionKeyTileSize}, elementType));
+        forLoop(b, loc, zero, valueDim, {},
+                [&](OpBuilder &b, Location loc, Value n, ValueRange) {
+                  b.create<memref::StoreOp>(loc, zeroF, output,
+                                            indices({row, n}));
+                  return SmallVector<Value>{};
+                });
+
+        auto tileLoop = b.create<scf::ForOp>(
+            loc, zero, keySeqLen, tileSize, ValueRange{negInfF, zeroF},
+            [&](OpBuilder &b, Location loc, Value tileStart, ValueRange args) {
+              Value tileLen = b.create<arith::MinSIOp>(
+                  loc, tileSize,
+                  b.create<arith::SubIOp>(loc, keySeqLen, tileStart));
+              Value runningMax = args[0];
+              Value runningSum = args[1];
+
+              // scores = (query @ key^T) / sqrt(head_dim) + mask
+              Value tileMax =
+                  forLoop(
+                      b, loc, zero, tileLen, negInfF,
+                      [&](OpBuilder &b, Location loc, Value j,
+                          ValueRange args) {
+                        Value keyIdx =
+                            b.create<arith::AddIOp>(loc, tileStart, j);
+                        Value dot =
+                            forLoop(
+                                b, loc, zero, headDim, zeroF,
+                                [&](OpBuilder &b, Location loc, Value d,
+                                    ValueRange args) {
+                                  Value q = b.create<memref::LoadOp>(
+                                      loc, query, indices({row, d}));
+                                  Value k = b.create<memref::LoadOp>(
+                                      loc, key, indices({keyIdx, d}));
+                                  Value x = b.create<arith::MulFOp>(loc, q, k);
+                                  x = b.create<arith::AddFOp>(loc, x, args[0]);
+                                  return SmallVector<Value>{x};
+                                })
+                                .front();
+                        Value score =
+                            b.create<arith::DivFOp>(loc, dot, scaleFactor);
+                        if (mask) {
+                          Value maskValue = b.create<memref::LoadOp>(
+                              loc, mask, indices({row, keyIdx}));
+                          if (maskType.getElementType().isInteger(1)) {
+                            maskValue = b.create<arith::SelectOp>(
+                                loc, maskValue, zeroF, negInfF);
+                          }
+                          score =
+                              b.create<arith::AddFOp>(loc, score, maskValue);
+                        }
+                        b.create<memref::StoreOp>(loc, score, scores, j);
+                        Value max =
+                            b.create<arith::MaximumFOp>(loc, args[0], score);
+                        return SmallVector<Value>{max};
+                      })
+                      .front();
+
+              // Exponentiate relative to the new running maximum. While all
+              // scores seen so far are -inf, 0 is used instead so that they
+              // map to exp(-inf) = 0 rather than NaN.
+              Value newMax =
+                  b.create<arith::MaximumFOp>(loc, runningMax, tileMax);
+              Value allMasked = b.create<arith::CmpFOp>(
+                  loc, arith::CmpFPredicate::OEQ, newMax, negInfF);
+              Value safeMax =
+                  b.create<arith::SelectOp>(loc, allMasked, zeroF, newMax);
+              Value correction = b.create<math::ExpOp>(
+                  loc, b.create<arith::SubFOp>(loc, runningMax, safeMax));
+              Value tileSum =
+                  forLoop(b, loc, zero, tileLen, zeroF,
+                          [&](OpBuilder &b, Location loc, Value j,
+                              ValueRange args) {
+                            Value x = b.create<memref::LoadOp>(loc, scores, j);
+                            x = b.create<math::ExpOp>(
+                                loc, b.create<arith::SubFOp>(loc, x, safeMax));
+                            b.create<memref::StoreOp>(loc, x, scores, j);
+                            Value sum =
+                                b.create<arith::AddFOp>(loc, args[0], x);
+                            return SmallVector<Value>{sum};
+                          })
+                      .front();
+
+              // output = output * correction + exp(scores) @ value
+              forLoop(b, loc, zero, valueDim, {},
+                      [&](OpBuilder &b, Location loc, Value n, ValueRange) {
+                        SmallVector<Value> outIndices = indices({row, n});
+                        Value x =
+                            b.create<memref::LoadOp>(loc, output, outIndices);
+                        x = b.create<arith::MulFOp>(loc, x, correction);
+                        b.create<memref::StoreOp>(loc, x, output, outIndices);
+                        return SmallVector<Value>{};
+                      });
+              forLoop(
+                  b, loc, zero, tileLen, {},
+                  [&](OpBuilder &b, Location loc, Value j, ValueRange) {
+                    Value p = b.create<memref::LoadOp>(loc, scores, j);
+                    Value keyIdx = b.create<arith::AddIOp>(loc, tileStart, j);
+                    forLoop(
+                        b, loc, zero, valueDim, {},
+                        [&](OpBuilder &b, Location loc, Value n, ValueRange) {
+                          SmallVector<Value> outIndices = indices({row, n});
+                          Value v = b.create<memref::LoadOp>(
+                              loc, value, indices({keyIdx, n}));
+                          Value x =
+                              b.create<memref::LoadOp>(loc, output, outIndices);
+                          x = b.create<arith::AddFOp>(
+                              loc, x, b.create<arith::MulFOp>(loc, p, v));
+                          b.create<memref::StoreOp>(loc, x, output, outIndices);
+                          return SmallVector<Value>{};
+                        });
+                    return SmallVector<Value>{};
+                  });
+
+              Value newSum = b.create<arith::AddFOp>(
+                  loc, b.create<arith::MulFOp>(loc, runningSum, correction),
+                  tileSum);
+              b.create<scf::YieldOp>(loc, ValueRange{newMax, newSum});
             });
-      });
-  // calculate exp(weight) / sum(exp(weight))
-  b.create<scf::ParallelOp>(
-      loc, SmallVector<Value>(weightRank, zero),
-      SmallVector<Value>(weightDynSizes.begin(), weightDynSizes.end()),
-      SmallVector<Value>(weightRank, one),
-      [&](OpBuilder &b, Location loc, ValueRange localIVs) {
-        SmallVector<Value> sumIVs(localIVs);
-        sumIVs.pop_back();
-
-        Value x = b.create<memref::LoadOp>(loc, weight, localIVs);
-        Value sum = b.create<memref::LoadOp>(loc, expWeightSum, sumIVs);
-        Value divResult = b.create<arith::DivFOp>(loc, x, sum);
-
-        // Set to 0 if sum is 0 (can occur during boolean mask / large negative
-        // QK)
+
+        // output = output / sum, or 0 if the sum is 0 (which can occur with a
+        // boolean mask or a large negative score).
+        Value sum = tileLoop.getResult(1);
         Value isSumZero =
             b.create<arith::CmpFOp>(loc, arith::CmpFPredicate::OEQ, sum, zeroF);
-        Value result =
-            b.create<arith::SelectOp>(loc, isSumZero, zeroF, divResult);
-
-        b.create<memref::StoreOp>(loc, result, weight, localIVs);
+        forLoop(b, loc, zero, valueDim, {},
+                [&](OpBuilder &b, Location loc, Value n, ValueRange) {
+                  SmallVector<Value> outIndices = indices({row, n});
+                  Value x = b.create<memref::LoadOp>(loc, output, outIndices);
+                  Value divResult = b.create<arith::DivFOp>(loc, x, sum);
+                  Value result = b.create<arith::SelectOp>(loc, isSumZero,
+                                                           zeroF, divResult);
+                  b.create<memref::StoreOp>(loc, result, output, outIndices);
+                  return SmallVector<Value>{};
+                });
+        b.create<memref::DeallocOp>(loc, scores);
       });
 
-  // output = weight @ value
-  matmul(b, loc, weight, weightDynSizes, value, valueDynSizes, output,
-         outputDynSizes, /*transposed=*/false);
-
   return success();
 }
 
@@ -459,7 +431,58 @@ LogicalResult ScanOp::verify() {
   return success();
 }
 
+/// Returns whether the combiner of `op` is associative: either it is declared
+/// so, or it consists of a single associative operation on the region
+/// arguments. Floating-point addition and multiplication only qualify if
+/// declared, as their rounding depends on the order of the operations.
+static bool isAssociativeScan(ScanOp op) {
+  if (op.getAssociative())
+    return true;
+  Block &block = op.getRegion().front();
+  if (!llvm::hasSingleElement(block.without_terminator()))
+    return false;
+  Operation *combiner = &block.front();
+  if (block.getTerminator()->getOperand(0) != combiner->getResult(0))
+    return false;
+  if (!isa<arith::AddIOp, arith::MulIOp, arith::AndIOp, arith::OrIOp,
+           arith::XOrIOp, arith::MaxSIOp, arith::MinSIOp, arith::MaxUIOp,
+           arith::MinUIOp, arith::MaximumFOp, arith::MinimumFOp,
+           arith::MaxNumFOp, arith::MinNumFOp>(combiner))
+    return false;
+  Value lhs = combiner->getOperand(0);
+  Value rhs = combiner->getOperand(1);
+  Value acc = block.getArgument(0);
+  Value element = block.getArgument(1);
+  return (lhs == acc && rhs == element) || (lhs == element && rhs == acc);
+}
+
+// Associative scans along more than this many elements (or along a dynamic
+// dimension) are split into blocks of this size that are scanned in parallel.
+static constexpr int64_t kScanBlockSize = 1024;
+// Scans of at least this many lines (i.e. elements of the dimensions before
+// the scan dimension) already run in parallel across lines, so they keep the
+// sequential lowering, which reads and writes every element only once.
+static constexpr int64_t kScanParallelLines = 64;
+
+/// Returns whether `op` is lowered by `buildBlockedScan` rather than by one
+/// scalar loop nest.
+static bool useBlockedScan(ScanOp op) {
+  if (!isAssociativeScan(op))
+    return false;
+  ArrayRef<int64_t> shape = op.getOperandType().getShape();
+  int64_t scanDim = op.getDimension();
+  if (!ShapedType::isDynamic(shape[scanDim]) &&
+      shape[scanDim] <= kScanBlockSize)
+    return false;
+  ArrayRef<int64_t> lineShape = shape.take_front(scanDim);
+  return llvm::any_of(lineShape, ShapedType::isDynamic) ||
+         ShapedType::getNumElements(lineShape) < kScanParallelLines;
+}
+
 SmallVector<Range> ScanOp::getIterationDomain(OpBuilder &builder) {
+  // The blocked scan generates its own loops.
+  if (useBlockedScan(*this))
+    return {};
   int64_t operandRank = getOperandRank();
   SmallVector<Range> loopBounds(operandRank);
   Location loc = getLoc();
@@ -475,6 +498,8 @@ SmallVector<Range> ScanOp::getIterationDomain(OpBuilder &builder) {
 }
 
 SmallVector<utils::IteratorType> ScanOp::getLoopIteratorTypes() {
+  if (useBlockedScan(*this))
+    return {};
   SmallVector<utils::IteratorType> iteratorTypes(getOperandRank(),
                                                  utils::IteratorType::parallel);
   iteratorTypes[getDimension()] = utils::IteratorType::reduction;
@@ -494,6 +519,248 @@ bool ScanOp::payloadUsesValueFromOperand(OpOperand *opOperand) {
   }
 }
 
+/// Clones the combiner of `op` applied to `acc` (the scan of the earlier
+/// elements) and `element` (a later element, or the scan of later elements).
+static Value buildScanCombiner(OpBuilder &b, ScanOp op, Value acc,
+                               Value element) {
+  Block &srcBlock = op.getRegion().front();
+  IRMapping bvm;
+  bvm.map(srcBlock.getArgument(0), acc);
+  bvm.map(srcBlock.getArgument(1), element);
+  for (auto &blockOp : srcBlock.without_terminator())
+    b.clone(blockOp, bvm);
+  return bvm.lookupOrDefault(srcBlock.getTerminator()->getOperand(0));
+}
+
+/// Builds a parallel loop nest with unit steps from `lbs` to `ubs`, or just
+/// the body if there are no loops.
+static void
+buildParallelLoop(OpBuilder &b, Location loc, ValueRange lbs, ValueRange ubs,
+                  function_ref<void(OpBuilder &, Location, ValueRange)> body) {
+  if (lbs.empty()) {
+    body(b, loc, ValueRange{});
+    return;
+  }
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  b.create<scf::ParallelOp>(loc, lbs, ubs, SmallVector<Value>(lbs.size(), one),
+                            body);
+}
+
+/// Generates a blocked scan of `op`, in three steps:
+///   1. Each block of `kScanBlockSize` elements of each line is scanned on its
+///      own, in parallel.
+///   2. For each line, in parallel, the carry into each block (the scan of all
+///      the previous blocks) is computed sequentially from the last element of
+///      each block.
+///   3. The carry is combined into every element of all blocks but the first,
+///      in parallel.
+/// Every element is combined at most twice. An exclusive scan is computed as
+/// the inclusive scan of the initial accumulator followed by the input
+/// elements (but the last one).
+static void buildBlockedScan(OpBuilder &b, Location loc, ScanOp op) {
+  Value input = op.input();
+  Value output = op.output();
+  Value accumulator = op.accumulator();
+  ShapedType operandType = op.getOperandType();
+  Type elementType = operandType.getElementType();
+  int64_t rank = op.getOperandRank();
+  int64_t scanDim = op.getDimension();
+  bool isInclusive = op.getInclusive();
+
+  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  Value blockSize = b.create<arith::ConstantIndexOp>(loc, kScanBlockSize);
+  SmallVector<Value> sizes;
+  for (int64_t dim = 0; dim < rank; ++dim)
+    sizes.push_back(getDimValue(b, loc, input, dim));
+  Value length = sizes[scanDim];
+  Value numBlocks = b.create<arith::CeilDivUIOp>(loc, length, blockSize);
+  // Lines are indexed by the ivs of the dimensions before the scan dimension
+  // ("outer") and after it ("inner").
+  SmallVector<Value> outerSizes(ArrayRef<Value>(sizes).take_front(scanDim));
+  SmallVector<Value> innerSizes(ArrayRef<Value>(sizes).drop_front(scanDim + 1));
+  SmallVector<Value> lineSizes(outerSizes);
+  llvm::append_range(lineSizes, innerSizes);
+  auto indices = [&](ValueRange outer, Value pos, ValueRange inner) {
+    SmallVector<Value> result(outer);
+    result.push_back(pos);
+    llvm::append_range(result, inner);
+    return result;
+  };
+  auto accIndices = [&](ValueRange outer, ValueRange inner) {
+    SmallVector<Value> result(outer);
+    llvm::append_range(result, inner);
+    return result;
+  };
+  auto forEachInner =
+      [&](OpBuilder &b, Location loc,
+          function_ref<void(OpBuilder &, Location, ValueRange)> body) {
+        scf::buildLoopNest(b, loc, SmallVector<Value>(innerSizes.size(), zero),
+                           innerSizes,
+                           SmallVector<Value>(innerSizes.size(), one), body);
+      };
+  auto forLoop = [&](OpBuilder &b, Location loc, Value lb, Value ub,
+                     function_ref<void(OpBuilder &, Location, Value)> body) {
+    b.create<scf::ForOp>(loc, lb, ub, one, ValueRange{},
+                         [&](OpBuilder &b, Location loc, Value iv, ValueRange) {
+                           body(b, loc, iv);
+                           b.create<scf::YieldOp>(loc);
+                         });
+  };
+  // Element `pos` (> 0) of the sequence scanned inclusively.
+  auto loadElement = [&](OpBuilder &b, Location loc, ValueRange outer,
+                         Value pos, ValueRange inner) -> Value {
+    if (!isInclusive)
+      pos = b.create<arith::SubIOp>(loc, pos, one);
+    return b.create<memref::LoadOp>(loc, input, indices(outer, pos, inner));
+  };
+  auto blockBounds = [&](OpBuilder &b, Location loc, Value block) {
+    Value start = b.create<arith::MulIOp>(loc, block, blockSize);
+    Value end = b.create<arith::MinUIOp>(
+        loc, b.create<arith::AddIOp>(loc, start, blockSize), length);
+    return std::make_pair(start, end);
+  };
+
+  // Step 1.
+  SmallVector<Value> blockUbs(outerSizes);
+  blockUbs.push_back(numBlocks);
+  buildParallelLoop(
+      b, loc, SmallVector<Value>(scanDim + 1, zero), blockUbs,
+      [&](OpBuilder &b, Location loc, ValueRange ivs) {
+        ValueRange outer = ivs.drop_back();
+        Value block = ivs.back();
+        Value start, end;
+        std::tie(start, end) = blockBounds(b, loc, block);
+        Value isFirstBlock;
+        if (!isInclusive) {
+          isFirstBlock = b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::eq,
+                                                 block, zero);
+        }
+        forEachInner(b, loc, [&](OpBuilder &b, Location loc, ValueRange inner) {
+          Value first;
+          if (isInclusive) {
+            first = b.create<memref::LoadOp>(loc, input,
+                                             indices(outer, start, inner));
+          } else {
+            first = b.create<scf::IfOp>(
+                         loc, TypeRange{elementType}, isFirstBlock,
+                         [&](OpBuilder &b, Location loc) {
+                           Value init = b.create<memref::LoadOp>(
+                               loc, accumulator, accIndices(outer, inner));
+                           b.create<scf::YieldOp>(loc, init);
+                         },
+                         [&](OpBuilder &b, Location loc) {
+                           b.create<scf::YieldOp>(
+                               loc, loadElement(b, loc, outer, start, inner));
+                         })
+                        .getResult(0);
+          }
+          b.create<memref::StoreOp>(loc, first, output,
+                                    indices(outer, start, inner));
+        });
+        Value second = b.create<arith::AddIOp>(loc, start, one);
+        forLoop(
+            b, loc, second, end, [&](OpBuilder &b, Location loc, Value pos) {
+              Value prevPos = b.create<arith::SubIOp>(loc, pos, one);
+              forEachInner(
+                  b, loc, [&](OpBuilder &b, Location loc, ValueRange inner) {
+                    Value prev = b.create<memref::LoadOp>(
+                        loc, output, indices(outer, prevPos, inner));
+                    Value element = loadElement(b, loc, outer, pos, inner);
+                    Value result = buildScanCombiner(b, op, prev, element);
+                    b.create<memref::StoreOp>(loc, result, output,
+                                              indices(outer, pos, inner));
+                  });
+            });
+      });
+
+  // Steps 2 and 3 only apply if there is more than one block.
+  ArrayRef<int64_t> shape = operandType.getShape();
+  SmallVector<int64_t> carryShape(shape);
+  if (!ShapedType::isDynamic(shape[scanDim]))
+    carryShape[scanDim] = llvm::divideCeil(shape[scanDim], kScanBlockSize);
+  SmallVector<Value> carryDynamicSizes;
+  for (int64_t dim = 0; dim < rank; ++dim) {
+    if (ShapedType::isDynamic(carryShape[dim]))
+      carryDynamicSizes.push_back(dim == scanDim ? numBlocks : sizes[dim]);
+  }
+  Value carries = b.create<memref::AllocOp>(
+      loc, MemRefType::get(carryShape, elementType), carryDynamicSizes);
+  Value hasCarries =
+      b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::ugt, numBlocks, one);
+  b.create<scf::IfOp>(loc, hasCarries, [&](OpBuilder &b, Location loc) {
+    // Step 2.
+    buildParallelLoop(
+        b, loc, SmallVector<Value>(lineSizes.size(), zero), lineSizes,
+        [&](OpBuilder &b, Location loc, ValueRange ivs) {
+          ValueRange outer = ivs.take_front(scanDim);
+          ValueRange inner = ivs.drop_front(scanDim);
+          Value firstLast = b.create<arith::SubIOp>(loc, blockSize, one);
+          Value carry = b.create<memref::LoadOp>(
+              loc, output, indices(outer, firstLast, inner));
+          b.create<scf::ForOp>(
+              loc, one, numBlocks, one, ValueRange{carry},
+              [&](OpBuilder &b, Location loc, Value block, ValueRange args) {
+                Value carry = args.front();
+                b.create<memref::StoreOp>(loc, carry, carries,
+                                          indices(outer, block, inner));
+                Value last = b.create<arith::SubIOp>(
+                    loc, blockBounds(b, loc, block).second, one);
+                Value blockScan = b.create<memref::LoadOp>(
+                    loc, output, indices(outer, last, inner));
+                b.create<scf::YieldOp>(
+                    loc, buildScanCombiner(b, op, carry, blockScan));
+              });
+        });
+
+    // Step 3.
+    SmallVector<Value> carryLbs(scanDim, zero);
+    carryLbs.push_back(one);
+    buildParallelLoop(
+        b, loc, carryLbs, blockUbs,
+        [&](OpBuilder &b, Location loc, ValueRange ivs) {
+          ValueRange outer = ivs.drop_back();
+          Value block = ivs.back();
+          Value start, end;
+          std::tie(start, end) = blockBounds(b, loc, block);
+          forLoop(
+              b, loc, start, end, [&](OpBuilder &b, Location loc, Value pos) {
+                forEachInner(
+                    b, loc, [&](OpBuilder &b, Location loc, ValueRange inner) {
+                      Value carry = b.create<memref::LoadOp>(
+                          loc, carries, indices(outer, block, inner));
+                      Value blockScan = b.create<memref::LoadOp>(
+                          loc, output, indices(outer, pos, inner));
+                      Value result = buildScanCombiner(b, op, carry, blockScan);
+                      b.create<memref::StoreOp>(loc, result, output,
+                                                indices(outer, pos, inner));
+                    });
+              });
+        });
+    b.create<scf::YieldOp>(loc);
+  });
+  b.create<memref::DeallocOp>(loc, carries);
+
+  // Like the sequential lowering, only store the accumulator if the scan
+  // dimension has at least two elements.
+  Value hasAccumulator =
+      b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::ugt, length, one);
+  b.create<scf::IfOp>(loc, hasAccumulator, [&](OpBuilder &b, Location loc) {
+    Value last = b.create<arith::SubIOp>(loc, length, one);
+    buildParallelLoop(b, loc, SmallVector<Value>(lineSizes.size(), zero),
+                      lineSizes,
+                      [&](OpBuilder &b, Location loc, ValueRange ivs) {
+                        ValueRange outer = ivs.take_front(scanDim);
+                        ValueRange inner = ivs.drop_front(scanDim);
+                        Value value = b.create<memref::LoadOp>(
+                            loc, output, indices(outer, last, inner));
+                        b.create<memref::StoreOp>(loc, value, accumulator,
+                                                  accIndices(outer, inner));
+                      });
+    b.create<scf::YieldOp>(loc);
+  });
+}
+
 // Generates naive scalar implementation of scan for a given operator f.
 // For inclusive,
 //     output[0] = input[0]
@@ -505,6 +772,10 @@ bool ScanOp::payloadUsesValueFromOperand(OpOperand *opOperand) {
 
 LogicalResult ScanOp::generateScalarImplementation(OpBuilder &b, Location loc,
                                                    ValueRange ivs) {
+  if (useBlockedScan(*this)) {
+    buildBlockedScan(b, loc, *this);
+    return success();
+  }
   SmallVector<Value> indices, scanBlkArgs;
   indices.append(ivs.begin(), ivs.end());
   Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
@@ -735,10 +1006,59 @@ LogicalResult ScatterOp::verify() {
   return success();
 }
 
+namespace {
+/// A scatter combiner that adds a value to the original element, which
+/// `memref.atomic_rmw` can apply.
+struct AtomicCombiner {
+  arith::AtomicRMWKind kind;
+  /// The value added to the original element: either the `update` block
+  /// argument or a value defined above the region.
+  Value addend;
+};
+} // namespace
+
+/// Returns the atomic equivalent of the combiner of `op`, if it adds the
+/// update (or a value defined above the region, e.g. the constant one of a
+/// bincount) to the original element. Updates combined this way can be
+/// applied in any order, so they do not need to be serialized even if indices
+/// repeat.
+static std::optional<AtomicCombiner> getAtomicCombiner(ScatterOp op) {
+  Region &region = op.getRegion();
+  Block &block = region.front();
+  if (!llvm::hasSingleElement(block.without_terminator()))
+    return std::nullopt;
+  Operation *combiner = &block.front();
+  if (block.getTerminator()->getOperand(0) != combiner->getResult(0))
+    return std::nullopt;
+  std::optional<arith::AtomicRMWKind> kind =
+      TypeSwitch<Operation *, std::optional<arith::AtomicRMWKind>>(combiner)
+          .Case<arith::AddFOp>([](auto) { return arith::AtomicRMWKind::addf; })
+          .Case<arith::AddIOp>([](auto) { return arith::AtomicRMWKind::addi; })
+          .Default([](Operation *) { return std::nullopt; });
+  // LLVM has no atomic read-modify-write on integers narrower than a byte.
+  Type elementType = combiner->getResult(0).getType();
+  if (!kind || !elementType.isIntOrFloat() ||
+      elementType.getIntOrFloatBitWidth() < 8)
+    return std::nullopt;
+
+  Value original = block.getArgument(1);
+  Value lhs = combiner->getOperand(0);
+  Value rhs = combiner->getOperand(1);
+  Value addend = lhs == original ? rhs : lhs;
+  if ((lhs != original && rhs != original) || addend == original)
+    return std::nullopt;
+  if (addend != block.getArgument(0) &&
+      region.isAncestor(addend.getParentRegion()))
+    return std::nullopt;
+  return AtomicCombiner{*kind, addend};
+}
+
 SmallVector<utils::IteratorType> ScatterOp::getLoopIteratorTypes() {
   SmallVector<utils::IteratorType> iteratorTypes(getUpdateType().getRank(),
                                                  utils::IteratorType::parallel);
-  if (!getUniqueIndices()) {
+  // Repeated indices only order the updates if the combiner cannot be applied
+  // atomically.
+  if (!getUniqueIndices() && !getAtomicCombiner(*this)) {
     iteratorTypes[0] = utils::IteratorType::reduction;
   }
   return iteratorTypes;
@@ -809,6 +1129,19 @@ LogicalResult ScatterOp::generateScalarImplementation(OpBuilder &b,
     starts[dim] = ret;
   }
 
+  // Updates to the same element may run concurrently when indices are not
+  // unique: apply them with an atomic read-modify-write.
+  if (!getUniqueIndices()) {
+    if (std::optional<AtomicCombiner> combiner = getAtomicCombiner(*this)) {
+      Value addend = combiner->addend;
+      if (addend == getRegion().getArgument(0))
+        addend = update;
+      b.create<memref::AtomicRMWOp>(loc, addend.getType(), combiner->kind,
+                                    addend, original(), starts);
+      return success();
+    }
+  }
+
   Value init = b.create<memref::LoadOp>(loc, original(), starts);
 
   IRMapping bvm;
@@ -888,11 +1221,10 @@ LogicalResult SortOp::verify() {
 }
 
 SmallVector<utils::IteratorType> SortOp::getLoopIteratorTypes() {
-  // All loops except the dimension to sort along are parallel.
-  SmallVector<utils::IteratorType> iteratorTypes(getOperandRank(),
-                                                 utils::IteratorType::parallel);
-  iteratorTypes[getDimension()] = utils::IteratorType::reduction;
-  return iteratorTypes;
+  // Each iteration sorts a whole slice along the sort dimension, which has a
+  // single iteration (see getIterationDomain), so all loops are parallel.
+  return SmallVector<utils::IteratorType>(getOperandRank(),
+                                          utils::IteratorType::parallel);
 }
 
 SmallVector<Range> SortOp::getIterationDomain(OpBuilder &builder) {
@@ -904,85 +1236,286 @@ SmallVector<Range> SortOp::getIterationDomain(OpBuilder &builder) {
   Value source = operand(0);
   for (auto dim : llvm::seq<int64_t>(0, operandRank)) {
     loopBounds[dim].offset = zero;
-    loopBounds[dim].size = getDimValue(builder, loc, source, dim);
     loopBounds[dim].stride = one;
+    // The scalar implementation sorts a whole slice along the sort dimension,
+    // so there is a single iteration along it.
+    if (dim == getDimension())
+      loopBounds[dim].size = one;
+    else
+      loopBounds[dim].size = getDimValue(builder, loc, source, dim);
   }
   return loopBounds;
 }
 
+// Slices are split into runs of this many elements, which are sorted by
+// insertion sort and then merged pairwise. Statically shaped slices that fit
+// in a single run are sorted in place.
+static constexpr int64_t kSortRunLength = 16;
+
+/// Clones the comparator region of `op` at the insertion point of `b`, with
+/// its arguments bound to `lhs` and `rhs` (one value per output each), and
+/// returns the yielded i1.
+static Value buildSortComparator(OpBuilder &b, SortOp op, ValueRange lhs,
+                                 ValueRange rhs) {
+  Block &srcBlock = op.getRegion().front();
+  IRMapping bvm;
+  for (size_t i = 0, e = lhs.size(); i < e; ++i) {
+    bvm.map(srcBlock.getArgument(2 * i), lhs[i]);
+    bvm.map(srcBlock.getArgument(2 * i + 1), rhs[i]);
+  }
+  for (auto &blockOp : srcBlock.without_terminator())
+    b.clone(blockOp, bvm);
+  return bvm.lookupOrDefault(srcBlock.getTerminator()->getOperand(0));
+}
+
+/// Returns whether `lhs` has to be placed before `rhs`: the comparator orders
+/// them this way but not the other way around. Elements that are equivalent
+/// under the comparator, be it strict (`<`) or not (`<=`), are never moved
+/// past each other, which keeps the sort stable.
+static Value buildSortPrecedes(OpBuilder &b, Location loc, SortOp op,
+                               ValueRange lhs, ValueRange rhs) {
+  Value forward = buildSortComparator(b, op, lhs, rhs);
+  Value reverse = buildSortComparator(b, op, rhs, lhs);
+  Value trueValue = b.create<arith::ConstantOp>(loc, b.getBoolAttr(true));
+  Value notReverse = b.create<arith::XOrIOp>(loc, reverse, trueValue);
+  return b.create<arith::AndIOp>(loc, forward, notReverse);
+}
+
+namespace {
+/// The elements at the same position of a slice of several buffers (e.g. the
+/// outputs of a sort op, or scratch copies of them).
+struct SortSlice {
+  ValueRange buffers;
+  function_ref<SmallVector<Value>(Value)> getIndices;
+
+  SmallVector<Value> load(OpBuilder &b, Location loc, Value pos) const {
+    SmallVector<Value> values;
+    for (Value buffer : buffers)
+      values.push_back(b.create<memref::LoadOp>(loc, buffer, getIndices(pos)));
+    return values;
+  }
+
+  void store(OpBuilder &b, Location loc, ValueRange values, Value pos) const {
+    for (auto [value, buffer] : llvm::zip_equal(values, buffers))
+      b.create<memref::StoreOp>(loc, value, buffer, getIndices(pos));
+  }
+};
+
+/// Builds an i1 that is true if the elements `lhs` have to be placed before
+/// the elements `rhs`.
+using SortPrecedesFn =
+    function_ref<Value(OpBuilder &, Location, ValueRange, ValueRange)>;
+} // namespace
+
+/// Sorts each run of `runLength` consecutive elements of the first `size`
+/// elements of `slice` with a stable insertion sort.
+static void buildInsertionSortRuns(OpBuilder &b, Location loc,
+                                   SortPrecedesFn precedes,
+                                   const SortSlice &slice, Value size,
+                                   Value runLength) {
+  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  b.create<scf::ForOp>(
+      loc, zero, size, runLength, ValueRange{},
+      [&](OpBuilder &b, Location loc, Value runStart, ValueRange iters) {
+        Value runEnd = b.create<arith::MinSIOp>(
+            loc, b.create<arith::AddIOp>(loc, runStart, runLength), size);
+        Value second = b.create<arith::AddIOp>(loc, runStart, one);
+        b.create<scf::ForOp>(
+            loc, second, runEnd, one, ValueRange{},
+            [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+              SmallVector<Value> key = slice.load(b, loc, iv);
+              // Shift the elements `key` has to precede up by one position.
+              auto whileOp = b.create<scf::WhileOp>(
+                  loc, TypeRange{b.getIndexType()}, ValueRange{iv},
+                  [&](OpBuilder &b, Location loc, ValueRange args) {
+                    Value pos = args[0];
+                    Value notFirst = b.create<arith::CmpIOp>(
+                        loc, arith::CmpIPredicate::ugt, pos, runStart);
+                    auto ifOp = b.create<scf::IfOp>(
+                        loc, notFirst,
+                        [&](OpBuilder &b, Location loc) {
+                          Value prev = b.create<arith::SubIOp>(loc, pos, one);
+                          Value keyPrecedes =
+                              precedes(b, loc, key, slice.load(b, loc, prev));
+                          b.create<scf::YieldOp>(loc, keyPrecedes);
+                        },
+                        [&](OpBuilder &b, Location loc) {
+                          Value falseValue = b.create<arith::ConstantOp>(
+                              loc, b.getBoolAttr(false));
+                          b.create<scf::YieldOp>(loc, falseValue);
+                        });
+                    b.create<scf::ConditionOp>(loc, ifOp.getResult(0), args);
+                  },
+                  [&](OpBuilder &b, Location loc, ValueRange args) {
+                    Value prev = b.create<arith::SubIOp>(loc, args[0], one);
+                    slice.store(b, loc, slice.load(b, loc, prev), args[0]);
+                    b.create<scf::YieldOp>(loc, prev);
+                  });
+              slice.store(b, loc, key, whileOp.getResult(0));
+              b.create<scf::YieldOp>(loc);
+            });
+        b.create<scf::YieldOp>(loc);
+      });
+}
+
+/// Merges every pair of adjacent sorted runs of `width` elements of `src` into
+/// `dst`. On ties the element of the first run is taken first.
+static void buildMergePass(OpBuilder &b, Location loc, SortPrecedesFn precedes,
+                           const SortSlice &src, const SortSlice &dst,
+                           Value size, Value width) {
+  Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  Value twiceWidth = b.create<arith::AddIOp>(loc, width, width);
+  b.create<scf::ForOp>(
+      loc, zero, size, twiceWidth, ValueRange{},
+      [&](OpBuilder &b, Location loc, Value lo, ValueRange iters) {
+        Value mid = b.create<arith::MinSIOp>(
+            loc, b.create<arith::AddIOp>(loc, lo, width), size);
+        Value hi = b.create<arith::MinSIOp>(
+            loc, b.create<arith::AddIOp>(loc, lo, twiceWidth), size);
+        b.create<scf::ForOp>(
+            loc, lo, hi, one, ValueRange{lo, mid},
+            [&](OpBuilder &b, Location loc, Value pos, ValueRange iters) {
+              Value left = iters[0];
+              Value right = iters[1];
+              Value hasLeft = b.create<arith::CmpIOp>(
+                  loc, arith::CmpIPredicate::ult, left, mid);
+              Value hasRight = b.create<arith::CmpIOp>(
+                  loc, arith::CmpIPredicate::ult, right, hi);
+              Value hasBoth = b.create<arith::AndIOp>(loc, hasLeft, hasRight);
+              auto ifOp = b.create<scf::IfOp>(
+                  loc, hasBoth,
+                  [&](OpBuilder &b, Location loc) {
+                    Value rightPrecedes =
+                        precedes(b, loc, src.load(b, loc, right),
+                                 src.load(b, loc, left));
+                    b.create<scf::YieldOp>(loc, rightPrecedes);
+                  },
+                  [&](OpBuilder &b, Location loc) {
+                    // Only one of the runs has elements left.
+                    Value leftDone = b.create<arith::CmpIOp>(
+                        loc, arith::CmpIPredicate::uge, left, mid);
+                    b.create<scf::YieldOp>(loc, leftDone);
+                  });
+              Value takeRight = ifOp.getResult(0);
+              Value from =
+                  b.create<arith::SelectOp>(loc, takeRight, right, left);
+              dst.store(b, loc, src.load(b, loc, from), pos);
+              Value nextLeft = b.create<arith::SelectOp>(
+                  loc, takeRight, left,
+                  b.create<arith::AddIOp>(loc, left, one));
+              Value nextRight = b.create<arith::SelectOp>(
+                  loc, takeRight, b.create<arith::AddIOp>(loc, right, one),
+                  right);
+              b.create<scf::YieldOp>(loc, ValueRange{nextLeft, nextRight});
+            });
+        b.create<scf::YieldOp>(loc);
+      });
+}
+
+/// Sorts the first `size` elements of the 1-D `buffers` in O(n log n): their
+/// runs of `runLength` elements are sorted by insertion sort and then merged
+/// pairwise, alternating with `otherBuffers` (of the same types), until a
+/// single run remains. Returns whichever of the two sets of buffers holds the
+/// sorted elements.
+static SmallVector<Value> buildMergeSort(OpBuilder &b, Location loc,
+                                         SortPrecedesFn precedes,
+                                         ValueRange buffers,
+                                         ValueRange otherBuffers, Value size,
+                                         Value runLength) {
+  auto getIndices = [](Value pos) { return SmallVector<Value>{pos}; };
+  buildInsertionSortRuns(b, loc, precedes, SortSlice{buffers, getIndices}, size,
+                         runLength);
+
+  // Each iteration merges runs of `width` elements from the first set of
+  // buffers into the second one, then swaps them.
+  size_t numBuffers = buffers.size();
+  SmallVector<Value> initArgs{runLength};
+  llvm::append_range(initArgs, buffers);
+  llvm::append_range(initArgs, otherBuffers);
+  auto whileOp = b.create<scf::WhileOp>(
+      loc, ValueRange(initArgs).getTypes(), initArgs,
+      [&](OpBuilder &b, Location loc, ValueRange args) {
+        Value notDone = b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::ult,
+                                                args[0], size);
+        b.create<scf::ConditionOp>(loc, notDone, args);
+      },
+      [&](OpBuilder &b, Location loc, ValueRange args) {
+        Value width = args[0];
+        ValueRange src = args.slice(1, numBuffers);
+        ValueRange dst = args.slice(1 + numBuffers, numBuffers);
+        buildMergePass(b, loc, precedes, SortSlice{src, getIndices},
+                       SortSlice{dst, getIndices}, size, width);
+        SmallVector<Value> nextArgs{b.create<arith::AddIOp>(loc, width, width)};
+        llvm::append_range(nextArgs, dst);
+        llvm::append_range(nextArgs, src);
+        b.create<scf::YieldOp>(loc, nextArgs);
+      });
+  return llvm::to_vector(whileOp.getResults().slice(1, numBuffers));
+}
+
 LogicalResult SortOp::generateScalarImplementation(OpBuilder &b, Location loc,
                                                    ValueRange ivs) {
   auto sortDim = getDimension();
-  SmallVector<Value> indices, sortBlkArgs;
-  indices.append(ivs.begin(), ivs.end());
-  // Bubble sort innermost loop.
   Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
   Value one = b.create<arith::ConstantIndexOp>(loc, 1);
-  Value ub;
-  if (getOperandType(0).isDynamicDim(sortDim)) {
-    ub = b.create<memref::DimOp>(loc, operand(0), sortDim);
+  Value runLength = b.create<arith::ConstantIndexOp>(loc, kSortRunLength);
+  int64_t staticSize = getOperandType(0).getDimSize(sortDim);
+  Value size;
+  if (ShapedType::isDynamic(staticSize)) {
+    size = b.create<memref::DimOp>(loc, operand(0), sortDim);
   } else {
-    ub = b.create<arith::ConstantIndexOp>(
-        loc, getOperandType(0).getDimSize(sortDim));
-  }
-  ub = b.create<arith::SubIOp>(loc, ub, one);
-  auto scfFor = b.create<scf::ForOp>(
-      loc, zero, ub, one, ValueRange{},
-      [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
-        SmallVector<Value> indices(ivs);
-        Value ivPlusOne = b.create<arith::AddIOp>(loc, iv, one);
-        for (auto output : getOutputOperands()) {
-          indices[sortDim] = iv;
-          sortBlkArgs.push_back(
-              b.create<memref::LoadOp>(loc, output->get(), indices));
-          indices[sortDim] = ivPlusOne;
-          sortBlkArgs.push_back(
-              b.create<memref::LoadOp>(loc, output->get(), indices));
-        }
-      });
+    size = b.create<arith::ConstantIndexOp>(loc, staticSize);
+  }
 
-  auto &srcBlock = getRegion().front();
-  Region &region = scfFor.getRegion();
-  IRMapping bvm;
-  {
-    OpBuilder::InsertionGuard guard(b);
-    auto &block = region.front();
-    b.setInsertionPointToEnd(&block);
-    for (auto it : llvm::zip(srcBlock.getArguments(), sortBlkArgs)) {
-      bvm.map(std::get<0>(it), std::get<1>(it));
-    }
-    for (auto &blockOp : srcBlock.without_terminator()) {
-      b.clone(blockOp, bvm);
-    }
+  SmallVector<Value> outputs;
+  for (auto output : getOutputOperands())
+    outputs.push_back(output->get());
+  auto getOutputIndices = [&](Value pos) {
+    SmallVector<Value> indices(ivs);
+    indices[sortDim] = pos;
+    return indices;
+  };
+  SortSlice outputSlice{outputs, getOutputIndices};
+
+  auto precedes = [&](OpBuilder &b, Location loc, ValueRange lhs,
+                      ValueRange rhs) {
+    return buildSortPrecedes(b, loc, *this, lhs, rhs);
+  };
+
+  if (!ShapedType::isDynamic(staticSize) && staticSize <= kSortRunLength) {
+    buildInsertionSortRuns(b, loc, precedes, outputSlice, size, runLength);
+    return success();
   }
-  Value cond = bvm.lookupOrDefault(srcBlock.getTerminator()->getOperand(0));
 
-  OpBuilder::InsertionGuard g(b);
-  b.setInsertionPointToEnd(&region.front());
-  b.create<scf::IfOp>(
-      loc, cond,
-      [&](OpBuilder &b, Location loc) {
-        // Do not swap the pairs if true.
-        b.create<scf::YieldOp>(loc);
-      },
-      [&](OpBuilder &b, Location loc) {
-        // Swap the pairs if false.
-        SmallVector<Value> indices(ivs.begin(), ivs.end());
-        Value ivPlusOne =
-            b.create<arith::AddIOp>(loc, scfFor.getInductionVar(), one);
-        for (int i = 0, e = getNumOutputs(); i < e; ++i) {
-          Value v1 = sortBlkArgs[i * 2];
-          Value v2 = sortBlkArgs[i * 2 + 1];
-          indices[sortDim] = scfFor.getInductionVar();
-          b.create<memref::StoreOp>(loc, v2, getOutputOperand(i)->get(),
-                                    indices);
-          indices[sortDim] = ivPlusOne;
-          b.create<memref::StoreOp>(loc, v1, getOutputOperand(i)->get(),
-                                    indices);
-        }
-        b.create<scf::YieldOp>(loc);
-      });
-  b.create<scf::YieldOp>(loc);
+  // Longer slices are copied to contiguous scratch buffers, sorted there and
+  // copied back.
+  SmallVector<Value> scratch, otherScratch, dynSizes;
+  if (ShapedType::isDynamic(staticSize))
+    dynSizes.push_back(size);
+  for (Value output : outputs) {
+    auto type = MemRefType::get(
+        {staticSize}, cast<MemRefType>(output.getType()).getElementType());
+    scratch.push_back(b.create<memref::AllocOp>(loc, type, dynSizes));
+    otherScratch.push_back(b.create<memref::AllocOp>(loc, type, dynSizes));
+  }
+  auto getScratchIndices = [](Value pos) { return SmallVector<Value>{pos}; };
+  auto copy = [&](const SortSlice &src, const SortSlice &dst) {
+    b.create<scf::ForOp>(
+        loc, zero, size, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value pos, ValueRange iters) {
+          dst.store(b, loc, src.load(b, loc, pos), pos);
+          b.create<scf::YieldOp>(loc);
+        });
+  };
+  copy(outputSlice, SortSlice{scratch, getScratchIndices});
+  SmallVector<Value> sorted =
+      buildMergeSort(b, loc, precedes, scratch, otherScratch, size, runLength);
+  copy(SortSlice{sorted, getScratchIndices}, outputSlice);
+
+  for (Value buffer : llvm::concat<Value>(scratch, otherScratch))
+    b.create<memref::DeallocOp>(loc, buffer);
   return success();
 }
 
@@ -1076,10 +1609,11 @@ LogicalResult TopkOp::verify() {
 }
 
 SmallVector<utils::IteratorType> TopkOp::getLoopIteratorTypes() {
-  SmallVector<utils::IteratorType> iteratorTypes(getInputRank(),
-                                                 utils::IteratorType::parallel);
-  iteratorTypes[getDimension()] = utils::IteratorType::reduction;
-  return iteratorTypes;
+  // Each iteration reduces a whole slice along the reduced dimension, which
+  // has a single iteration (see getIterationDomain), so all loops are
+  // parallel.
+  return SmallVector<utils::IteratorType>(getInputRank(),
+                                          utils::IteratorType::parallel);
 }
 
 SmallVector<Range> TopkOp::getIterationDomain(OpBuilder &builder) {
@@ -1089,108 +1623,252 @@ SmallVector<Range> TopkOp::getIterationDomain(OpBuilder &builder) {
   Value zero = builder.create<arith::ConstantIndexOp>(loc, 0);
   Value one = builder.create<arith::ConstantIndexOp>(loc, 1);
   Value source = values();
-  for (auto dim : llvm::enumerate(getInputType().getShape())) {
-    loopBounds[dim.index()].offset = zero;
-    loopBounds[dim.index()].size =
-        getDimValue(builder, loc, source, dim.index());
-    loopBounds[dim.index()].stride = one;
+  for (auto dim : llvm::seq<int64_t>(0, operandRank)) {
+    loopBounds[dim].offset = zero;
+    loopBounds[dim].stride = one;
+    // The scalar implementation selects the top k elements of a whole slice
+    // along the reduced dimension, so there is a single iteration along it.
+    if (dim == static_cast<int64_t>(getDimension()))
+      loopBounds[dim].size = one;
+    else
+      loopBounds[dim].size = getDimValue(builder, loc, source, dim);
   }
   return loopBounds;
 }
 
+// The top k elements of a slice are selected by sorting all of them, instead
+// of keeping a heap of the k best ones, when k is at least 1/kTopkSortRatio of
+// the slice size.
+static constexpr int64_t kTopkSortRatio = 4;
+
+/// Returns whether the (value, index) pair `lhs` ranks before `rhs`: the
+/// region orders their values this way, or it does not order them and `lhs`
+/// has the lower index.
+static Value buildTopkPrecedes(OpBuilder &b, Location loc, TopkOp op,
+                               ValueRange lhs, ValueRange rhs) {
+  Block &srcBlock = op.getRegion().front();
+  auto compare = [&](Value x, Value y) {
+    IRMapping bvm;
+    bvm.map(srcBlock.getArgument(0), x);
+    bvm.map(srcBlock.getArgument(1), y);
+    for (auto &blockOp : srcBlock.without_terminator())
+      b.clone(blockOp, bvm);
+    return bvm.lookupOrDefault(srcBlock.getTerminator()->getOperand(0));
+  };
+  Value forward = compare(lhs[0], rhs[0]);
+  Value reverse = compare(rhs[0], lhs[0]);
+  Value equivalent =
+      b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::eq, forward, reverse);
+  Value lowerIndex =
+      b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::slt, lhs[1], rhs[1]);
+  Value tieBreak = b.create<arith::AndIOp>(loc, equivalent, lowerIndex);
+  return b.create<arith::OrIOp>(loc, forward, tieBreak);
+}
+
+/// Swaps the elements at `lhs` and `rhs` of `slice`.
+static void buildSwap(OpBuilder &b, Location loc, const SortSlice &slice,
+                      Value lhs, Value rhs) {
+  SmallVector<Value> lhsValues = slice.load(b, loc, lhs);
+  SmallVector<Value> rhsValues = slice.load(b, loc, rhs);
+  slice.store(b, loc, rhsValues, lhs);
+  slice.store(b, loc, lhsValues, rhs);
+}
+
+/// Moves the element at `start` of the heap made of the first `size` elements
+/// of `heap` down until it ranks before neither of its children. The root of
+/// the heap is the element every other one ranks before.
+static void buildSiftDown(OpBuilder &b, Location loc, SortPrecedesFn precedes,
+                          const SortSlice &heap, Value start, Value size) {
+  Value one = b.create<arith::ConstantIndexOp>(loc, 1);
+  Value two = b.create<arith::ConstantIndexOp>(loc, 2);
+  Type indexType = b.getIndexType();
+  b.create<scf::WhileOp>(
+      loc, TypeRange{indexType, indexType}, ValueRange{start},
+      [&](OpBuilder &b, Location loc, ValueRange args) {
+        Value pos = args[0];
+        Value left = b.create<arith::AddIOp>(
+            loc, b.create<arith::MulIOp>(loc, pos, two), one);
+        Value hasLeft =
+            b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::ult, left, size);
+        auto ifOp = b.create<scf::IfOp>(
+            loc, hasLeft,
+            [&](OpBuilder &b, Location loc) {
+              Value right = b.create<arith::AddIOp>(loc, left, one);
+              Value hasRight = b.create<arith::CmpIOp>(
+                  loc, arith::CmpIPredicate::ult, right, size);
+              // The child ranking last.
+              auto childOp = b.create<scf::IfOp>(
+                  loc, hasRight,
+                  [&](OpBuilder &b, Location loc) {
+                    Value leftPrecedes =
+                        precedes(b, loc, heap.load(b, loc, left),
+                                 heap.load(b, loc, right));
+                    Value child = b.create<arith::SelectOp>(loc, leftPrecedes,
+                                                            right, left);
+                    b.create<scf::YieldOp>(loc, child);
+                  },
+                  [&](OpBuilder &b, Location loc) {
+                    b.create<scf::YieldOp>(loc, left);
+                  });
+              Value child = childOp.getResult(0);
+              Value swap = precedes(b, loc, heap.load(b, loc, pos),
+                                    heap.load(b, loc, child));
+              b.create<scf::YieldOp>(loc, ValueRange{swap, child});
+            },
+            [&](OpBuilder &b, Location loc) {
+              Value falseValue =
+                  b.create<arith::ConstantOp>(loc, b.getBoolAttr(false));
+              b.create<scf::YieldOp>(loc, ValueRange{falseValue, pos});
+            });
+        b.create<scf::ConditionOp>(loc, ifOp.getResult(0),
+                                   ValueRange{pos, ifOp.getResult(1)});
+      },
+      [&](OpBuilder &b, Location loc, ValueRange args) {
+        buildSwap(b, loc, heap, args[0], args[1]);
+        b.create<scf::YieldOp>(loc, args[1]);
+      });
+}
+
 LogicalResult TopkOp::generateScalarImplementation(OpBuilder &b, Location loc,
                                                    ValueRange ivs) {
   uint64_t kDim = getDimension();
   Value zero = b.create<arith::ConstantIndexOp>(loc, 0);
   Value one = b.create<arith::ConstantIndexOp>(loc, 1);
-  Value initialValue = b.create<memref::LoadOp>(loc, values(), ivs);
+  Value n = getDimValue(b, loc, values(), kDim);
+  Value k = getDimValue(b, loc, outputValues(), kDim);
 
-  // If the indices tensor is not provided, the value index is derived from the
-  // loop induction variables.
-  Value initialIndex;
-  if (indices()) {
-    initialIndex = b.create<memref::LoadOp>(loc, *indices(), ivs);
-  } else {
-    Value rawInitialIndex = ivs[kDim];
-    initialIndex =
-        b.create<arith::IndexCastOp>(loc, b.getI32Type(), rawInitialIndex);
-  }
-
-  // Compute K (ub) from the selected dim of the output
-  Value ub = b.create<memref::DimOp>(loc, outputValues(), getDimension());
-
-  // Inner K loop functions:
-  //   Load current K value and index
-  //   Compare N/K using inserted block compare
-  //   Check if N == K using strict weak ordering, select which index came first
-  //   Select new K value from N/K comparison
-  //   Select new K index from N/K comparison or which index came first
-  //   Store new k value and index
-  //   Yield loop carry values after K selection
-  Value kValue, kIndex;
-  auto scfFor = b.create<scf::ForOp>(
-      loc, zero, ub, one, ValueRange{initialValue, initialIndex},
-      [&](OpBuilder &b, Location loc, Value iv, ValueRange loopCarryValues) {
-        SmallVector<Value> indices(ivs);
-        indices[kDim] = iv;
-        kValue = b.create<memref::LoadOp>(loc, outputValues(), indices);
-        kIndex = b.create<memref::LoadOp>(loc, outputIndices(), indices);
-      });
+  auto getSliceIndices = [&](Value pos) {
+    SmallVector<Value> indices(ivs);
+    indices[kDim] = pos;
+    return indices;
+  };
+  SmallVector<Value> outputs{outputValues(), outputIndices()};
+  SortSlice outputSlice{outputs, getSliceIndices};
+  // Loads the input value at `pos` and its index.
+  auto loadInput = [&](OpBuilder &b, Location loc, Value pos) {
+    SmallVector<Value> loadIndices = getSliceIndices(pos);
+    Value value = b.create<memref::LoadOp>(loc, values(), loadIndices);
+    // If the indices tensor is not provided, the value index is derived from
+    // the position along the reduced dimension.
+    Value index;
+    if (indices()) {
+      index = b.create<memref::LoadOp>(loc, *indices(), loadIndices);
+    } else {
+      index = b.create<arith::IndexCastOp>(loc, b.getI32Type(), pos);
+    }
+    return SmallVector<Value>{value, index};
+  };
+  auto precedes = [&](OpBuilder &b, Location loc, ValueRange lhs,
+                      ValueRange rhs) {
+    return buildTopkPrecedes(b, loc, *this, lhs, rhs);
+  };
 
-  SmallVector<Value> indices(ivs);
-  indices[kDim] = scfFor.getInductionVar();
-  auto loopCarryValues = scfFor.getRegionIterArgs();
+  // The candidates are the initial contents of the outputs and the inputs.
+  // O(n log k): the outputs are kept as a heap rooted at the candidate
+  // ranking last, which is replaced by every input ranking before it. The
+  // heap is finally sorted in place.
+  auto buildHeapSelect = [&](OpBuilder &b, Location loc) {
+    Value two = b.create<arith::ConstantIndexOp>(loc, 2);
+    Value half = b.create<arith::DivUIOp>(loc, k, two);
+    b.create<scf::ForOp>(
+        loc, zero, half, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          Value start = b.create<arith::SubIOp>(
+              loc, b.create<arith::SubIOp>(loc, half, iv), one);
+          buildSiftDown(b, loc, precedes, outputSlice, start, k);
+          b.create<scf::YieldOp>(loc);
+        });
+    Value hasOutputs =
+        b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::ugt, k, zero);
+    Value numInputs = b.create<arith::SelectOp>(loc, hasOutputs, n, zero);
+    b.create<scf::ForOp>(
+        loc, zero, numInputs, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          SmallVector<Value> candidate = loadInput(b, loc, iv);
+          Value replaceRoot =
+              precedes(b, loc, candidate, outputSlice.load(b, loc, zero));
+          b.create<scf::IfOp>(
+              loc, replaceRoot, [&](OpBuilder &b, Location loc) {
+                outputSlice.store(b, loc, candidate, zero);
+                buildSiftDown(b, loc, precedes, outputSlice, zero, k);
+                b.create<scf::YieldOp>(loc);
+              });
+          b.create<scf::YieldOp>(loc);
+        });
+    b.create<scf::ForOp>(
+        loc, one, k, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          Value end = b.create<arith::SubIOp>(loc, k, iv);
+          buildSwap(b, loc, outputSlice, zero, end);
+          buildSiftDown(b, loc, precedes, outputSlice, zero, end);
+          b.create<scf::YieldOp>(loc);
+        });
+  };
 
-  // Retrieve region as black box comparision function f(x,y). Plug into op.
-  auto &srcBlock = getRegion().front();
-  IRMapping bvmF; // f(x,y)
-  IRMapping bvmR; // f(y,x)
-  {
-    // Save previous insertion point. Continue within loop body.
-    OpBuilder::InsertionGuard guard(b);
-    b.setInsertionPointToEnd(&scfFor.getRegion().front());
-    SmallVector<Value> forwardValues{loopCarryValues[0], kValue};
-    SmallVector<Value> reverseValues{kValue, loopCarryValues[0]};
-    for (auto it : llvm::zip(srcBlock.getArguments(), forwardValues)) {
-      bvmF.map(std::get<0>(it), std::get<1>(it));
-    }
-    for (auto it : llvm::zip(srcBlock.getArguments(), reverseValues)) {
-      bvmR.map(std::get<0>(it), std::get<1>(it));
+  // O((n + k) log (n + k)): all candidates are merge sorted in scratch
+  // buffers and the first k are copied back.
+  auto buildSortSelect = [&](OpBuilder &b, Location loc) {
+    Value total = b.create<arith::AddIOp>(loc, k, n);
+    SmallVector<Value> scratch, otherScratch;
+    for (Value output : outputs) {
+      auto type =
+          MemRefType::get({ShapedType::kDynamic},
+                          cast<MemRefType>(output.getType()).getElementType());
+      scratch.push_back(b.create<memref::AllocOp>(loc, type, total));
+      otherScratch.push_back(b.create<memref::AllocOp>(loc, type, total));
     }
-    for (auto &blockOp : srcBlock.without_terminator()) {
-      b.clone(blockOp, bvmF);
-      b.clone(blockOp, bvmR);
-    }
-    Value forwardCmpRes = bvmF.lookup(srcBlock.getTerminator()->getOperand(0));
-    Value reverseCmpRes = bvmR.lookup(srcBlock.getTerminator()->getOperand(0));
-
-    // Check value equality using strictly weak ordering from the region:
-    //   f(x,y) --> forwardCmpRes
-    //   f(y,x) --> reverseCmpRes
-    //   if forwardCmpRes == reverseCmpRes then select which came first
-    Value cmpValuesEqual = b.create<arith::CmpIOp>(
-        loc, arith::CmpIPredicate::eq, forwardCmpRes, reverseCmpRes);
-    Value cmpFirstIndex = b.create<arith::CmpIOp>(
-        loc, arith::CmpIPredicate::slt, loopCarryValues[1], kIndex);
-    Value combinedCmpEqRes =
-        b.create<arith::AndIOp>(loc, cmpValuesEqual, cmpFirstIndex);
-    // True if N > K or N came before K
-    Value indexCmpRes =
-        b.create<arith::OrIOp>(loc, forwardCmpRes, combinedCmpEqRes);
-    // Select results for K based on comparisons
-    Value resultKValue = b.create<arith::SelectOp>(loc, forwardCmpRes,
-                                                   loopCarryValues[0], kValue);
-    Value resultKIndex =
-        b.create<arith::SelectOp>(loc, indexCmpRes, loopCarryValues[1], kIndex);
-    b.create<memref::StoreOp>(loc, resultKValue, outputValues(), indices);
-    b.create<memref::StoreOp>(loc, resultKIndex, outputIndices(), indices);
-    // Select loop carry, opposite of K results
-    Value resultCarryValue = b.create<arith::SelectOp>(
-        loc, forwardCmpRes, kValue, loopCarryValues[0]);
-    Value resultCarryIndex =
-        b.create<arith::SelectOp>(loc, indexCmpRes, kIndex, loopCarryValues[1]);
-    b.create<scf::YieldOp>(loc, ValueRange{resultCarryValue, resultCarryIndex});
+    auto getScratchIndices = [](Value pos) { return SmallVector<Value>{pos}; };
+    SortSlice scratchSlice{scratch, getScratchIndices};
+    b.create<scf::ForOp>(
+        loc, zero, k, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          scratchSlice.store(b, loc, outputSlice.load(b, loc, iv), iv);
+          b.create<scf::YieldOp>(loc);
+        });
+    b.create<scf::ForOp>(
+        loc, zero, n, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          Value pos = b.create<arith::AddIOp>(loc, k, iv);
+          scratchSlice.store(b, loc, loadInput(b, loc, iv), pos);
+          b.create<scf::YieldOp>(loc);
+        });
+    Value runLength = b.create<arith::ConstantIndexOp>(loc, kSortRunLength);
+    SmallVector<Value> sorted = buildMergeSort(b, loc, precedes, scratch,
+                                               otherScratch, total, runLength);
+    SortSlice sortedSlice{sorted, getScratchIndices};
+    b.create<scf::ForOp>(
+        loc, zero, k, one, ValueRange{},
+        [&](OpBuilder &b, Location loc, Value iv, ValueRange iters) {
+          outputSlice.store(b, loc, sortedSlice.load(b, loc, iv), iv);
+          b.create<scf::YieldOp>(loc);
+        });
+    for (Value buffer : llvm::concat<Value>(scratch, otherScratch))
+      b.create<memref::DeallocOp>(loc, buffer);
+  };
+
+  int64_t staticN = getInputType().getDimSize(kDim);
+  int64_t staticK = cast<ShapedType>(outputValues().getType()).getDimSize(kDim);
+  if (!ShapedType::isDynamic(staticN) && !ShapedType::isDynamic(staticK)) {
+    if (staticK * kTopkSortRatio >= staticN)
+      buildSortSelect(b, loc);
+    else
+      buildHeapSelect(b, loc);
+    return success();
   }
+  Value ratio = b.create<arith::ConstantIndexOp>(loc, kTopkSortRatio);
+  Value useSort =
+      b.create<arith::CmpIOp>(loc, arith::CmpIPredicate::uge,
+                              b.create<arith::MulIOp>(loc, k, ratio), n);
+  b.create<scf::IfOp>(
+      loc, useSort,
+      [&](OpBuilder &b, Location loc) {
+        buildSortSelect(b, loc);
+        b.create<scf::YieldOp>(loc);
+      },
+      [&](OpBuilder &b, Location loc) {
+        buildHeapSelect(b, loc);
+        b.create<scf::YieldOp>(loc);
+      });
   return success();
 }
 
@@ -58,12 +58,45 @@ static LogicalResult lowerToLoopsImpl(OpBuilder &builder,
   return status;
 }
 
-/// Main entry point for lowering `ScalarLoopOpInterface` op to loops.
+/// Main entry point for lowering `ScalarLoopOpInterface` op to loops. The
+/// outermost loops up to the first non-parallel one are emitted as a single
+/// `scf.parallel` (which later passes may distribute across threads); the
+/// remaining loops are emitted as `scf.for`.
 static LogicalResult lowerToLoops(OpBuilder &builder,
                                   ScalarLoopOpInterface scalarLoopOp) {
   SmallVector<Range> loopBounds = scalarLoopOp.getIterationDomain(builder);
+  SmallVector<utils::IteratorType> iteratorTypes =
+      scalarLoopOp.getLoopIteratorTypes();
+  unsigned numParallel = 0;
+  while (numParallel < loopBounds.size() &&
+         numParallel < iteratorTypes.size() &&
+         iteratorTypes[numParallel] == utils::IteratorType::parallel) {
+    ++numParallel;
+  }
   SmallVector<Value> ivs;
-  return lowerToLoopsImpl(builder, scalarLoopOp, loopBounds, 0, ivs);
+  if (numParallel == 0) {
+    return lowerToLoopsImpl(builder, scalarLoopOp, loopBounds, 0, ivs);
+  }
+
+  Location loc = scalarLoopOp.getLoc();
+  SmallVector<Value> offsets, sizes, strides;
+  for (const Range &range :
+       ArrayRef<Range>(loopBounds).take_front(numParallel)) {
+    offsets.push_back(
+        getValueOrCreateConstantIndexOp(builder, loc, range.offset));
+    sizes.push_back(getValueOrCreateConstantIndexOp(builder, loc, range.size));
+    strides.push_back(
+        getValueOrCreateConstantIndexOp(builder, loc, range.stride));
+  }
+  LogicalResult status = success();
+  builder.create<scf::ParallelOp>(
+      loc, offsets, sizes, strides,
+      [&](OpBuilder &b, Location loc, ValueRange parallelIvs) {
+        ivs.append(parallelIvs.begin(), parallelIvs.end());
+        status =
+            lowerToLoopsImpl(b, scalarLoopOp, loopBounds, numParallel, ivs);
+      });
+  return status;
 }
 
 /// Pattern rewriter hook to lower a `ScalarLoopOpInterface` to loops.
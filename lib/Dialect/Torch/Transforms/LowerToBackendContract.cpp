@@ -11,6 +11,7 @@
 
 #include "mlir/IR/BuiltinOps.h"
 #include "mlir/Pass/PassManager.h"
+#include "mlir/Pass/PassRegistry.h"
 #include "mlir/Transforms/DialectConversion.h"
 #include "torch-mlir/Dialect/Torch/IR/TorchDialect.h"
 #include "torch-mlir/Dialect/Torch/IR/TorchOps.h"
@@ -18,6 +19,9 @@
 #include "torch-mlir/Dialect/Torch/Utils/Utils.h"
 #include "llvm/ADT/StringSet.h"
 #include "llvm/Support/Debug.h"
+#include "llvm/Support/JSON.h"
+
+#include <chrono>
 
 #define DEBUG_TYPE "torch-lower-to-backend-contract"
 
@@ -172,6 +176,10 @@ static LogicalResult checkOpIsBackendLegal(Operation *op,
   }
 }
 
+static bool opsSatisfyBackendContract(Operation *root,
+                                      const ConversionTarget &target,
+                                      bool actuallyEmitDiagnostics);
+
 static bool satisfiesBackendContract(ModuleOp module,
                                      const ConversionTarget &target,
                                      bool actuallyEmitDiagnostics = false) {
@@ -198,8 +206,17 @@ static bool satisfiesBackendContract(ModuleOp module,
   if (walkResult0.wasInterrupted())
     return false;
 
+  return opsSatisfyBackendContract(module, target, actuallyEmitDiagnostics);
+}
+
+// Checks the ops (and block arguments) nested in `root` against the backend
+// contract. Unlike `satisfiesBackendContract`, this does not check for module
+// level constructs, so it can be applied to individual functions.
+static bool opsSatisfyBackendContract(Operation *root,
+                                      const ConversionTarget &target,
+                                      bool actuallyEmitDiagnostics) {
   // Check for unimplemented operators first to give more direct diagnostics.
-  walkResult0 = module.walk([&](Torch::OperatorOp op) {
+  auto walkResult0 = root->walk([&](Torch::OperatorOp op) {
     if (llvm::all_of(op.getResults(), [&op](auto res) {
           return succeeded(checkType(op.getOperation(), res.getType(),
                                      /*actuallyEmitDiagnostics=*/false));
@@ -223,7 +240,7 @@ static bool satisfiesBackendContract(ModuleOp module,
   // A pre-order walk gives a more intuitive "first error".
   // TODO: Should we report more than the first error?
   // How do we avoid making it too spammy?
-  auto walkResult1 = module.walk<WalkOrder::PreOrder>([&](Block *block) {
+  auto walkResult1 = root->walk<WalkOrder::PreOrder>([&](Block *block) {
     for (BlockArgument arg : block->getArguments())
       if (failed(checkType(block->getParentOp(), arg.getType(),
                            actuallyEmitDiagnostics))) {
@@ -256,6 +273,115 @@ getBackendContractTarget(MLIRContext *context, bool decompose,
   return target;
 }
 
+//===----------------------------------------------------------------------===//
+// Incremental simplification and statistics.
+//===----------------------------------------------------------------------===//
+
+// Counts the ops nested in `root` that violate the backend contract, either
+// because they are illegal or because one of their results has an unsupported
+// type.
+static int64_t countBackendIllegalOps(Operation *root,
+                                      const ConversionTarget &target) {
+  int64_t count = 0;
+  root->walk([&](Operation *op) {
+    if (op == root)
+      return;
+    if (failed(checkOpIsBackendLegal(op, target,
+                                     /*actuallyEmitDiagnostics=*/false)) ||
+        llvm::any_of(op->getResultTypes(), [&](Type type) {
+          return failed(checkType(op, type, /*actuallyEmitDiagnostics=*/false));
+        }))
+      ++count;
+  });
+  return count;
+}
+
+namespace {
+// Functions taken out of a module by `detachLegalFunctions`.
+struct DetachedFunctions {
+  // The top-level ops of the module before detaching, in order.
+  SmallVector<Operation *> originalOrder;
+  llvm::SmallPtrSet<Operation *, 16> detached;
+};
+} // namespace
+
+// Takes the functions that already satisfy the backend contract out of
+// `module`, so that the next run of the simplification pipeline only touches
+// the functions that still need work.
+//
+// Only public functions that neither reference nor are referenced by any
+// symbol are taken out: the module-level passes of the pipeline (inlining,
+// global slot inlining, symbol DCE, ...) must see every symbol use to remain
+// correct, and private functions might be legitimately deleted by the
+// pipeline.
+static DetachedFunctions detachLegalFunctions(ModuleOp module,
+                                              const ConversionTarget &target) {
+  DetachedFunctions result;
+  auto uses = SymbolTable::getSymbolUses(&module.getBodyRegion());
+  // Unknown symbol uses; conservatively keep everything.
+  if (!uses)
+    return result;
+  llvm::StringSet<> referencedSymbols;
+  for (const SymbolTable::SymbolUse &use : *uses)
+    referencedSymbols.insert(use.getSymbolRef().getRootReference());
+
+  for (Operation &op : *module.getBody()) {
+    result.originalOrder.push_back(&op);
+    auto func = dyn_cast<func::FuncOp>(op);
+    if (!func || !func.isPublic() || func.isExternal() ||
+        referencedSymbols.contains(func.getSymName()))
+      continue;
+    auto usesInBody = SymbolTable::getSymbolUses(&func.getBody());
+    if (usesInBody && usesInBody->empty() &&
+        opsSatisfyBackendContract(func, target,
+                                  /*actuallyEmitDiagnostics=*/false))
+      result.detached.insert(func);
+  }
+  for (Operation *op : result.detached)
+    op->remove();
+  return result;
+}
+
+// Puts the functions taken out by `detachLegalFunctions` back into `module`,
+// preserving their original position relative to the ops that survived the
+// pipeline.
+static void reattachFunctions(ModuleOp module,
+                              const DetachedFunctions &functions) {
+  Block *body = module.getBody();
+  llvm::SmallPtrSet<Operation *, 16> present;
+  for (Operation &op : *body)
+    present.insert(&op);
+  Operation *previous = nullptr;
+  for (Operation *op : functions.originalOrder) {
+    if (functions.detached.contains(op)) {
+      if (previous)
+        body->getOperations().insertAfter(previous->getIterator(), op);
+      else
+        body->push_front(op);
+    } else if (!present.contains(op)) {
+      continue;
+    }
+    previous = op;
+  }
+}
+
+// Returns the textual form of a pass pipeline element without its options,
+// e.g. `func.func(canonicalize)` for
+// `func.func(canonicalize{max-iterations=10})`.
+static std::string stripPassOptions(StringRef pipeline) {
+  std::string result;
+  int depth = 0;
+  for (char c : pipeline) {
+    if (c == '{')
+      ++depth;
+    else if (c == '}')
+      --depth;
+    else if (depth == 0)
+      result.push_back(c);
+  }
+  return result;
+}
+
 namespace {
 class LowerToBackendContractPass
     : public LowerToBackendContractBase<LowerToBackendContractPass> {
@@ -264,12 +390,15 @@ public:
   LowerToBackendContractPass(int maxIterations, bool decompose,
                              bool shapeDtypeRefine,
                              ArrayRef<std::string> backendLegalOps,
-                             StringRef extraLibrary) {
+                             StringRef extraLibrary, bool incremental,
+                             bool recordStatistics) {
     this->maxIterations = maxIterations;
     this->decompose = decompose;
     this->shapeDtypeRefine = shapeDtypeRefine;
     this->backendLegalOps = backendLegalOps;
     this->extraLibrary = extraLibrary.str();
+    this->incremental = incremental;
+    this->recordStatistics = recordStatistics;
   }
   void runOnOperation() override {
     ModuleOp module = getOperation();
@@ -288,6 +417,35 @@ public:
     options.extraLibrary = extraLibrary;
     createTorchSimplificationPipeline(pm, options);
 
+    // When recording statistics, run each element of the pipeline as its own
+    // pipeline so that it can be timed individually.
+    SmallVector<std::pair<std::string, OpPassManager>> timedPipeline;
+    if (recordStatistics) {
+      for (Pass &pass : pm.getPasses()) {
+        std::string element;
+        llvm::raw_string_ostream os(element);
+        pass.printAsTextualPipeline(os);
+        OpPassManager elementPm(module.getOperationName());
+        if (failed(parsePassPipeline(os.str(), elementPm))) {
+          module.emitError("failed to split the simplification pipeline");
+          return signalPassFailure();
+        }
+        timedPipeline.emplace_back(stripPassOptions(os.str()),
+                                   std::move(elementPm));
+      }
+    }
+
+    llvm::json::Array statistics;
+    auto recordStatisticsAttr = [&]() {
+      if (!recordStatistics)
+        return;
+      std::string json;
+      llvm::raw_string_ostream os(json);
+      os << llvm::json::Value(std::move(statistics));
+      module->setAttr("torch.backend_contract_statistics",
+                      StringAttr::get(context, os.str()));
+    };
+
     int i = 0;
     do {
       if (i++ == maxIterations) {
@@ -297,15 +455,59 @@ public:
                        << maxIterations
                        << " iterations of the simplification pipeline\n";
         });
+        recordStatisticsAttr();
         // Show the diagnostics.
         (void)satisfiesBackendContract(module, target,
                                        /*actuallyEmitDiagnostics=*/true);
         return signalPassFailure();
       }
 
-      if (failed(runPipeline(pm, module)))
+      // After the first iteration, functions that already satisfy the
+      // backend contract don't need to be simplified again.
+      DetachedFunctions detached;
+      if (incremental && i > 1)
+        detached = detachLegalFunctions(module, target);
+      int64_t numFunctions = llvm::range_size(module.getOps<func::FuncOp>());
+
+      auto iterationStart = std::chrono::steady_clock::now();
+      llvm::json::Array passTimes;
+      LogicalResult result = success();
+      if (recordStatistics) {
+        for (auto &[name, elementPm] : timedPipeline) {
+          auto start = std::chrono::steady_clock::now();
+          result = runPipeline(elementPm, module);
+          passTimes.push_back(llvm::json::Object{
+              {"pass", name},
+              {"time_ms", std::chrono::duration<double, std::milli>(
+                              std::chrono::steady_clock::now() - start)
+                              .count()}});
+          if (failed(result))
+            break;
+        }
+      } else {
+        result = runPipeline(pm, module);
+      }
+      double iterationMs =
+          std::chrono::duration<double, std::milli>(
+              std::chrono::steady_clock::now() - iterationStart)
+              .count();
+
+      reattachFunctions(module, detached);
+      if (failed(result))
         return signalPassFailure();
+
+      if (recordStatistics) {
+        statistics.push_back(llvm::json::Object{
+            {"iteration", i},
+            {"functions", numFunctions},
+            {"skipped_functions",
+             static_cast<int64_t>(detached.detached.size())},
+            {"illegal_ops", countBackendIllegalOps(module, target)},
+            {"time_ms", iterationMs},
+            {"pass_times_ms", std::move(passTimes)}});
+      }
     } while (!satisfiesBackendContract(module, target));
+    recordStatisticsAttr();
     LLVM_DEBUG({
       llvm::dbgs() << "LowerToBackendContractPass: " << "succeeded after " << i
                    << " iterations of the simplification pipeline\n";
@@ -339,10 +541,11 @@ public:
 std::unique_ptr<OperationPass<ModuleOp>>
 mlir::torch::Torch::createLowerToBackendContractPass(
     int maxIterations, bool decompose, bool shapeDtypeRefine,
-    ArrayRef<std::string> backendLegalOps, StringRef extraLibrary) {
+    ArrayRef<std::string> backendLegalOps, StringRef extraLibrary,
+    bool incremental, bool recordStatistics) {
   return std::make_unique<LowerToBackendContractPass>(
-      maxIterations, decompose, shapeDtypeRefine, backendLegalOps,
-      extraLibrary);
+      maxIterations, decompose, shapeDtypeRefine, backendLegalOps, extraLibrary,
+      incremental, recordStatistics);
 }
 
 std::unique_ptr<OperationPass<ModuleOp>>
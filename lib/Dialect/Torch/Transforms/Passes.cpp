@@ -78,6 +78,15 @@ void mlir::torch::Torch::createTorchDynamoExportToTorchBackendPipeline(
         Torch::createDecomposeComplexOpsPass(options.backendLegalOps));
     pm.addNestedPass<func::FuncOp>(createCanonicalizerPass());
   }
+  // TorchDynamo export already produces programs in (or close to) the backend
+  // contract, so the fixpoint of LowerToBackendContract is only run when its
+  // incremental mode or statistics are asked for.
+  if (options.incremental || options.recordStatistics) {
+    pm.addPass(createLowerToBackendContractPass(
+        options.maxIterations, options.decompose, options.shapeDtypeRefine,
+        options.backendLegalOps, options.extraLibrary, options.incremental,
+        options.recordStatistics));
+  }
 }
 
 void mlir::torch::Torch::createTorchFunctionToTorchBackendPipeline(
@@ -88,7 +97,8 @@ void mlir::torch::Torch::createTorchFunctionToTorchBackendPipeline(
   // See the pass documentation for more information.
   pm.addPass(createLowerToBackendContractPass(
       options.maxIterations, options.decompose, options.shapeDtypeRefine,
-      options.backendLegalOps, options.extraLibrary));
+      options.backendLegalOps, options.extraLibrary, options.incremental,
+      options.recordStatistics));
 }
 
 void mlir::torch::Torch::createTorchOnnxToTorchBackendPipeline(
@@ -10,6 +10,7 @@
 #include "ReifyAbstractInterpCalculationsUtils.h"
 #include "mlir/Parser/Parser.h"
 #include "torch-mlir/Dialect/Torch/IR/TorchOps.h"
+#include "torch-mlir/Dialect/Torch/Transforms/Passes.h"
 #include "llvm/ADT/StringSet.h"
 #include "llvm/Support/ErrorOr.h"
 #include "llvm/Support/MemoryBuffer.h"
@@ -66,8 +67,8 @@ createCalculateYieldCalculationOp(OpBuilder &b, Location loc,
 }
 
 LogicalResult Torch::wrapWithCalculateOpIfLibraryFunctionAvailable(
-    Operation *op, ModuleOp library, LibraryFunctionKind libFuncKind,
-    SmallVector<std::string> &libFuncNamesUsed,
+    Operation *op, const AbstractInterpLibrary &library,
+    LibraryFunctionKind libFuncKind, SmallVector<std::string> &libFuncNamesUsed,
     function_ref<FailureOr<SmallVector<Value>>(OpBuilder &, Location,
                                                ValueRange, func::FuncOp)>
         libFuncArgsBuilder) {
@@ -84,7 +85,7 @@ LogicalResult Torch::wrapWithCalculateOpIfLibraryFunctionAvailable(
     name = cast<StringAttr>(cast<OperatorOp>(op)->getAttr("name")).getValue();
   std::string libFuncName =
       (getLibraryFunctionPrefix(libFuncKind) + Twine(name)).str();
-  auto libFunc = library.lookupSymbol<func::FuncOp>(libFuncName);
+  auto libFunc = library.lookup(libFuncName);
   if (!libFunc)
     return success();
   libFuncNamesUsed.push_back(libFuncName);
@@ -132,7 +133,8 @@ LogicalResult Torch::wrapWithCalculateOpIfLibraryFunctionAvailable(
   return success();
 }
 
-void Torch::importLibraryFunctions(ModuleOp module, ModuleOp library,
+void Torch::importLibraryFunctions(ModuleOp module,
+                                   const AbstractInterpLibrary &library,
                                    SmallVector<std::string> functionsNeeded) {
   // Import just the functions we need. This includes transitive callees,
   // so we use a worklist algorithm.
@@ -141,12 +143,12 @@ void Torch::importLibraryFunctions(ModuleOp module, ModuleOp library,
     std::string symName = functionsNeeded.pop_back_val();
     if (importedFunctions.contains(symName))
       continue;
-    auto func = library.lookupSymbol<func::FuncOp>(symName);
-    assert(func && "broken library");
-    // Move the function from the library to the module this pass
-    // is running on. (this mutates the library, but we re-parse it each time
-    // so this is safe to do).
-    func->moveBefore(&module.getBody()->front());
+    auto libFunc = library.lookup(symName);
+    assert(libFunc && "broken library");
+    // Copy the function from the library to the module this pass is running
+    // on. The library itself is shared and must not be modified.
+    auto func = cast<func::FuncOp>(libFunc->clone());
+    module.getBody()->push_front(func);
     // Set the visibility to private so that the functions go away
     // nicely after we are done with them.
     func.setVisibility(SymbolTable::Visibility::Private);
@@ -355,3 +357,34 @@ mlir::torch::Torch::loadExtraLibrary(const std::string &filename,
 
   return success();
 }
+
+Torch::AbstractInterpLibrary::AbstractInterpLibrary(
+    OwningOpRef<ModuleOp> module)
+    : module(std::move(module)) {
+  // If the extra library redefines a function, the first definition wins, as
+  // with `SymbolTable::lookupSymbolIn`.
+  for (auto func : this->module->getOps<func::FuncOp>())
+    functions.try_emplace(func.getSymName(), func);
+}
+
+FailureOr<std::shared_ptr<const Torch::AbstractInterpLibrary>>
+Torch::AbstractInterpLibrary::load(MLIRContext *context,
+                                   StringRef extraLibrary) {
+  // The library is embedded as MLIR text. Parsing it is expensive, so this is
+  // called once per pass manager, from the `initialize` hook of the passes.
+  OwningOpRef<ModuleOp> library =
+      parseSourceString<ModuleOp>(getAbstractInterpLibrary(), context);
+  if (!library) {
+    emitError(UnknownLoc::get(context),
+              "Failed to parse the abstract interpretation library");
+    return failure();
+  }
+  if (!extraLibrary.empty() &&
+      failed(loadExtraLibrary(extraLibrary.str(), library))) {
+    emitError(UnknownLoc::get(context),
+              "Failed to load extra-library file at " + extraLibrary);
+    return failure();
+  }
+  return std::shared_ptr<const AbstractInterpLibrary>(
+      new AbstractInterpLibrary(std::move(library)));
+}
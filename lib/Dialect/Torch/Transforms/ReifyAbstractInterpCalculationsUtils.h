@@ -15,8 +15,12 @@
 #include "mlir/IR/BuiltinOps.h"
 #include "mlir/IR/Operation.h"
 #include "mlir/IR/OperationSupport.h"
+#include "mlir/IR/OwningOpRef.h"
 #include "mlir/Support/LogicalResult.h"
 #include "torch-mlir/Dialect/Torch/IR/TorchOps.h"
+#include "llvm/ADT/StringMap.h"
+
+#include <memory>
 
 namespace mlir {
 namespace torch {
@@ -29,6 +33,32 @@ enum class LibraryFunctionKind {
   HasValueSemantics
 };
 
+// The parsed abstract interpretation library (optionally extended with an
+// extra library), together with an index of its functions.
+//
+// The library is immutable once loaded: functions are cloned out of it rather
+// than moved, so that one instance can be shared by all clones of a pass and
+// reused across runs (e.g. the fixpoint iterations of
+// LowerToBackendContract, which rerun the same pass manager).
+class AbstractInterpLibrary {
+public:
+  // Parses the built-in library into `context` and splices in the functions
+  // from the file `extraLibrary`, if not empty.
+  static FailureOr<std::shared_ptr<const AbstractInterpLibrary>>
+  load(MLIRContext *context, StringRef extraLibrary);
+
+  // Returns the library function named `name`, or null if there is none.
+  func::FuncOp lookup(StringRef name) const { return functions.lookup(name); }
+
+  ModuleOp getModule() const { return *module; }
+
+private:
+  explicit AbstractInterpLibrary(OwningOpRef<ModuleOp> module);
+
+  OwningOpRef<ModuleOp> module;
+  llvm::StringMap<func::FuncOp> functions;
+};
+
 // Searches the function library for an abstract interpretation function for
 // `op`. If one is found, wraps the op in a `CalculateOp`, with the op placed in
 // the first region, and a call to the abstract interpretation function is
@@ -41,17 +71,17 @@ enum class LibraryFunctionKind {
 // Note: This function does *not* import the abstract interpretation function
 // from the library into the IR.
 LogicalResult wrapWithCalculateOpIfLibraryFunctionAvailable(
-    Operation *op, ModuleOp library, LibraryFunctionKind funcKind,
-    SmallVector<std::string> &libFuncNamesUsed,
+    Operation *op, const AbstractInterpLibrary &library,
+    LibraryFunctionKind funcKind, SmallVector<std::string> &libFuncNamesUsed,
     function_ref<FailureOr<SmallVector<Value>>(OpBuilder &, Location,
                                                ValueRange, func::FuncOp)>
         libFuncArgsBuilder);
 
-// Imports the functions in `functionsNeeded` from the library into the module.
+// Imports the functions in `functionsNeeded` (and their transitive callees)
+// from the library into the module, by cloning them.
 // This function assumes that all functions needed exist in the library.
-//
-// Note: This function modifies the library.
-void importLibraryFunctions(ModuleOp module, ModuleOp library,
+void importLibraryFunctions(ModuleOp module,
+                            const AbstractInterpLibrary &library,
                             SmallVector<std::string> functionsNeeded);
 
 // Recursively adjust `operand` to match `desiredType`.
@@ -10,7 +10,6 @@
 #include "PassDetail.h"
 
 #include "ReifyAbstractInterpCalculationsUtils.h"
-#include "mlir/Parser/Parser.h"
 #include "mlir/Transforms/DialectConversion.h"
 #include "torch-mlir/Dialect/Torch/IR/TorchOps.h"
 #include "torch-mlir/Dialect/Torch/Transforms/Passes.h"
@@ -62,22 +61,20 @@ struct ReifyShapeCalculationsPass
   ReifyShapeCalculationsPass(StringRef extraLibrary) {
     this->extraLibrary = extraLibrary.str();
   }
+  LogicalResult initialize(MLIRContext *context) override {
+    // Parse the library once per pass manager rather than on every run.
+    // Clones of this pass share the (immutable) parsed library.
+    FailureOr<std::shared_ptr<const AbstractInterpLibrary>> loaded =
+        AbstractInterpLibrary::load(context, extraLibrary);
+    if (failed(loaded))
+      return failure();
+    library = std::move(*loaded);
+    return success();
+  }
+
   void runOnOperation() override {
-    MLIRContext *context = &getContext();
     ModuleOp module = getOperation();
 
-    // TODO: Find a way to not have to parse this every time.
-    // The library is O(#ops we know about), and this pass should be
-    // O(#ops in the program) ideally.
-    OwningOpRef<ModuleOp> library =
-        parseSourceString<ModuleOp>(getAbstractInterpLibrary(), context);
-    if (!extraLibrary.empty())
-      if (failed(mlir::torch::Torch::loadExtraLibrary(extraLibrary, library))) {
-        emitError(module->getLoc(),
-                  "Failed to load extra-library file at " + extraLibrary);
-        return signalPassFailure();
-      }
-
     // Walk all the operations, and if we have a shape function, wrap the op
     // in a `torch.shape.calculate` op.
     SmallVector<std::string> functionsNeeded;
@@ -91,6 +88,9 @@ struct ReifyShapeCalculationsPass
       return signalPassFailure();
     importLibraryFunctions(module, *library, std::move(functionsNeeded));
   }
+
+private:
+  std::shared_ptr<const AbstractInterpLibrary> library;
 };
 } // namespace
 
@@ -4,6 +4,7 @@
 # Also available under a BSD-style license. See LICENSE.
 
 import argparse
+import os
 import re
 import sys
 
@@ -11,7 +12,13 @@ import torch
 
 torch.device("cpu")
 
-from torch_mlir_e2e_test.framework import run_tests
+from torch_mlir_e2e_test.framework import (
+    GoldenTraceCache,
+    load_test_durations,
+    run_tests,
+    save_test_durations,
+)
+from torch_mlir_e2e_test.incremental import ResultCache, parse_shard, shard_tests
 from torch_mlir_e2e_test.reporting import report_results
 from torch_mlir_e2e_test.registry import GLOBAL_TEST_REGISTRY
 
@@ -134,6 +141,34 @@ which make it easier to attach a debugger or get a stack trace.""",
         nargs="+",
         help="A set of tests to not attempt to run, since they crash and cannot be XFAILed.",
     )
+    parser.add_argument(
+        "--durations_file",
+        default=None,
+        help="""JSON file with the durations of previous runs, used to start the
+longest tests first. It is updated after the run. Defaults to a file per config
+under $TORCH_MLIR_CACHE_DIR (or ~/.cache/torch-mlir).""",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        metavar="I/N",
+        help="""Only run shard I (0-based) of N of the selected tests. Shards are
+balanced according to the durations in --durations_file.""",
+    )
+    parser.add_argument(
+        "--incremental",
+        default=False,
+        action="store_true",
+        help="""Skip tests that passed in a previous incremental run, unless
+their source file, the torch-mlir build or sources, or the config changed since.""",
+    )
+    parser.add_argument(
+        "--no_golden_trace_cache",
+        default=False,
+        action="store_true",
+        help="""Always run the tests eagerly to produce their golden traces, instead
+of reusing the traces cached (across configs) by previous runs.""",
+    )
     parser.add_argument(
         "--ignore_failures",
         default=False,
@@ -143,6 +178,18 @@ which make it easier to attach a debugger or get a stack trace.""",
     return parser
 
 
+def _cache_dir() -> str:
+    cache_dir = os.environ.get(
+        "TORCH_MLIR_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "torch-mlir"),
+    )
+    return os.path.join(cache_dir, "e2e")
+
+
+def _default_cache_file(config: str, kind: str) -> str:
+    return os.path.join(_cache_dir(), f"{config}_{kind}.json")
+
+
 def main():
     args = _get_argparse().parse_args()
 
@@ -226,8 +273,62 @@ def main():
             print(test.unique_name)
         sys.exit(1)
 
+    durations_file = args.durations_file or _default_cache_file(
+        args.config, "durations"
+    )
+    durations = load_test_durations(durations_file)
+    if args.shard is not None:
+        try:
+            shard_index, num_shards = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        tests = shard_tests(tests, shard_index, num_shards, durations)
+
+    # Reuse the results of tests that passed before and did not change.
+    cached_results = []
+    if args.incremental:
+        result_cache = ResultCache(_default_cache_file(args.config, "results"), config)
+        cached_results = [
+            result_cache.cached_result(test)
+            for test in tests
+            if result_cache.is_fresh(test)
+        ]
+        cached_names = {result.unique_name for result in cached_results}
+        tests = [test for test in tests if test.unique_name not in cached_names]
+        print(f"Reusing the results of {len(cached_results)} unchanged tests")
+
     # Run the tests.
-    results = run_tests(tests, config, args.sequential, args.verbose)
+    golden_trace_cache = None
+    if not args.no_golden_trace_cache:
+        golden_trace_cache = GoldenTraceCache(os.path.join(_cache_dir(), "golden"))
+    num_done = 0
+
+    def on_result(result):
+        nonlocal num_done
+        num_done += 1
+        if args.verbose:
+            print(f"[{num_done}/{len(tests)}] {result.unique_name}", file=sys.stderr)
+
+    results = []
+    if tests:
+        results = run_tests(
+            tests,
+            config,
+            args.sequential,
+            args.verbose,
+            durations=durations,
+            on_result=on_result,
+            golden_trace_cache=golden_trace_cache,
+        )
+    try:
+        save_test_durations(durations_file, durations)
+        if args.incremental:
+            result_cache.record(tests, results)
+            result_cache.save()
+    except OSError as e:
+        print(f"WARNING: could not save the test cache: {e}", file=sys.stderr)
+    results = sorted(results + cached_results, key=lambda r: r.unique_name)
 
     # Report the test results.
     failed = report_results(results, xfail_set, args.verbose, args.config)
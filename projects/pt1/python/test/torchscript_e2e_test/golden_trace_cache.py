@@ -0,0 +1,49 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import os
+import tempfile
+
+import torch
+
+from torch_mlir_e2e_test.framework import GoldenTraceCache, run_tests, TestUtils
+from torch_mlir_e2e_test.reporting import report_results
+from torch_mlir_e2e_test.registry import register_test_case, GLOBAL_TEST_REGISTRY
+from torch_mlir_e2e_test.configs import TorchScriptTestConfig
+
+
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.linear = torch.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.linear(x)
+
+
+@register_test_case(module_factory=lambda: LinearModule())
+def LinearModule_basic(module, tu: TestUtils):
+    module.forward(tu.rand(3, 4))
+
+
+def main():
+    config = TorchScriptTestConfig()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = GoldenTraceCache(cache_dir)
+        # CHECK: PASS - "LinearModule_basic"
+        results = run_tests(GLOBAL_TEST_REGISTRY, config, golden_trace_cache=cache)
+        report_results(results, set(), verbose=True)
+        # CHECK: cached: True
+        print("cached:", cache.load(GLOBAL_TEST_REGISTRY[0]) is not None)
+        # CHECK: PASS - "LinearModule_basic"
+        results = run_tests(GLOBAL_TEST_REGISTRY, config, golden_trace_cache=cache)
+        report_results(results, set(), verbose=True)
+
+
+if __name__ == "__main__":
+    main()
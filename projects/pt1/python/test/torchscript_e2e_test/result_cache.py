@@ -0,0 +1,108 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import importlib.util
+import os
+import tempfile
+
+import torch
+
+from torch_mlir_e2e_test.framework import run_tests, TestUtils
+from torch_mlir_e2e_test.incremental import ResultCache
+from torch_mlir_e2e_test.registry import register_test_case, GLOBAL_TEST_REGISTRY
+from torch_mlir_e2e_test.configs import TorchScriptTestConfig
+
+
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.linear = torch.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.linear(x)
+
+
+@register_test_case(module_factory=lambda: LinearModule())
+def LinearModule_basic(module, tu: TestUtils):
+    module.forward(tu.rand(3, 4))
+
+
+class FailingModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, t):
+        return torch.tensor([])
+
+
+@register_test_case(module_factory=lambda: FailingModule())
+def FailingModule_basic(module, tu: TestUtils):
+    module.forward(torch.ones([]))
+
+
+def run_incremental(cache_file, config, tests):
+    """Runs `tests` like `main.py --incremental` and prints what was run."""
+    cache = ResultCache(cache_file, config)
+    reused = [test.unique_name for test in tests if cache.is_fresh(test)]
+    to_run = [test for test in tests if test.unique_name not in reused]
+    # The edited invokers below cannot be sent to worker processes.
+    results = run_tests(to_run, config, sequential=True)
+    cache.record(to_run, results)
+    cache.save()
+    print("reused:", sorted(reused))
+    print("ran:", sorted(result.unique_name for result in results))
+
+
+def load_invoker(path, source):
+    """Returns `invoke` from a module file with `source`, as if edited."""
+    with open(path, "w") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location("suite", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.invoke
+
+
+def main():
+    config = TorchScriptTestConfig()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = os.path.join(cache_dir, "results.json")
+        # CHECK: reused: []
+        # CHECK: ran: ['FailingModule_basic', 'LinearModule_basic']
+        run_incremental(cache_file, config, GLOBAL_TEST_REGISTRY)
+        # The passing test is reused; the failing one was not recorded.
+        # CHECK: reused: ['LinearModule_basic']
+        # CHECK: ran: ['FailingModule_basic']
+        run_incremental(cache_file, config, GLOBAL_TEST_REGISTRY)
+
+        # Editing the source defining a test changes its key.
+        linear = GLOBAL_TEST_REGISTRY[0]
+        body = "def invoke(module, tu):\n    module.forward(tu.rand(3, 4))\n"
+        edited = [
+            linear._replace(program_invoker=load_invoker(path, source))
+            for path, source in [
+                (os.path.join(cache_dir, "a.py"), body),
+                (os.path.join(cache_dir, "b.py"), body + "\n"),
+            ]
+        ]
+        cache = ResultCache(cache_file, config)
+        # CHECK: key changed: True
+        print("key changed:", cache.test_key(edited[0]) != cache.test_key(edited[1]))
+        # CHECK: reused: []
+        # CHECK: ran: ['LinearModule_basic']
+        run_incremental(cache_file, config, edited[:1])
+        # CHECK: reused: ['LinearModule_basic']
+        # CHECK: ran: []
+        run_incremental(cache_file, config, edited[:1])
+        # CHECK: reused: []
+        # CHECK: ran: ['LinearModule_basic']
+        run_incremental(cache_file, config, edited[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import torch
+
+from torch_mlir_e2e_test.framework import TestUtils
+from torch_mlir_e2e_test.incremental import shard_tests
+from torch_mlir_e2e_test.registry import register_test_case, GLOBAL_TEST_REGISTRY
+
+
+class MmModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+
+    def forward(self, lhs, rhs):
+        return torch.mm(lhs, rhs)
+
+
+@register_test_case(module_factory=lambda: MmModule())
+def Slow(module, tu: TestUtils):
+    module.forward(tu.rand(4, 4), tu.rand(4, 4))
+
+
+@register_test_case(module_factory=lambda: MmModule())
+def Medium(module, tu: TestUtils):
+    module.forward(tu.rand(4, 4), tu.rand(4, 4))
+
+
+@register_test_case(module_factory=lambda: MmModule())
+def Fast1(module, tu: TestUtils):
+    module.forward(tu.rand(4, 4), tu.rand(4, 4))
+
+
+@register_test_case(module_factory=lambda: MmModule())
+def Fast2(module, tu: TestUtils):
+    module.forward(tu.rand(4, 4), tu.rand(4, 4))
+
+
+def main():
+    durations = {"Slow": 10.0, "Medium": 6.0, "Fast1": 3.0, "Fast2": 2.0}
+    # The slow test gets a shard of its own, the others are packed together.
+    # CHECK: shard 0: ['Slow']
+    # CHECK: shard 1: ['Medium', 'Fast1', 'Fast2']
+    for i in range(2):
+        shard = shard_tests(GLOBAL_TEST_REGISTRY, i, 2, durations)
+        print(f"shard {i}:", [test.unique_name for test in shard])
+
+
+if __name__ == "__main__":
+    main()
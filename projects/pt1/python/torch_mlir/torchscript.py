@@ -3,7 +3,7 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-from typing import Optional, Sequence, Union, List, Dict, Tuple, Callable, Iterable
+from typing import Optional, Sequence, Union, List, Dict, Tuple, Callable, Iterable, Any
 from enum import Enum
 
 import sys
@@ -16,6 +16,8 @@ import torch
 import torch.fx
 
 from torch_mlir.compiler_utils import (
+    CompileProfile,
+    pop_backend_contract_statistics,
     run_pipeline_with_repro_report,
     OutputType,
     lower_mlir_module,
@@ -174,6 +176,9 @@ def compile(
     extra_library: Iterable[Callable] = [],
     verbose: bool = False,
     enable_ir_printing: bool = False,
+    profile: Optional[CompileProfile] = None,
+    incremental_backend_contract: bool = False,
+    backend_contract_statistics: Optional[List[Dict[str, Any]]] = None,
 ):
     """Convert a PyTorch model to MLIR.
 
@@ -210,6 +215,14 @@ def compile(
             flag. Note that this can easily generate many gigabytes of text,
             so make sure to pipe stderr to a file (for example, run
             `python tinymodel.py 2> tinymodel.stderr` on Linux).
+        profile: If given, a `CompileProfile` that the time, op counts and
+            memory use of each pass of the lowering pipelines are recorded in.
+        incremental_backend_contract: If true, after the first iteration of
+            the simplification pipeline that lowers to the backend contract,
+            only re-simplify the functions that do not satisfy it yet.
+        backend_contract_statistics: If given, a list that the per-iteration
+            statistics of the lowering to the backend contract are appended
+            to. See `pop_backend_contract_statistics`.
 
     Returns:
         An MLIR module that contains the converted model in the specified
@@ -304,6 +317,8 @@ PyTorch TorchScript module -> torch-mlir Object Graph IR import failed with:
         + ",".join(backend_legal_ops)
         + " extra-library="
         + extra_library_file_name
+        + (" incremental=true" if incremental_backend_contract else "")
+        + (" record-statistics=true" if backend_contract_statistics is not None else "")
         + "}"
     )
     run_pipeline_with_repro_report(
@@ -311,6 +326,9 @@ PyTorch TorchScript module -> torch-mlir Object Graph IR import failed with:
         f"builtin.module(torchscript-module-to-torch-backend-pipeline{option_string})",
         "Lowering TorchScript IR -> Torch Backend IR",
         enable_ir_printing=enable_ir_printing,
+        profile=profile,
     )
+    if backend_contract_statistics is not None:
+        backend_contract_statistics.extend(pop_backend_contract_statistics(mb.module))
 
-    return lower_mlir_module(verbose, output_type, mb.module)
+    return lower_mlir_module(verbose, output_type, mb.module, profile=profile)
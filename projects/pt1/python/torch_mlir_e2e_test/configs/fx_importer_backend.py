@@ -3,19 +3,13 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-import numpy as np
 import torch
-import torch.utils._pytree as pytree
-from torch.export.graph_signature import OutputSpec, OutputKind
-from torch.export import ExportedProgram
 from torch._dynamo.backends.common import aot_autograd
 
 from torch_mlir import fx
+from torch_mlir.compiled_module import CompiledModule
 from torch_mlir.compiler_utils import OutputType
-from torch_mlir_e2e_test.configs.utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
-)
+from torch_mlir_e2e_test.configs.utils import invoke_backend
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
 from torch_mlir_e2e_test.annotations import TORCH_MLIR_ARG_ANNOTATIONS_ATTR_NAME
 
@@ -27,17 +21,6 @@ BACKEND_LEGAL_OPS = {
 }
 
 
-def refine_result_type(_result):
-    if isinstance(_result, tuple):
-        return tuple(refine_result_type(x) for x in _result)
-    elif isinstance(_result, np.ndarray):
-        return torch.from_numpy(_result)
-    elif isinstance(_result, (bool, int, float)):
-        return _result
-    else:
-        raise ValueError(f"Unhandled return type {type(_result)}")
-
-
 class FxImporterTestConfig(TestConfig):
     """TestConfig that runs the torch.nn.Module with Fx Importer"""
 
@@ -109,12 +92,8 @@ class FxImporterTestConfig(TestConfig):
                             lambda i: isinstance(i, torch.Tensor), torch_inputs
                         )
                     ]
-                    with torch.no_grad():
-                        numpy_inputs = recursively_convert_to_numpy(torch_inputs)
-                    return recursively_convert_from_numpy(
-                        getattr(backend_module, artifact.__class__.__name__)(
-                            *numpy_inputs
-                        )
+                    return invoke_backend(
+                        backend_module, artifact.__class__.__name__, torch_inputs
                     )
 
                 return invoke_func
@@ -132,42 +111,21 @@ class FxImporterTestConfig(TestConfig):
         return result
 
     def _export_run(self, artifact: torch.nn.Module, trace: Trace) -> Trace:
+        # Trace items with the same input signature share one compiled module.
+        compiled = CompiledModule(
+            artifact,
+            self._backend,
+            output_type=self._output_type,
+            strict=True,
+            # While the current e2e tests don't exercise symbolic shapes,
+            # enabling this here ensures they don't regress either.
+            import_symbolic_shape_expressions=True,
+            verbose=self._verbose,
+            backend_legal_ops=self._backend_legal_ops,
+        )
         result: Trace = []
         for item in trace:
-            prog: ExportedProgram = torch.export.export(
-                artifact, tuple(item.inputs), strict=True
-            )
-            module = fx.export_and_import(
-                prog,
-                output_type=self._output_type,
-                func_name=artifact.__class__.__name__,
-                # While the current e2e tests don't exercise symbolic shapes,
-                # enabling this here ensures they don't regress either.
-                import_symbolic_shape_expressions=True,
-                verbose=self._verbose,
-                backend_legal_ops=self._backend_legal_ops,
-            )
-            module = self._backend.compile(module)
-            backend_module = self._backend.load(module)
-            params = {
-                # **dict(artifact.named_parameters(remove_duplicate=False)),
-                **dict(artifact.named_buffers(remove_duplicate=False)),
-            }
-            params_flat, params_spec = pytree.tree_flatten(params)
-            params_flat = list(params_flat)
-            with torch.no_grad():
-                numpy_inputs = recursively_convert_to_numpy(params_flat + item.inputs)
-            outputs = getattr(backend_module, artifact.__class__.__name__)(
-                *numpy_inputs
-            )
-            output = refine_result_type(outputs)
-            if isinstance(output, (tuple, list)):
-                user_output = []
-                out_spec: OutputSpec
-                for val, out_spec in zip(output, prog.graph_signature.output_specs):
-                    if out_spec.kind == OutputKind.USER_OUTPUT:
-                        user_output.append(val)
-                output = tuple(user_output)
+            output = compiled(*item.inputs)
             result.append(
                 TraceItem(symbol=item.symbol, inputs=item.inputs, output=output)
             )
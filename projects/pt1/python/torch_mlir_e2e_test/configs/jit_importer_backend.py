@@ -12,10 +12,7 @@ from torch_mlir.compiler_utils import OutputType
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
 from torch_mlir_e2e_test.utils import convert_annotations_to_placeholders
 
-from .utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
-)
+from .utils import invoke_backend
 
 
 # The set of ops that are considered legal for each backend.
@@ -73,9 +70,7 @@ class JITImporterTestConfig(TestConfig):
         backend_module = self.backend.load(artifact)
         result: Trace = []
         for item in trace:
-            numpy_inputs = recursively_convert_to_numpy(item.inputs)
-            outputs = getattr(backend_module, item.symbol)(*numpy_inputs)
-            output = recursively_convert_from_numpy(outputs)
+            output = invoke_backend(backend_module, item.symbol, item.inputs)
             result.append(
                 TraceItem(symbol=item.symbol, inputs=item.inputs, output=output)
             )
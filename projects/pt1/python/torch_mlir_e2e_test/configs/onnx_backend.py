@@ -14,10 +14,7 @@ import torch_mlir
 
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
 from torch_mlir_e2e_test.utils import convert_annotations_to_placeholders
-from .utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
-)
+from .utils import invoke_backend
 
 from torch_mlir.extras import onnx_importer
 from torch_mlir.dialects import torch as torch_d
@@ -151,9 +148,7 @@ class OnnxBackendTestConfig(TestConfig):
         backend_module = self.backend.load(artifact)
         result: Trace = []
         for item in trace:
-            numpy_inputs = recursively_convert_to_numpy(item.inputs)
-            outputs = getattr(backend_module, "main_graph")(*numpy_inputs)
-            output = recursively_convert_from_numpy(outputs)
+            output = invoke_backend(backend_module, "main_graph", item.inputs)
             result.append(
                 TraceItem(symbol=item.symbol, inputs=item.inputs, output=output)
             )
@@ -5,7 +5,6 @@
 
 from typing import List, Union, Optional, Sequence
 
-import numpy as np
 import torch
 import torch.utils._pytree as pytree
 from torch._dynamo.backends.common import aot_autograd
@@ -29,24 +28,10 @@ from torch_mlir.torchscript import (
 from torch_mlir_e2e_test.configs.jit_importer_backend import (
     BACKEND_LEGAL_OPS,
 )
-from torch_mlir_e2e_test.configs.utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
-)
+from torch_mlir_e2e_test.configs.utils import invoke_backend
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
 
 
-def refine_result_type(_result):
-    if isinstance(_result, tuple):
-        return tuple(refine_result_type(x) for x in _result)
-    elif isinstance(_result, np.ndarray):
-        return torch.from_numpy(_result)
-    elif isinstance(_result, (bool, int, float)):
-        return _result
-    else:
-        raise ValueError(f"Unhandled return type {type(_result)}")
-
-
 def _returns_empty_tuple(fx_graph: torch.fx.GraphModule) -> bool:
     for node in fx_graph.graph.nodes:
         if node.op == "output":
@@ -189,12 +174,11 @@ class TorchDynamoTestConfig(TestConfig):
             }
             params_flat, params_spec = pytree.tree_flatten(params)
             params_flat = list(params_flat)
-            with torch.no_grad():
-                numpy_inputs = recursively_convert_to_numpy(params_flat + item.inputs)
-            outputs = getattr(backend_module, artifact.__class__.__name__)(
-                *numpy_inputs
+            output = invoke_backend(
+                backend_module,
+                artifact.__class__.__name__,
+                params_flat + item.inputs,
             )
-            output = refine_result_type(outputs)
             result.append(
                 TraceItem(symbol=item.symbol, inputs=item.inputs, output=output)
             )
@@ -8,6 +8,9 @@ from typing import Any
 import numpy as np
 import torch
 
+# Re-exported for the configs.
+from torch_mlir.compiled_module import invoke_backend
+
 
 def recursively_convert_to_numpy(o: Any):
     if isinstance(o, torch.Tensor):
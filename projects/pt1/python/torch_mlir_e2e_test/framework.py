@@ -21,22 +21,25 @@ compiling or TorchScript'ing).
 """
 
 import abc
+from collections import deque
+import functools
 from typing import Any, Callable, List, NamedTuple, Optional, TypeVar, Union, Dict
-from itertools import repeat
 
+import glob
+import hashlib
+import inspect
+import json
 import os
+import pickle
 import sys
+import tempfile
+import time
 import traceback
 import signal
+import warnings
 
 import multiprocess as mp
-from multiprocess import set_start_method
-
-try:
-    set_start_method("spawn")
-except RuntimeError:
-    # Children can error here so we suppress.
-    pass
+from multiprocess.connection import wait
 
 import torch
 
@@ -323,10 +326,135 @@ class timeout:
         signal.alarm(0)
 
 
-def compile_and_run_test(test: Test, config: TestConfig, verbose=False) -> Any:
+@functools.lru_cache(maxsize=None)
+def _source_file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_source_digest(test: Test) -> str:
+    """Returns a digest of the source files defining `test`.
+
+    These are the files defining its module factory and its invoker (usually
+    the same test suite file).
+    """
+    h = hashlib.sha256()
+    h.update(test.unique_name.encode())
+    for f in (test.program_invoker, test.program_factory):
+        try:
+            path = inspect.getsourcefile(f)
+        except TypeError:
+            path = None
+        if path is not None:
+            h.update(_source_file_digest(path).encode())
+    return h.hexdigest()
+
+
+def _detach_torch_script_value(v: TorchScriptValue):
+    if isinstance(v, torch.Tensor):
+        return v.detach()
+    if isinstance(v, tuple):
+        return tuple(_detach_torch_script_value(field) for field in v)
+    if isinstance(v, list):
+        return [_detach_torch_script_value(item) for item in v]
+    if isinstance(v, dict):
+        return {k: _detach_torch_script_value(val) for k, val in v.items()}
+    return v
+
+
+class GoldenTraceCache:
+    """On-disk cache of golden traces.
+
+    Entries are keyed by the test name, `test_source_digest` and the torch
+    version, and are stored with `torch.save`. They are loaded with
+    `mmap=True`, so tensors are only paged in as they are read (and loading
+    copies nothing up front).
+
+    Generating a golden trace leaves the global RNG in a state that the
+    compiled program may depend on (e.g. to initialize parameters), so that
+    state is stored with the trace and restored when it is loaded.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._warned_load_failure = False
+
+    def _path(self, test: Test) -> str:
+        h = hashlib.sha256()
+        h.update(test_source_digest(test).encode())
+        h.update(torch.__version__.encode())
+        return os.path.join(
+            self.cache_dir, f"{test.unique_name}.{h.hexdigest()[:16]}.pt"
+        )
+
+    def load(self, test: Test) -> Optional[Trace]:
+        """Returns the cached golden trace of `test`, if there is one."""
+        try:
+            entry = torch.load(self._path(test), mmap=True, weights_only=True)
+            trace = [TraceItem(*item) for item in entry["trace"]]
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError):
+            # Missing, truncated, or written by an incompatible version:
+            # regenerate it.
+            return None
+        except Exception as e:
+            if not self._warned_load_failure:
+                self._warned_load_failure = True
+                warnings.warn(
+                    f"Could not load golden trace cache entries (first failure: "
+                    f"{test.unique_name}: {e!r}); regenerating them"
+                )
+            return None
+        torch.set_rng_state(entry["rng_state"])
+        return trace
+
+    def store(self, test: Test, trace: Trace):
+        """Stores the just generated `trace` as the golden trace of `test`."""
+        entry = {
+            "trace": [
+                (item.symbol, *_detach_torch_script_value((item.inputs, item.output)))
+                for item in trace
+            ],
+            "rng_state": torch.get_rng_state(),
+        }
+        path = self._path(test)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save(entry, f)
+            os.replace(temp_path, path)
+        except Exception:
+            # Values that cannot be saved are simply not cached.
+            os.unlink(temp_path)
+            return
+        # Drop the entries of previous versions of the test.
+        pattern = os.path.join(self.cache_dir, f"{test.unique_name}.*.pt")
+        for stale in glob.glob(pattern):
+            if stale != path:
+                try:
+                    os.unlink(stale)
+                except FileNotFoundError:
+                    pass
+
+
+def compile_and_run_test(
+    test: Test,
+    config: TestConfig,
+    verbose=False,
+    golden_trace_cache: Optional[GoldenTraceCache] = None,
+) -> Any:
     with timeout(seconds=test.timeout_seconds):
         try:
-            golden_trace = generate_golden_trace(test)
+            golden_trace = None
+            if golden_trace_cache is not None:
+                golden_trace = golden_trace_cache.load(test)
+            # A cached golden trace was just loaded and is not shared with
+            # anything else, so it needs no defensive copy below.
+            golden_trace_is_cached = golden_trace is not None
+            if golden_trace is None:
+                golden_trace = generate_golden_trace(test)
+                if golden_trace_cache is not None:
+                    golden_trace_cache.store(test, golden_trace)
             if verbose:
                 print(f"Compiling {test.unique_name}...", file=sys.stderr)
             compiled = config.compile(test.program_factory(), verbose=verbose)
@@ -359,7 +487,7 @@ def compile_and_run_test(test: Test, config: TestConfig, verbose=False) -> Any:
             return TestResult(
                 unique_name=test.unique_name,
                 compilation_error=None,
-                runtime_error="Test timed out during execution (timeout={test.timeout}s)",
+                runtime_error=f"Test timed out during execution (timeout={test.timeout_seconds}s)",
                 trace=None,
                 golden_trace=None,
             )
@@ -378,14 +506,229 @@ def compile_and_run_test(test: Test, config: TestConfig, verbose=False) -> Any:
             compilation_error=None,
             runtime_error=None,
             trace=clone_trace(trace),
-            golden_trace=clone_trace(golden_trace),
+            golden_trace=(
+                golden_trace if golden_trace_is_cached else clone_trace(golden_trace)
+            ),
+        )
+
+
+def load_test_durations(path: str) -> Dict[str, float]:
+    """Loads the per-test durations (in seconds) recorded in `path`.
+
+    Returns an empty dict if the file does not exist or cannot be read.
+    """
+    try:
+        with open(path) as f:
+            durations = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {str(k): float(v) for k, v in durations.items()}
+
+
+def save_test_durations(path: str, durations: Dict[str, float]):
+    """Atomically writes the per-test `durations` to `path`."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "w") as f:
+        json.dump(durations, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+# Time a worker is given on top of a test's own timeout before it is killed.
+# The in-process timeout cannot interrupt native code (e.g. a hanging compiler
+# pass), so this is what bounds such tests.
+_KILL_GRACE_SECONDS = 30
+
+
+def _crashed_result(test: Test, reason: str) -> TestResult:
+    return TestResult(
+        unique_name=test.unique_name,
+        compilation_error=None,
+        runtime_error=reason,
+        trace=None,
+        golden_trace=None,
+    )
+
+
+def _crash_message(exitcode: Optional[int]) -> str:
+    return (
+        f"Testing process terminated (exit code {exitcode}). Either the compiler "
+        "crashed or the compiled code crashed at runtime.\n"
+    )
+
+
+def _worker_main(conn, tests: List[Test], run_test: Callable[[Test], TestResult]):
+    # This is needed because autograd does not support crossing process
+    # boundaries.
+    torch.autograd.set_grad_enabled(False)
+    while True:
+        try:
+            index = conn.recv()
+        except EOFError:
+            return
+        if index is None:
+            return
+        start = time.monotonic()
+        result = run_test(tests[index])
+        conn.send((result, time.monotonic() - start))
+
+
+class _Worker:
+    def __init__(self, context, tests: List[Test], run_test):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, tests, run_test),
+            daemon=True,
         )
+        self.process.start()
+        child_conn.close()
+        # Index of the test being run, if any.
+        self.index: Optional[int] = None
+        self.deadline = 0.0
+        self.start = 0.0
+
+    def assign(self, index: int, test: Test):
+        self.index = index
+        self.start = time.monotonic()
+        self.deadline = self.start + test.timeout_seconds + _KILL_GRACE_SECONDS
+        self.conn.send(index)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _schedule_order(tests: List[Test], durations: Dict[str, float]) -> List[int]:
+    # Longest first, so that long tests do not end up running alone at the end
+    # of the run. Tests without a recorded duration go first: they are new or
+    # have never finished.
+    return sorted(
+        range(len(tests)),
+        key=lambda i: (
+            tests[i].unique_name in durations,
+            -durations.get(tests[i].unique_name, 0.0),
+            tests[i].unique_name,
+        ),
+    )
+
+
+def _worker_context():
+    # Forked workers inherit the already imported (and registered) test suite
+    # and config instead of re-importing them.
+    if sys.platform.startswith("linux"):
+        return mp.get_context("fork")
+    return mp.get_context("spawn")
+
+
+def _run_tests_in_parallel(
+    tests: List[Test],
+    run_test: Callable[[Test], TestResult],
+    num_processes: int,
+    durations: Dict[str, float],
+    report: Callable[[TestResult], None],
+):
+    context = _worker_context()
+    pending = deque(_schedule_order(tests, durations))
+    workers = [
+        _Worker(context, tests, run_test)
+        for _ in range(min(num_processes, len(pending)))
+    ]
+    for worker in workers:
+        index = pending.popleft()
+        worker.assign(index, tests[index])
+
+    def replace(worker: _Worker, reason: str):
+        report(_crashed_result(tests[worker.index], reason))
+        workers.remove(worker)
+        if pending:
+            replacement = _Worker(context, tests, run_test)
+            index = pending.popleft()
+            replacement.assign(index, tests[index])
+            workers.append(replacement)
+
+    while workers:
+        ready = set(
+            wait(
+                [w.conn for w in workers] + [w.process.sentinel for w in workers],
+                timeout=1,
+            )
+        )
+        now = time.monotonic()
+        for worker in list(workers):
+            if worker.conn in ready:
+                try:
+                    result, duration = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.kill()
+                    replace(worker, _crash_message(worker.process.exitcode))
+                    continue
+                durations[result.unique_name] = duration
+                report(result)
+                if pending:
+                    index = pending.popleft()
+                    worker.assign(index, tests[index])
+                else:
+                    worker.stop()
+                    workers.remove(worker)
+            elif worker.process.sentinel in ready:
+                worker.kill()
+                replace(worker, _crash_message(worker.process.exitcode))
+            elif now > worker.deadline:
+                timeout_seconds = tests[worker.index].timeout_seconds
+                worker.kill()
+                replace(
+                    worker,
+                    f"Test timed out and its testing process was killed "
+                    f"(timeout={timeout_seconds}s).\n",
+                )
 
 
 def run_tests(
-    tests: List[Test], config: TestConfig, sequential=False, verbose=False
+    tests: List[Test],
+    config: TestConfig,
+    sequential=False,
+    verbose=False,
+    durations: Optional[Dict[str, float]] = None,
+    on_result: Optional[Callable[[TestResult], None]] = None,
+    golden_trace_cache: Optional[GoldenTraceCache] = None,
 ) -> List[TestResult]:
-    """Invoke the given `Test`'s with the provided `TestConfig`."""
+    """Invoke the given `Test`'s with the provided `TestConfig`.
+
+    Tests are run by a pool of worker processes, each of which is handed the
+    next test as soon as it finishes the previous one. Tests are started
+    longest first according to `durations` (test name -> seconds, e.g. from
+    `load_test_durations`), which is updated in place with the durations
+    measured by this run. A worker that crashes or hangs only fails the test it
+    was running and is replaced.
+
+    `on_result` is called with each `TestResult` as soon as it is available.
+    The returned results are sorted by test name.
+
+    If a `golden_trace_cache` is given, golden traces are taken from it
+    instead of running the tests eagerly whenever possible.
+    """
+    if durations is None:
+        durations = {}
+    results: List[TestResult] = []
+
+    def report(result: TestResult):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
     num_processes = min(int(mp.cpu_count() * 0.8) + 1, len(tests))
     try:
         env_concurrency = int(os.getenv("TORCH_MLIR_TEST_CONCURRENCY", "0"))
@@ -416,51 +759,28 @@ def run_tests(
 
     # Sort the tests to make output nicer.
     tests = list(sorted(tests, key=lambda t: t.unique_name))
-
-    # TODO: If num_processes == 1, then run without any of the multiprocessing
-    # machinery. In theory it should work, but any crash in the testing process
-    # seems to cause a cascade of failures resulting in undecipherable error
-    # messages.
-    if num_processes == 1 or sequential:
+    run_test = functools.partial(
+        compile_and_run_test,
+        config=config,
+        verbose=verbose,
+        golden_trace_cache=golden_trace_cache,
+    )
+
+    if num_processes <= 1 or sequential:
         print("Running tests sequentially with progress status")
         for test in tests:
             print(f"*** RUNNING TEST: {test.unique_name} ***")
-            compile_and_run_test(test, config, verbose)
+            start = time.monotonic()
+            result = run_test(test)
+            durations[test.unique_name] = time.monotonic() - start
+            report(result)
+        results.sort(key=lambda result: result.unique_name)
+        return results
 
     # This is needed because autograd does not support crossing process
     # boundaries.
     torch.autograd.set_grad_enabled(False)
 
-    pool = mp.Pool(num_processes)
-    arg_list = zip(tests, repeat(config))
-    pool_copy = pool._pool[:]
-    handles = pool.starmap_async(compile_and_run_test, arg_list)
-    while not handles.ready():
-        if any(proc.exitcode for proc in pool_copy):
-            print("At least one of testing processes has exited with code != 0.")
-            exit(1)
-        handles.wait(timeout=1)
-    else:
-        results = handles.get(timeout=360)
-
-    tests_with_results = {result.unique_name for result in results}
-    all_tests = {test.unique_name for test in tests}
-    # For processes that are crashed due to compile time or runtime error,
-    # the error outputs are printed out all together but no TestResult is
-    # produced when the process crashed.
-    # TODO: Find a clean way to capture the output from crashed process and
-    # create more detailed runtime_error for those tests.
-    aborted_tests = all_tests - tests_with_results
-    aborted_tests_results = [
-        TestResult(
-            unique_name=aborted_test_name,
-            compilation_error=None,
-            runtime_error="Testing process terminated. Either the compiler crashed or the compiled code crashed at runtime.\n",
-            trace=None,
-            golden_trace=None,
-        )
-        for aborted_test_name in aborted_tests
-    ]
-    results.extend(aborted_tests_results)
+    _run_tests_in_parallel(tests, run_test, num_processes, durations, report)
     results.sort(key=lambda result: result.unique_name)
     return results
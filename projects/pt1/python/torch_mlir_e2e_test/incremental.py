@@ -0,0 +1,161 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+"""
+Utilities for running a part of the e2e test suite: sharding and skipping
+tests whose previous passing result is still valid.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+import glob
+import hashlib
+import heapq
+import inspect
+import json
+import os
+import statistics
+import tempfile
+
+import torch
+
+from .framework import Test, TestConfig, TestResult, test_source_digest
+from .reporting import ErrorContext, SingleTestReport
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parses a `i/N` shard specification (with 0 <= i < N)."""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected a shard of the form i/N, got {spec!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: expected 0 <= i < N")
+    return index, count
+
+
+def shard_tests(
+    tests: List[Test], index: int, count: int, durations: Dict[str, float]
+) -> List[Test]:
+    """Returns the tests of shard `index` out of `count`.
+
+    Tests are assigned longest first to the shard with the least total
+    duration so far, using the recorded `durations` (tests without one are
+    assumed to take the median duration). The assignment only depends on the
+    names of `tests` and on `durations`, so all shards agree on it.
+    """
+    default = statistics.median(durations.values()) if durations else 1.0
+    by_duration = sorted(
+        tests, key=lambda t: (-durations.get(t.unique_name, default), t.unique_name)
+    )
+    loads = [(0.0, i) for i in range(count)]
+    shard = []
+    for test in by_duration:
+        load, i = heapq.heappop(loads)
+        if i == index:
+            shard.append(test)
+        heapq.heappush(loads, (load + durations.get(test.unique_name, default), i))
+    return shard
+
+
+def _update_with_file(h, path: str):
+    h.update(path.encode())
+    with open(path, "rb") as f:
+        h.update(f.read())
+
+
+def _python_sources_digest(package_dir: str, exclude: Set[str]) -> str:
+    h = hashlib.sha256()
+    paths = glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)
+    for path in sorted(paths):
+        if os.path.relpath(path, package_dir).split(os.sep)[0] in exclude:
+            continue
+        _update_with_file(h, path)
+    return h.hexdigest()
+
+
+def compiler_digest(config: TestConfig) -> str:
+    """Returns a digest of everything outside the tests that affects results.
+
+    This covers the torch-mlir build (see `compile_cache.compiler_build_id`),
+    the Python sources of torch-mlir and of this package (other than the test
+    suite), the source of `config`'s class and the torch version.
+    """
+    import torch_mlir
+    from torch_mlir.compile_cache import compiler_build_id
+
+    h = hashlib.sha256()
+    h.update(compiler_build_id().encode())
+    h.update(torch.__version__.encode())
+    torch_mlir_dir = os.path.dirname(torch_mlir.__file__)
+    h.update(_python_sources_digest(torch_mlir_dir, {"_mlir_libs"}).encode())
+    e2e_test_dir = os.path.dirname(__file__)
+    h.update(_python_sources_digest(e2e_test_dir, {"test_suite"}).encode())
+    _update_with_file(h, inspect.getsourcefile(type(config)))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Remembers which tests passed, and with which inputs.
+
+    A test's key covers the source files defining it (its module and invoker)
+    and the `compiler_digest`. Tests whose key is unchanged since they last
+    passed can be skipped: their result is reused. Failing tests are not
+    recorded, so they are always run again.
+
+    Args:
+      path: JSON file holding the cache. It is created if it does not exist.
+      config: The config the tests are run with.
+    """
+
+    def __init__(self, path: str, config: TestConfig):
+        self.path = path
+        self._compiler_digest = compiler_digest(config)
+        try:
+            with open(path) as f:
+                self._passed: Dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self._passed = {}
+
+    def test_key(self, test: Test) -> str:
+        h = hashlib.sha256()
+        h.update(self._compiler_digest.encode())
+        h.update(test_source_digest(test).encode())
+        return h.hexdigest()
+
+    def is_fresh(self, test: Test) -> bool:
+        """Whether `test` passed before with the same key."""
+        return self._passed.get(test.unique_name) == self.test_key(test)
+
+    @staticmethod
+    def cached_result(test: Test) -> TestResult:
+        """Returns a (passing) result standing in for a skipped test."""
+        return TestResult(
+            unique_name=test.unique_name,
+            compilation_error=None,
+            runtime_error=None,
+            trace=[],
+            golden_trace=[],
+        )
+
+    def record(self, tests: List[Test], results: List[TestResult]):
+        """Records the outcome of running `tests`."""
+        tests_by_name = {test.unique_name: test for test in tests}
+        for result in results:
+            test = tests_by_name.get(result.unique_name)
+            if test is None:
+                continue
+            if SingleTestReport(result, ErrorContext.empty()).failed:
+                self._passed.pop(result.unique_name, None)
+            else:
+                self._passed[result.unique_name] = self.test_key(test)
+
+    def save(self):
+        """Atomically writes the cache to its file."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._passed, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
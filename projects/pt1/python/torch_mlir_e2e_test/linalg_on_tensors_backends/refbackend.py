@@ -4,7 +4,11 @@
 # Also available under a BSD-style license. See LICENSE.
 
 import ctypes
+import functools
+import threading
+
 import numpy as np
+import torch
 
 from torch_mlir.ir import *
 from torch_mlir.passmanager import *
@@ -38,6 +42,12 @@ def assert_arg_type_is_supported(ty):
     ), f"Only numpy arrays with dtypes in {SUPPORTED} are supported, but got {ty}"
 
 
+def assert_tensor_type_is_supported(dtype):
+    assert (
+        dtype in torch_dtype_to_memref_type
+    ), f"Only tensors with dtypes in {list(torch_dtype_to_memref_type)} are supported, but got {dtype}"
+
+
 memref_type_to_np_dtype = {
     "mrf16": np.float16,
     "mrf32": np.float32,
@@ -49,6 +59,21 @@ memref_type_to_np_dtype = {
     "mrc32": np.complex64,
     "mrc64": np.complex128,
 }
+memref_type_to_torch_dtype = {
+    "mrf16": torch.float16,
+    "mrf32": torch.float32,
+    "mrf64": torch.float64,
+    "mri1": torch.bool,
+    "mri8": torch.int8,
+    "mri32": torch.int32,
+    "mri64": torch.int64,
+    "mrc32": torch.complex64,
+    "mrc64": torch.complex128,
+}
+torch_dtype_to_memref_type = {
+    **{dtype: ty for ty, dtype in memref_type_to_torch_dtype.items()},
+    torch.uint8: "mri8",
+}
 elemental_type_to_ctype = {
     "i1": ctypes.c_bool,
     "i8": ctypes.c_byte,
@@ -88,53 +113,250 @@ def get_ctype_func(func_name):
     return ctypes.CFUNCTYPE(*ctypes_arg), ret_types
 
 
+@functools.lru_cache(maxsize=None)
+def _ranked_memref_descriptor_type(rank: int):
+    # Same layout as the descriptors of `torch_mlir.runtime`, but the pointers
+    # are untyped so that one class per rank serves all element types.
+    fields = [
+        ("allocated", ctypes.c_void_p),
+        ("aligned", ctypes.c_void_p),
+        ("offset", ctypes.c_longlong),
+    ]
+    if rank > 0:
+        fields += [
+            ("shape", ctypes.c_longlong * rank),
+            ("strides", ctypes.c_longlong * rank),
+        ]
+    return type(f"MemRefDescriptor{rank}D", (ctypes.Structure,), {"_fields_": fields})
+
+
+def _contiguous_strides(shape):
+    strides = [1] * len(shape)
+    for i in range(len(shape) - 2, -1, -1):
+        strides[i] = strides[i + 1] * max(shape[i + 1], 1)
+    return strides
+
+
+def unranked_memref_to_tensor(unranked_memref, dtype: torch.dtype) -> torch.Tensor:
+    """Wraps the buffer of a returned memref as a tensor, without copying."""
+    rank = unranked_memref[0].rank
+    descriptor = ctypes.cast(
+        unranked_memref[0].descriptor,
+        ctypes.POINTER(_ranked_memref_descriptor_type(rank)),
+    )[0]
+    shape = tuple(descriptor.shape) if rank > 0 else ()
+    strides = tuple(descriptor.strides) if rank > 0 else ()
+    if any(size == 0 for size in shape):
+        return torch.empty(shape, dtype=dtype)
+    itemsize = dtype.itemsize
+    num_elements = 1 + sum((size - 1) * stride for size, stride in zip(shape, strides))
+    buffer = (ctypes.c_char * (num_elements * itemsize)).from_address(
+        descriptor.aligned + descriptor.offset * itemsize
+    )
+    return torch.frombuffer(buffer, dtype=dtype).as_strided(shape, strides)
+
+
+def _convert_return_values(args, ret_types, as_tensors: bool = False):
+    result = tuple(
+        [
+            (
+                arg
+                if type in elemental_type_to_ctype
+                else (
+                    unranked_memref_to_tensor(arg, memref_type_to_torch_dtype[type])
+                    if as_tensors
+                    else unranked_memref_to_numpy(arg, memref_type_to_np_dtype[type])
+                )
+            )
+            for arg, type in zip(args, ret_types)
+        ]
+    )
+    if len(result) == 1:
+        return result[0]
+    return result
+
+
+class _ResultSlot:
+    def __init__(self, as_tensors: bool):
+        self.as_tensors = as_tensors
+        self.results = []
+
+
 class RefBackendInvoker:
-    def __init__(self, module):
-        self.ee = ExecutionEngine(module)
-        self.result = None
+    """Invokes the functions of a module compiled by the RefBackend.
+
+    Functions can be called with numpy arrays (`invoker.name(*arrays)`),
+    returning numpy arrays, or with tensors through `invoke_tensors`,
+    returning tensors. In both cases the arguments and results share memory
+    with the memrefs seen by the compiled code.
+
+    Compiled functions hand their results to a registered callback instead of
+    returning them. The callback stores them in a result slot that belongs to
+    the current invocation: each thread keeps its own stack of slots, so a
+    single `ExecutionEngine` can serve concurrent (and nested) invocations.
+    """
+
+    def __init__(self, module, opt_level: int = 2, shared_libs=None):
+        self.ee = ExecutionEngine(
+            module, opt_level=opt_level, shared_libs=list(shared_libs or [])
+        )
+        self._tls = threading.local()
+        self._lookup_cache = {}
+        self._tensor_signatures = {}
+        # Keep the ctypes callbacks alive for as long as the engine is.
+        self._callbacks = []
 
         return_funcs = get_return_funcs(module)
 
         for ret_func in return_funcs:
             ctype_wrapper, ret_types = get_ctype_func(ret_func)
 
-            def consume_return_funcs(*args):
-                self.result = tuple(
-                    [
-                        (
-                            arg
-                            if type in elemental_type_to_ctype
-                            else unranked_memref_to_numpy(
-                                arg, memref_type_to_np_dtype[type]
-                            )
-                        )
-                        for arg, type in zip(args, ret_types)
-                    ]
+            def consume_return_funcs(*args, ret_types=ret_types):
+                slot = self._result_slots()[-1]
+                slot.results.append(
+                    _convert_return_values(args, ret_types, slot.as_tensors)
                 )
-                if len(self.result) == 1:
-                    self.result = self.result[0]
 
-            self.ee.register_runtime(ret_func, ctype_wrapper(consume_return_funcs))
+            callback = ctype_wrapper(consume_return_funcs)
+            self._callbacks.append(callback)
+            self.ee.register_runtime(ret_func, callback)
+
+    def _result_slots(self):
+        slots = getattr(self._tls, "slots", None)
+        if slots is None:
+            slots = self._tls.slots = []
+        return slots
+
+    def _lookup(self, function_name: str):
+        func = self._lookup_cache.get(function_name)
+        if func is None:
+            func = self.ee.lookup(function_name)
+            self._lookup_cache[function_name] = func
+        return func
+
+    def _run(self, func, packed_args, as_tensors: bool):
+        slots = self._result_slots()
+        slot = _ResultSlot(as_tensors)
+        slots.append(slot)
+        try:
+            func(packed_args)
+        finally:
+            slots.pop()
+        assert len(slot.results) == 1, "Invocation didn't produce a result"
+        return slot.results[0]
+
+    def _call(self, func, args):
+        ffi_args = []
+        for arg in args:
+            assert_arg_type_is_supported(arg.dtype)
+            ffi_args.append(
+                ctypes.pointer(ctypes.pointer(get_unranked_memref_descriptor(arg)))
+            )
+        packed_args = (ctypes.c_void_p * len(ffi_args))(
+            *[ctypes.cast(arg, ctypes.c_void_p) for arg in ffi_args]
+        )
+        return self._run(func, packed_args, as_tensors=False)
+
+    def _tensor_signature(self, args):
+        # The descriptor classes and the argument array type only depend on
+        # the dtypes and ranks of the arguments.
+        key = tuple((arg.dtype, arg.dim()) for arg in args)
+        signature = self._tensor_signatures.get(key)
+        if signature is None:
+            for arg in args:
+                assert_tensor_type_is_supported(arg.dtype)
+            signature = (
+                [_ranked_memref_descriptor_type(arg.dim()) for arg in args],
+                ctypes.c_void_p * len(args),
+            )
+            self._tensor_signatures[key] = signature
+        return signature
+
+    def _call_tensors(self, func, args):
+        descriptor_types, packed_args_type = self._tensor_signature(args)
+        packed_args = packed_args_type()
+        # Everything the packed arguments point to must outlive the call.
+        keep_alive = []
+        for i, (arg, descriptor_type) in enumerate(zip(args, descriptor_types)):
+            if arg.device.type != "cpu":
+                arg = arg.cpu()
+            # The compiled functions expect an identity layout: copy strided
+            # (and lazily conjugated or negated) inputs once.
+            if not arg.is_contiguous() or arg.is_conj() or arg.is_neg():
+                arg = arg.resolve_conj().resolve_neg().contiguous()
+            descriptor = descriptor_type()
+            descriptor.allocated = descriptor.aligned = arg.data_ptr()
+            descriptor.offset = 0
+            if arg.dim() > 0:
+                descriptor.shape[:] = arg.shape
+                descriptor.strides[:] = _contiguous_strides(arg.shape)
+            unranked = UnrankedMemRefDescriptor(arg.dim(), ctypes.addressof(descriptor))
+            pointer = ctypes.pointer(unranked)
+            packed_args[i] = ctypes.addressof(pointer)
+            keep_alive.append((arg, descriptor, unranked, pointer))
+        return self._run(func, packed_args, as_tensors=True)
+
+    def invoke_tensors(self, function_name: str, args):
+        """Invokes `function_name` on the tensors `args`, returning tensors.
+
+        Unlike calling the function with numpy arrays, this builds the memref
+        descriptors straight from the tensors' storage and wraps the returned
+        buffers as tensors without going through numpy.
+        """
+        return self._call_tensors(self._lookup(function_name), args)
+
+    def invoke_batch(self, function_name: str, batch):
+        """Invokes `function_name` once for each argument tuple in `batch`.
+
+        Returns the list of results, in the order of `batch`. The function is
+        looked up once for the whole batch.
+        """
+        func = self._lookup(function_name)
+        return [self._call(func, args) for args in batch]
 
     def __getattr__(self, function_name: str):
-        def invoke(*args):
-            ffi_args = []
-            for arg in args:
-                assert_arg_type_is_supported(arg.dtype)
-                ffi_args.append(
-                    ctypes.pointer(ctypes.pointer(get_unranked_memref_descriptor(arg)))
-                )
+        if function_name.startswith("__"):
+            raise AttributeError(function_name)
 
-            self.ee.invoke(function_name, *ffi_args)
-            result = self.result
-            assert result is not None, "Invocation didn't produce a result"
-            self.result = None
-            return result
+        def invoke(*args):
+            return self._call(self._lookup(function_name), args)
 
         return invoke
 
 
-def lowering_pipeline(generate_runtime_verification: bool):
+def _loop_lowering_passes(optimize: bool, parallel: bool, tile_size: int):
+    if not optimize:
+        return ["func.func(convert-linalg-to-loops)"]
+    # Optimized tier: go through affine loops, which upstream MLIR can tile,
+    # vectorize and parallelize with plain passes (no transform scripts).
+    passes = [
+        "func.func(convert-linalg-to-affine-loops)",
+        "func.func(affine-loop-invariant-code-motion)",
+        f"func.func(affine-loop-tile{{tile-size={tile_size}}})",
+        "func.func(affine-super-vectorize{virtual-vector-size=8})",
+    ]
+    if parallel:
+        # Only the outermost parallel loop of each nest becomes a
+        # `scf.parallel` (and then an OpenMP worksharing loop); nested
+        # parallel regions only add scheduling overhead.
+        passes += ["func.func(affine-parallelize{max-nested=1})"]
+    passes += [
+        "func.func(canonicalize)",
+        "func.func(lower-affine)",
+        "func.func(convert-vector-to-scf)",
+    ]
+    if parallel:
+        passes += ["convert-scf-to-openmp"]
+    return passes
+
+
+def lowering_pipeline(
+    generate_runtime_verification: bool,
+    optimize: bool = False,
+    parallel: bool = False,
+    tile_size: int = 32,
+):
+    assert optimize or not parallel, "parallel lowering requires optimize=True"
     passes = [
         # Apply some optimizations. It would be great if MLIR had more useful
         # optimizations that worked out of the box here.
@@ -178,7 +400,7 @@ def lowering_pipeline(generate_runtime_verification: bool):
         # Lower to LLVM
         "func.func(tm-tensor-to-loops)",
         "func.func(refback-munge-memref-copy)",
-        "func.func(convert-linalg-to-loops)",
+        *_loop_lowering_passes(optimize, parallel, tile_size),
         "func.func(lower-affine)",
         "convert-scf-to-cf",
     ]
@@ -200,6 +422,10 @@ def lowering_pipeline(generate_runtime_verification: bool):
         "convert-func-to-llvm",
         "convert-cf-to-llvm",
         "convert-complex-to-llvm",
+    ]
+    if parallel:
+        passes += ["convert-openmp-to-llvm"]
+    passes += [
         "reconcile-unrealized-casts",
     ]
 
@@ -207,11 +433,47 @@ def lowering_pipeline(generate_runtime_verification: bool):
 
 
 class RefBackendLinalgOnTensorsBackend(LinalgOnTensorsBackend):
-    """Main entry-point for the reference backend."""
-
-    def __init__(self, generate_runtime_verification: bool = True):
+    """Main entry-point for the reference backend.
+
+    By default, linalg ops are lowered straight to scalar loops, which is
+    simple and robust but slow. Passing `optimize=True` selects a tier that
+    tiles and vectorizes loop nests, and `parallel=True` additionally
+    distributes the outermost parallel loops across OpenMP threads. The
+    parallel tier requires an OpenMP runtime library (e.g. LLVM's
+    `libomp.so`) to be listed in `shared_libs`; the thread count is taken
+    from `OMP_NUM_THREADS`.
+
+    Args:
+      generate_runtime_verification: Insert runtime checks (e.g. for
+        out-of-bounds accesses) into the compiled code.
+      optimize: Tile and vectorize loops during lowering.
+      parallel: Run parallel loops on multiple threads (implies `optimize`).
+      tile_size: Tile size used by the optimized tier.
+      opt_level: LLVM optimization level of the ExecutionEngine.
+      shared_libs: Shared libraries to load into the ExecutionEngine.
+    """
+
+    def __init__(
+        self,
+        generate_runtime_verification: bool = True,
+        *,
+        optimize: bool = False,
+        parallel: bool = False,
+        tile_size: int = 32,
+        opt_level: int = 2,
+        shared_libs=None,
+    ):
         super().__init__()
+        if parallel and not shared_libs:
+            raise ValueError(
+                "parallel=True requires the OpenMP runtime library in `shared_libs`"
+            )
         self.generate_runtime_verification = generate_runtime_verification
+        self.optimize = optimize or parallel
+        self.parallel = parallel
+        self.tile_size = tile_size
+        self.opt_level = opt_level
+        self.shared_libs = list(shared_libs or [])
 
     def compile(self, imported_module: Module):
         """Compiles an imported module, with a flat list of functions.
@@ -228,7 +490,12 @@ class RefBackendLinalgOnTensorsBackend(LinalgOnTensorsBackend):
         """
         run_pipeline_with_repro_report(
             imported_module,
-            lowering_pipeline(self.generate_runtime_verification),
+            lowering_pipeline(
+                self.generate_runtime_verification,
+                optimize=self.optimize,
+                parallel=self.parallel,
+                tile_size=self.tile_size,
+            ),
             "Lowering Linalg-on-Tensors IR to LLVM with RefBackend",
             enable_ir_printing=False,
         )
@@ -236,4 +503,6 @@ class RefBackendLinalgOnTensorsBackend(LinalgOnTensorsBackend):
 
     def load(self, module) -> RefBackendInvoker:
         """Loads a compiled artifact into the runtime."""
-        return RefBackendInvoker(module)
+        return RefBackendInvoker(
+            module, opt_level=self.opt_level, shared_libs=self.shared_libs
+        )
@@ -9,10 +9,19 @@
 
 #include "mlir/Bindings/Python/PybindAdaptors.h"
 #include "torch-mlir-c/Dialects.h"
+#include "torch-mlir-c/PassProfiling.h"
 #include "torch-mlir-c/Registration.h"
 
+#include <string>
+
 namespace py = pybind11;
 
+namespace {
+struct PyPassProfiler {
+  TorchMlirPassProfiler profiler;
+};
+} // namespace
+
 PYBIND11_MODULE(_torchMlir, m) {
   torchMlirRegisterAllPasses();
 
@@ -29,6 +38,37 @@ PYBIND11_MODULE(_torchMlir, m) {
       },
       py::arg("context"), py::arg("load") = true);
 
+  py::class_<PyPassProfiler>(m, "PassProfiler")
+      .def(
+          "to_json",
+          [](PyPassProfiler &self) {
+            std::string json;
+            torchMlirPassProfilerPrintAsJSON(
+                self.profiler,
+                [](MlirStringRef part, void *userData) {
+                  static_cast<std::string *>(userData)->append(part.data,
+                                                               part.length);
+                },
+                &json);
+            return json;
+          },
+          "Returns the recorded per-pass profile as a JSON string.")
+      .def(
+          "reset",
+          [](PyPassProfiler &self) {
+            torchMlirPassProfilerReset(self.profiler);
+          },
+          "Discards the recorded profile.");
+
+  // The profiler is owned by the pass manager, so keep it alive for as long
+  // as the profiler is.
+  m.def(
+      "add_pass_profiler",
+      [](MlirPassManager passManager) {
+        return PyPassProfiler{torchMlirPassManagerAddProfiler(passManager)};
+      },
+      py::arg("pass_manager"), py::keep_alive<0, 1>());
+
   m.def("get_int64_max", []() { return INT64_MAX; });
 
   m.def("get_int64_min", []() { return INT64_MIN; });
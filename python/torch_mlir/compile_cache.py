@@ -0,0 +1,265 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Persistent, size-bounded cache of compiled (lowered) MLIR modules.
+
+Entries are stored as MLIR bytecode files in a cache directory and are keyed
+by a digest of everything that influences the compilation result (see
+`CompilationCache.make_key`). Least recently used entries are evicted once the
+total size of the cache exceeds its bound.
+"""
+
+from dataclasses import dataclass
+import functools
+import glob
+import hashlib
+import inspect
+from importlib.metadata import version, PackageNotFoundError
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import torch
+from torch.export import ExportedProgram
+
+from . import ir
+
+__all__ = [
+    "CacheStats",
+    "CompilationCache",
+    "compiler_build_id",
+]
+
+_ENTRY_SUFFIX = ".mlirbc"
+
+
+def compiler_build_id() -> str:
+    """Returns a string identifying the torch-mlir build in use.
+
+    This is the installed package version (if any) combined with the identity
+    (name, size and modification time) of every shared library in
+    `_mlir_libs`, so that development builds which do not bump the version
+    still produce distinct ids after a rebuild. This includes the Python
+    extensions and `libTorchMLIRAggregateCAPI`, which holds the compiler
+    passes.
+    """
+    try:
+        package_version = version("torch-mlir")
+    except PackageNotFoundError:
+        package_version = "unknown"
+    libs_dir = os.path.join(os.path.dirname(__file__), "_mlir_libs")
+    libs = set()
+    for pattern in ("*.so", "*.so.*", "*.dylib", "*.pyd", "*.dll"):
+        libs.update(glob.glob(os.path.join(libs_dir, pattern)))
+    parts = [package_version]
+    for lib in sorted(libs):
+        st = os.stat(lib)
+        parts.append(f"{os.path.basename(lib)}:{st.st_size}:{st.st_mtime_ns}")
+    return ";".join(parts)
+
+
+def _update_with_tensor(h, t: torch.Tensor):
+    # Conjugate and negative views must be materialized before their bytes
+    # can be read (see `_tensor_to_ndarray` in the FX importer).
+    t = t.detach().resolve_conj().resolve_neg()
+    h.update(f"{t.dtype}{tuple(t.shape)}".encode())
+    if t.device.type != "cpu":
+        t = t.cpu()
+    if t.numel() > 0:
+        h.update(t.contiguous().reshape(-1).view(torch.uint8).numpy().data)
+
+
+def _callable_identity(fn: Callable) -> str:
+    """Returns a string identifying the implementation of `fn`.
+
+    This is its qualified name plus a digest of its bytecode and constants (or
+    of its source, if available), so that replacing a decomposition with a
+    different function for the same op changes the cache key.
+    """
+    if isinstance(fn, functools.partial):
+        return (
+            f"partial({_callable_identity(fn.func)}, {fn.args!r}, "
+            f"{sorted(fn.keywords.items())!r})"
+        )
+    qualname = getattr(fn, "__qualname__", type(fn).__qualname__)
+    name = f"{getattr(fn, '__module__', None)}.{qualname}"
+    code = getattr(inspect.unwrap(fn), "__code__", None)
+    if code is None:
+        return name
+    h = hashlib.sha256()
+    try:
+        h.update(inspect.getsource(code).encode())
+    except (OSError, TypeError):
+        h.update(code.co_code)
+        h.update(repr(code.co_consts).encode())
+    return f"{name}:{h.hexdigest()}"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class CompilationCache:
+    """On-disk cache of compiled modules.
+
+    The cache is safe to share between processes: entries are written
+    atomically and a missing entry (i.e. evicted by another process) is simply
+    treated as a miss.
+
+    Args:
+      cache_dir: Directory holding the entries. Defaults to
+        `$TORCH_MLIR_CACHE_DIR` or `~/.cache/torch-mlir/compile`.
+      max_size_bytes: Upper bound on the total size of all entries. Least
+        recently used entries are evicted when a store exceeds it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        *,
+        max_size_bytes: int = 1 << 30,
+    ):
+        if cache_dir is None:
+            cache_dir = os.environ.get(
+                "TORCH_MLIR_CACHE_DIR",
+                os.path.join(os.path.expanduser("~"), ".cache", "torch-mlir"),
+            )
+            cache_dir = os.path.join(cache_dir, "compile")
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.stats = CacheStats()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        prog: ExportedProgram,
+        *,
+        decomposition_table: Optional[Dict[Any, Callable]],
+        pipelines: Iterable[str],
+        output_type: str,
+        options: Iterable[Any] = (),
+    ) -> str:
+        """Computes the cache key for compiling `prog`.
+
+        The key covers the exported graph and its signature, the shapes and
+        dtypes of its inputs and range constraints, the contents of all
+        parameters, buffers and constants (which are frozen into the
+        compiled module), the ops of the decomposition table and the identity
+        of their decompositions, the pipeline strings, the
+        output type, any extra `options` and the torch and torch-mlir
+        versions.
+        """
+        h = hashlib.sha256()
+
+        def add(value: Any):
+            h.update(str(value).encode())
+            h.update(b"\0")
+
+        add(torch.__version__)
+        add(compiler_build_id())
+        add(prog.graph_module.code)
+        add(prog.graph_signature)
+        add(sorted((str(k), str(v)) for k, v in prog.range_constraints.items()))
+        for node in prog.graph.nodes:
+            if node.op == "placeholder":
+                add(node.name)
+                add(node.meta.get("val"))
+        for name, t in sorted(prog.state_dict.items()):
+            add(name)
+            _update_with_tensor(h, t)
+        for name, t in sorted(getattr(prog, "constants", {}).items()):
+            add(name)
+            if isinstance(t, torch.Tensor):
+                _update_with_tensor(h, t)
+            else:
+                add(t)
+        for op, fn in sorted(
+            (decomposition_table or {}).items(), key=lambda item: str(item[0])
+        ):
+            add(op)
+            add(_callable_identity(fn))
+        for pipeline in pipelines:
+            add(pipeline)
+        add(output_type)
+        for option in options:
+            add(option)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def load(self, key: str, context: ir.Context) -> Optional[ir.Module]:
+        """Loads the module stored under `key` into `context` (if present)."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark as recently used for eviction purposes.
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return ir.Module.parse(data, context=context)
+
+    def store(self, key: str, module: ir.Module):
+        """Stores `module` as bytecode under `key` and enforces the size bound."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                module.operation.write_bytecode(f)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.stats.stores += 1
+        self._evict()
+
+    def invalidate(self, key: Optional[str] = None):
+        """Removes the entry for `key`, or all entries if `key` is None."""
+        if key is not None:
+            paths = [self._path(key)]
+        else:
+            paths = glob.glob(os.path.join(self.cache_dir, "*" + _ENTRY_SUFFIX))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def size_bytes(self) -> int:
+        """Returns the total size of all entries in the cache."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*" + _ENTRY_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime_ns))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size_bytes:
+            return
+        # Oldest first.
+        entries.sort(key=lambda e: e[2])
+        for path, size, _ in entries:
+            if total <= self.max_size_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.stats.evictions += 1
@@ -0,0 +1,277 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Callable wrapper caching compiled backend modules per input signature.
+
+See `CompiledModule`.
+"""
+
+import bisect
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.utils._pytree as pytree
+from torch.export import Dim
+from torch.export.graph_signature import OutputKind
+
+from . import fx
+from .compile_cache import CacheStats, CompilationCache
+from .compiler_session import CompilerSession
+from .compiler_utils import OutputType
+
+__all__ = [
+    "CompiledModule",
+    "invoke_backend",
+]
+
+
+def _power_of_two_bucket(size: int) -> Tuple[int, Optional[int]]:
+    # Sizes 0 and 1 are specialized, so 2 shares the bucket of 3 and 4.
+    if size <= 4:
+        return 2, 4
+    upper = 1 << (size - 1).bit_length()
+    return upper // 2 + 1, upper
+
+
+def _constant_key(value) -> Hashable:
+    """Returns the cache key of a non-tensor argument."""
+    try:
+        hash(value)
+        return type(value), value
+    except TypeError:
+        pass
+    # Unhashable containers (lists, dicts, ...) are keyed by their structure
+    # and leaves.
+    leaves, spec = pytree.tree_flatten(value)
+    if spec.is_leaf() or any(isinstance(leaf, torch.Tensor) for leaf in leaves):
+        raise TypeError(
+            f"CompiledModule arguments must be tensors or (containers of) "
+            f"hashable constants, got {type(value).__name__}"
+        )
+    return str(spec), tuple(_constant_key(leaf) for leaf in leaves)
+
+
+def invoke_backend(invoker, func_name: str, inputs: Sequence[Any]):
+    """Invokes `func_name` of a loaded backend module on torch `inputs`.
+
+    Invokers that accept tensors directly (i.e. implement `invoke_tensors`,
+    like the RefBackend's) are called without a round trip through numpy;
+    others are called with numpy arrays. The results are returned as tensors.
+    """
+    if getattr(type(invoker), "invoke_tensors", None) is not None and all(
+        isinstance(x, torch.Tensor) for x in inputs
+    ):
+        return invoker.invoke_tensors(func_name, list(inputs))
+    with torch.no_grad():
+        numpy_inputs = pytree.tree_map_only(
+            torch.Tensor, lambda x: x.detach().cpu().numpy(), list(inputs)
+        )
+    return pytree.tree_map_only(
+        np.ndarray, torch.from_numpy, getattr(invoker, func_name)(*numpy_inputs)
+    )
+
+
+class _Entry:
+    def __init__(self, invoker, func_name: str, user_outputs: Sequence[bool]):
+        self.invoker = invoker
+        self.func_name = func_name
+        self.user_outputs = user_outputs
+
+    def __call__(self, inputs):
+        return invoke_backend(self.invoker, self.func_name, inputs)
+
+
+class CompiledModule:
+    """Compiles `module` on demand and runs it on a backend.
+
+    Calling the wrapper exports, imports, lowers, compiles and loads `module`
+    for the signature (dtypes and shapes) of the given arguments, unless a
+    backend module for that signature is already cached. At most
+    `max_entries` backend modules are kept; the least recently used one is
+    evicted when a new signature needs to be compiled.
+
+    By default every distinct shape is compiled separately. Dimensions listed
+    in `dynamic_dims` (argument position -> dimension indices) are instead
+    exported as dynamic and rounded up to a bucket: all sizes in the same
+    bucket share one compiled module, so a steady stream of varying sizes
+    stops recompiling once every bucket has been seen. `buckets` is the
+    sorted list of bucket upper bounds (sizes above the last one share an
+    unbounded bucket); powers of two are used if it is None. Sizes 0 and 1
+    are always specialized, like `torch.export` does, and so is any bucket
+    that only holds a single size.
+
+    Non-tensor arguments are compiled in as constants, so every distinct
+    value gets its own compiled module.
+
+    Parameters are frozen into the compiled modules when they are compiled;
+    buffers are passed to them on every call.
+
+    Args:
+      module: The module to compile.
+      backend: A `LinalgOnTensorsBackend` (or any object with `compile` and
+        `load` methods accepting the module produced for `output_type`).
+      output_type: The output type `backend.compile` expects.
+      dynamic_dims: Dimensions to export as dynamic, per argument position.
+      buckets: Upper bounds of the size buckets of dynamic dimensions.
+      max_entries: Number of compiled modules kept in memory.
+      strict: Whether to export in strict mode.
+      compile_cache: Passed to `fx.export_and_import`.
+      session: Passed to `fx.export_and_import`.
+      **import_kwargs: Other keyword arguments of `fx.export_and_import`.
+    """
+
+    def __init__(
+        self,
+        module: nn.Module,
+        backend,
+        *,
+        output_type: Union[str, OutputType] = OutputType.LINALG_ON_TENSORS,
+        dynamic_dims: Optional[Dict[int, Sequence[int]]] = None,
+        buckets: Optional[Sequence[int]] = None,
+        max_entries: int = 8,
+        strict: bool = False,
+        compile_cache: Optional[CompilationCache] = None,
+        session: Optional[CompilerSession] = None,
+        **import_kwargs,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if buckets is not None and list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be sorted")
+        self.module = module
+        self.backend = backend
+        self.output_type = OutputType.get(output_type)
+        self.dynamic_dims = {i: tuple(dims) for i, dims in (dynamic_dims or {}).items()}
+        self.buckets = list(buckets) if buckets is not None else None
+        self.max_entries = max_entries
+        self.strict = strict
+        self.compile_cache = compile_cache
+        self.session = session
+        self.import_kwargs = import_kwargs
+        self.func_name = import_kwargs.pop("func_name", module.__class__.__name__)
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # Signatures being compiled, so that concurrent callers wait for one
+        # compilation instead of starting their own.
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, size: int) -> Tuple[int, Optional[int]]:
+        if self.buckets is None:
+            return _power_of_two_bucket(size)
+        i = bisect.bisect_left(self.buckets, size)
+        lower = self.buckets[i - 1] + 1 if i > 0 else 0
+        upper = self.buckets[i] if i < len(self.buckets) else None
+        return lower, upper
+
+    def _signature(self, args: Sequence[Any]):
+        """Returns the cache key of `args` and the export `dynamic_shapes`."""
+        key = []
+        dynamic_shapes = []
+        for i, arg in enumerate(args):
+            if not isinstance(arg, torch.Tensor):
+                key.append(_constant_key(arg))
+                dynamic_shapes.append(None)
+                continue
+            shape = []
+            arg_dynamic_shapes = {}
+            for d, size in enumerate(arg.shape):
+                if d not in self.dynamic_dims.get(i, ()) or size < 2:
+                    shape.append(size)
+                    continue
+                lower, upper = self._bucket(size)
+                lower = max(lower, 2)
+                if upper is not None and upper <= lower:
+                    shape.append(size)
+                    continue
+                shape.append((lower, upper))
+                arg_dynamic_shapes[d] = Dim(f"arg{i}_dim{d}", min=lower, max=upper)
+            key.append((arg.dtype, tuple(shape)))
+            dynamic_shapes.append(arg_dynamic_shapes or None)
+        return tuple(key), tuple(dynamic_shapes)
+
+    def _compile(self, args: Sequence[Any], dynamic_shapes) -> _Entry:
+        prog = torch.export.export(
+            self.module,
+            tuple(args),
+            dynamic_shapes=dynamic_shapes if any(dynamic_shapes) else None,
+            strict=self.strict,
+        )
+        mlir_module = fx.export_and_import(
+            prog,
+            output_type=self.output_type,
+            func_name=self.func_name,
+            compile_cache=self.compile_cache,
+            session=self.session,
+            **self.import_kwargs,
+        )
+        invoker = self.backend.load(self.backend.compile(mlir_module))
+        user_outputs = [
+            spec.kind == OutputKind.USER_OUTPUT
+            for spec in prog.graph_signature.output_specs
+        ]
+        return _Entry(invoker, self.func_name, user_outputs)
+
+    def _lookup(self, args: Sequence[Any]) -> _Entry:
+        key, dynamic_shapes = self._signature(args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+                self.stats.misses += 1
+                compiling = True
+            else:
+                self.stats.hits += 1
+                compiling = False
+        if not compiling:
+            return future.result()
+
+        # Compile outside of the lock, so that other signatures stay usable.
+        try:
+            entry = self._compile(args, dynamic_shapes)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self.stats.stores += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        future.set_result(entry)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Drops all compiled modules."""
+        with self._lock:
+            self._entries.clear()
+
+    def __call__(self, *args):
+        entry = self._lookup(args)
+        buffers, _ = pytree.tree_flatten(
+            dict(self.module.named_buffers(remove_duplicate=False))
+        )
+        outputs = entry(list(buffers) + list(args))
+        if isinstance(outputs, tuple):
+            outputs = tuple(
+                value for value, is_user in zip(outputs, entry.user_outputs) if is_user
+            )
+        return outputs
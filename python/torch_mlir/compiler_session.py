@@ -0,0 +1,107 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+"""Reusable compilation state for compiling many graphs in one process.
+
+See `CompilerSession`.
+"""
+
+from contextlib import contextmanager
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from . import ir
+from .dialects import torch as torch_d
+from .passmanager import PassManager
+
+__all__ = [
+    "CompilerSession",
+]
+
+
+class CompilerSession:
+    """A warm MLIR context and pools of parsed pass managers.
+
+    Creating a context, loading the dialects and parsing pass pipelines is a
+    noticeable part of the latency of compiling small graphs. A session does
+    this once and reuses it across compiles: pass it as `session=` to
+    `fx.export_and_import`, `fx.stateless_fx_import`, `lower_mlir_module` or
+    `run_pipeline_with_repro_report`. All modules produced through a session
+    live in its context, and the context's thread pool is shared by all of
+    them.
+
+    Everything uniqued in a context (types, attributes, resource blobs such as
+    imported weights) lives as long as the context does. The session
+    therefore starts over with a fresh context every `recycle_after` compiles
+    (never, if None). Modules produced earlier stay valid, since they keep
+    their context alive.
+
+    A session can be used from multiple threads: pipelines that run
+    concurrently each get their own pass manager.
+
+    Args:
+      recycle_after: Number of compiles after which the context is replaced.
+      enable_multithreading: Whether the context runs passes on its thread
+        pool.
+    """
+
+    def __init__(
+        self,
+        *,
+        recycle_after: Optional[int] = 1000,
+        enable_multithreading: bool = True,
+    ):
+        self.recycle_after = recycle_after
+        self.enable_multithreading = enable_multithreading
+        self._lock = threading.Lock()
+        self._context = None
+        self._compiles = 0
+        self._idle_pass_managers: Dict[str, List[PassManager]] = {}
+        self._new_context()
+
+    def _new_context(self):
+        context = ir.Context()
+        torch_d.register_dialect(context)
+        context.enable_multithreading(self.enable_multithreading)
+        self._context = context
+        self._compiles = 0
+        # Pass managers are bound to the context they were parsed in.
+        self._idle_pass_managers = {}
+
+    @property
+    def context(self) -> ir.Context:
+        """The context new compiles should use."""
+        return self._context
+
+    def begin_compile(self) -> ir.Context:
+        """Accounts for a new compile and returns the context it should use."""
+        with self._lock:
+            if self.recycle_after is not None and self._compiles >= self.recycle_after:
+                self._new_context()
+            self._compiles += 1
+            return self._context
+
+    @contextmanager
+    def pass_manager(self, pipeline: str, context: ir.Context) -> Iterator[PassManager]:
+        """Checks out a pass manager for `pipeline` in `context`.
+
+        Pass managers are pooled per pipeline string (which includes the
+        pipeline's options) and are returned to the pool on exit. Pass
+        managers for contexts other than the session's current one are parsed
+        on demand and not pooled.
+        """
+        with self._lock:
+            pooled = context is self._context
+            idle = self._idle_pass_managers.get(pipeline) if pooled else None
+            pm = idle.pop() if idle else None
+        if pm is None:
+            pm = PassManager.parse(pipeline, context=context)
+        try:
+            yield pm
+        finally:
+            with self._lock:
+                # The context may have been recycled in the meantime.
+                if pooled and context is self._context:
+                    self._idle_pass_managers.setdefault(pipeline, []).append(pm)
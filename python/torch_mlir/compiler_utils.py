@@ -4,14 +4,18 @@
 # Also available under a BSD-style license. See LICENSE.
 from enum import Enum
 from io import StringIO
+import json
 import os
 import sys
 import tempfile
-from typing import Union, List
+import time
+from typing import Any, Dict, List, Optional, Union
 
 import torch
 from .passmanager import PassManager
 from .ir import StringAttr
+from ._mlir_libs._torchMlir import add_pass_profiler
+from .compiler_session import CompilerSession
 
 
 class TensorPlaceholder:
@@ -72,43 +76,152 @@ def get_module_name_for_debug_dump(module):
     return StringAttr(module.operation.attributes["torch.debug_module_name"]).value
 
 
+BACKEND_CONTRACT_STATISTICS_ATTR = "torch.backend_contract_statistics"
+
+
+def pop_backend_contract_statistics(module) -> List[Dict[str, Any]]:
+    """Removes and returns the statistics recorded on `module` by
+    `torch-lower-to-backend-contract{record-statistics}`.
+
+    The compile entry points (e.g. `fx.export_and_import`,
+    `torchscript.compile`) call this for their `backend_contract_statistics`
+    argument.
+
+    Returns one dict per iteration of the simplification pipeline with the
+    keys `iteration`, `functions`, `skipped_functions`, `illegal_ops`,
+    `time_ms` and `pass_times_ms` (a list of `{"pass", "time_ms"}` dicts), or
+    an empty list if no statistics were recorded.
+    """
+    attributes = module.operation.attributes
+    if BACKEND_CONTRACT_STATISTICS_ATTR not in attributes:
+        return []
+    statistics = json.loads(
+        StringAttr(attributes[BACKEND_CONTRACT_STATISTICS_ATTR]).value
+    )
+    del attributes[BACKEND_CONTRACT_STATISTICS_ATTR]
+    return statistics
+
+
 class TorchMlirCompilerError(Exception):
     pass
 
 
+class CompileProfile:
+    """Per-pass profile of the pipelines run during a compilation.
+
+    Pass an instance as the `profile` argument of the compile entry points
+    (e.g. `fx.export_and_import`, `torchscript.compile`, `lower_mlir_module`)
+    to enable profiling. Afterwards, `stages` holds one entry per pipeline
+    run, in order of execution:
+
+      {"description": str, "pipeline": str, "time_ms": float,
+       "passes": [pass, ...]}
+
+    where each pass entry aggregates all runs of one pass:
+
+      {"pass": str, "op": str, "count": int, "time_ms": float,
+       "ops_before": int, "ops_after": int, "failed": bool,
+       "rss_bytes": int, "children": [pass, ...]}
+
+    `ops_before`/`ops_after` are summed over all runs, `rss_bytes` is the
+    largest resident set size observed after a run (Linux only) and
+    `children` holds the passes of nested pipelines (e.g. `func.func(...)`)
+    and of pipelines run dynamically by the pass.
+
+    Profiling counts the ops of the IR before and after every pass, so it
+    slows compilation down noticeably.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stages": self.stages}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def _record(self, description: str, pipeline: str, time_ms: float, profiler):
+        self.stages.append(
+            {
+                "description": description,
+                "pipeline": pipeline,
+                "time_ms": time_ms,
+                "passes": json.loads(profiler.to_json()),
+            }
+        )
+
+
+def get_repro_dir() -> str:
+    """Returns the directory that failing pipelines write their repro to.
+
+    This is `$TORCH_MLIR_REPRO_DIR` if set, and the system temporary
+    directory otherwise.
+    """
+    return os.environ.get("TORCH_MLIR_REPRO_DIR", tempfile.gettempdir())
+
+
+def _write_repro(snapshot, module_name: str, repro_dir: str) -> str:
+    os.makedirs(repro_dir, exist_ok=True)
+    # mkstemp picks a fresh name atomically, so concurrent failures (e.g. in
+    # a parallel test suite) never overwrite each other's repro.
+    fd, filename = tempfile.mkstemp(
+        prefix=module_name + "-", suffix=".mlir", dir=repro_dir
+    )
+    with os.fdopen(fd, "w") as f:
+        snapshot.print(file=f, large_elements_limit=10, enable_debug_info=True)
+    return filename
+
+
 def run_pipeline_with_repro_report(
-    module, pipeline: str, description: str, enable_ir_printing: bool = False
+    module,
+    pipeline: str,
+    description: str,
+    enable_ir_printing: bool = False,
+    repro_dir: Optional[str] = None,
+    profile: Optional[CompileProfile] = None,
+    session: Optional[CompilerSession] = None,
 ):
-    """Runs `pipeline` on `module`, with a nice repro report if it fails."""
+    """Runs `pipeline` on `module`, with a nice repro report if it fails.
+
+    The pipeline modifies `module` in place, so a clone of the input is kept
+    while it runs. The clone is only printed (to a new file in `repro_dir`,
+    which defaults to `get_repro_dir()`) if the pipeline fails.
+
+    If `profile` is given, the per-pass profile of the run is added to it.
+
+    If a `session` is given, the parsed pipeline is taken from (and returned
+    to) its pool of pass managers instead of being parsed anew, unless IR
+    printing or profiling need to instrument it.
+    """
     module_name = get_module_name_for_debug_dump(module)
     original_stderr = sys.stderr
+    # Cloning shares the (uniqued) attributes with the original module, so
+    # this is much cheaper than printing it, in particular for large weights.
+    snapshot = module.operation.clone()
+    profiler = None
+    start = time.perf_counter()
     try:
         sys.stderr = StringIO()
-        asm_for_error_report = module.operation.get_asm(
-            large_elements_limit=10, enable_debug_info=True
-        )
         # Lower module in place to make it ready for compiler backends.
         with module.context as ctx:
             # TODO(#3506): Passes can emit errors but not signal failure,
             # which causes a native assert.
             ctx.emit_error_diagnostics = True
-            pm = PassManager.parse(pipeline)
-            if enable_ir_printing:
-                ctx.enable_multithreading(False)
-                pm.enable_ir_printing()
-            pm.run(module.operation)
+            if session is not None and not enable_ir_printing and profile is None:
+                with session.pass_manager(pipeline, ctx) as pm:
+                    pm.run(module.operation)
+            else:
+                pm = PassManager.parse(pipeline)
+                if enable_ir_printing:
+                    ctx.enable_multithreading(False)
+                    pm.enable_ir_printing()
+                if profile is not None:
+                    profiler = add_pass_profiler(pm)
+                start = time.perf_counter()
+                pm.run(module.operation)
     except Exception as e:
-        # TODO: More robust.
-        # - don't arbitrarily clutter up /tmp. When a test suite has many
-        #   tests, this can be a big disk cost (also, /tmp/ is frequently a
-        #   RAM fs, which increases worries about capacity).
-        # - don't have colliding filenames (hard to do without cluttering
-        #   up /tmp)
-        # - if we do have have colliding filenames, writes should at least
-        #   avoid being racy.
-        filename = os.path.join(tempfile.gettempdir(), module_name + ".mlir")
-        with open(filename, "w") as f:
-            f.write(asm_for_error_report)
+        filename = _write_repro(snapshot, module_name, repro_dir or get_repro_dir())
         debug_options = "-mlir-print-ir-after-all -mlir-disable-threading"
         # Put something descriptive here even if description is empty.
         description = description or f"{module_name} compile"
@@ -127,6 +240,10 @@ def run_pipeline_with_repro_report(
         raise TorchMlirCompilerError(trimmed_message) from None
     finally:
         sys.stderr = original_stderr
+        snapshot.erase()
+        if profiler is not None:
+            time_ms = (time.perf_counter() - start) * 1e3
+            profile._record(description, pipeline, time_ms, profiler)
 
 
 class OutputType(Enum):
@@ -179,7 +296,13 @@ class OutputType(Enum):
         return OutputType[spec]
 
 
-def lower_mlir_module(verbose, output_type, module):
+def lower_mlir_module(
+    verbose,
+    output_type,
+    module,
+    profile: Optional[CompileProfile] = None,
+    session: Optional[CompilerSession] = None,
+):
     if verbose:
         print("\n====================")
         print("Torch Backend IR")
@@ -193,6 +316,8 @@ def lower_mlir_module(verbose, output_type, module):
             module,
             "builtin.module(torch-backend-to-tosa-backend-pipeline)",
             "Lowering Torch Backend IR -> TOSA Backend IR",
+            profile=profile,
+            session=session,
         )
         if verbose:
             print("\n====================")
@@ -205,6 +330,8 @@ def lower_mlir_module(verbose, output_type, module):
             module,
             "builtin.module(torch-backend-to-linalg-on-tensors-backend-pipeline)",
             "Lowering Torch Backend IR -> Linalg-on-Tensors Backend IR",
+            profile=profile,
+            session=session,
         )
         if verbose:
             print("\n====================")
@@ -217,6 +344,8 @@ def lower_mlir_module(verbose, output_type, module):
             module,
             "builtin.module(torch-backend-to-stablehlo-backend-pipeline)",
             "Lowering Torch Backend IR -> StableHLO Backend IR",
+            profile=profile,
+            session=session,
         )
         if verbose:
             print("\n====================")
@@ -11,6 +11,7 @@ except ImportError:
     # python less than 3.10 doesn't have NoneType
     NoneType = type(None)
 
+import hashlib
 import logging
 import operator
 import re
@@ -225,6 +226,16 @@ if ml_dtypes is not None:
     TORCH_DTYPE_TO_NPY_TYPE[torch.float8_e5m2fnuz] = ml_dtypes.float8_e5m2fnuz
     TORCH_DTYPE_TO_NPY_TYPE[torch.float8_e4m3fnuz] = ml_dtypes.float8_e4m3fnuz
 
+# Torch dtypes whose numpy equivalent comes from ml_dtypes. torch.Tensor.numpy()
+# cannot produce these directly, so their storage is reinterpreted through an
+# integer dtype of the same width and then viewed as the ml_dtypes type.
+TORCH_DTYPE_TO_NPY_BITCAST_TYPE = {
+    torch.bfloat16: torch.int16,
+}
+for dtype_str in OPTIONAL_TORCH_DTYPE_TO_MLIR_TYPE_ASM.keys():
+    if hasattr(torch, dtype_str):
+        TORCH_DTYPE_TO_NPY_BITCAST_TYPE[getattr(torch, dtype_str)] = torch.uint8
+
 TORCH_DTYPE_TO_INT = {
     torch.uint8: 0,
     torch.int8: 1,
@@ -526,6 +537,11 @@ class FxImporter:
       be one reference tracker per import, but this can be injected to share
       the same uniqueing across imports (i.e. if building multiple functions
       into the same context or module).
+    * literal_cache: Optional ContentLiteralCache. When specified, tensor
+      literals are additionally uniqued by content, so that byte-identical
+      tensors (i.e. tied or re-materialized weights, repeated constant
+      buffers) share a single resource blob. Like the py_attr_tracker, it can
+      be shared across imports (entries are kept per context).
     """
 
     __slots__ = [
@@ -534,6 +550,7 @@ class FxImporter:
         "_m",
         "_m_ip",
         "_py_attr_tracker",
+        "_literal_cache",
         "_hooks",
         "symbol_table",
     ]
@@ -545,6 +562,7 @@ class FxImporter:
         context: Optional[Context] = None,
         config_check: bool = True,
         py_attr_tracker: Optional["RefTracker"] = None,
+        literal_cache: Optional["ContentLiteralCache"] = None,
         hooks: Optional[FxImporterHooks] = None,
     ):
         if module is not None:
@@ -558,7 +576,12 @@ class FxImporter:
             # Production code can disable this for a bit of a boost.
             self._config_check()
         self._py_attr_tracker = py_attr_tracker or RefTracker()
-        self._cc = ContextCache(self._c, py_attr_tracker=self._py_attr_tracker)
+        self._literal_cache = literal_cache
+        self._cc = ContextCache(
+            self._c,
+            py_attr_tracker=self._py_attr_tracker,
+            literal_cache=self._literal_cache,
+        )
         self._m_ip = InsertionPoint(self._m.body)
         self._hooks = hooks or FxImporterHooks()
         self.symbol_table = SymbolTable(self._m.operation)
@@ -865,6 +888,11 @@ class FxImporter:
         torch.Tensor encountered in such a way as a `torch.vtensor.literal` (or
         delegating to the literal_resolver_callback to make a policy decision).
 
+        The contents of real, contiguous CPU tensors are not copied: their
+        `dense_resource` blobs alias the tensor storage. Parameters and buffers
+        must therefore not be mutated in place while the imported module is in
+        use; clone them before importing if they will be.
+
         As we anticipate more nuanced treatment options in the future, we name this
         method to indicate that it is producing "frozen" modules. Additional top-level
         approaches to handling state can be introduced later as an addition.
@@ -1031,6 +1059,7 @@ class ContextCache:
         "_tensor_metadata_cache",
         "_symbolic_guards",
         "_py_attr_tracker",
+        "_literal_cache",
         # Types.
         "torch_bool_type",
         "torch_float_type",
@@ -1041,7 +1070,11 @@ class ContextCache:
     ]
 
     def __init__(
-        self, context: Context, *, py_attr_tracker: Optional["RefTracker"] = None
+        self,
+        context: Context,
+        *,
+        py_attr_tracker: Optional["RefTracker"] = None,
+        literal_cache: Optional["ContentLiteralCache"] = None,
     ):
         self._c = context
         self._dtype_to_type: Dict[TorchDtype, IrType] = {}
@@ -1050,6 +1083,7 @@ class ContextCache:
         ] = {}
         self._symbolic_guards: Dict = {}
         self._py_attr_tracker = py_attr_tracker or RefTracker()
+        self._literal_cache = literal_cache
 
         # Common types.
         with context:
@@ -2107,8 +2141,38 @@ def create_mlir_tensor_type(tensor: torch.Tensor) -> IrType:
     return _create_mlir_tensor_type(tensor.dtype, tensor.size())
 
 
+def _tensor_to_ndarray(tensor: torch.Tensor, npy_dtype: Any) -> np.ndarray:
+    """Returns a numpy array with the contents of `tensor`.
+
+    For a real, contiguous CPU tensor the returned array aliases the tensor's
+    storage, so no copy of the data is made: mutating the tensor afterwards
+    (e.g. an optimizer step on a parameter) also changes the array, and thus
+    any resource blob created from it. Tensors on other devices, with
+    non-contiguous layouts or with the conjugate or negative bit set are
+    copied exactly once into a contiguous CPU tensor.
+
+    FakeTensors have no backing data that can be viewed (and torch.Tensor.numpy()
+    forces a call to detach() which throws when operating in a FakeTensorMode),
+    so they take the slow indirection: Tensor -> list -> numpy array.
+    """
+    if isinstance(tensor, TorchFakeTensor):
+        return np.array(tensor.tolist()).astype(npy_dtype)
+    # Tensor.numpy() rejects lazily conjugated or negated views.
+    t = tensor.detach().resolve_conj().resolve_neg()
+    if t.device.type != "cpu":
+        t = t.cpu()
+    t = t.contiguous()
+    bitcast_dtype = TORCH_DTYPE_TO_NPY_BITCAST_TYPE.get(t.dtype)
+    if bitcast_dtype is not None:
+        return t.view(bitcast_dtype).numpy().view(npy_dtype)
+    return t.numpy()
+
+
 def _make_vtensor_literal_op(
-    tensor: torch.Tensor, vtensor_type: IrType, py_attr_tracker: "RefTracker"
+    tensor: torch.Tensor,
+    vtensor_type: IrType,
+    py_attr_tracker: "RefTracker",
+    literal_cache: Optional["ContentLiteralCache"] = None,
 ) -> Operation:
     mapping = py_attr_tracker.track(tensor)
     if mapping.is_empty:
@@ -2123,11 +2187,9 @@ def _make_vtensor_literal_op(
         ), f"Can not create literal tensor for unsupported datatype: {tensor.dtype}"
         # We need a raw buffer of data in order to create an ElementsAttr for the invocation of torch.vtensor.literal,
         # but torch.Tensor does not fulfill the python buffer/array interface hence we must convert to a numpy array to get
-        # a raw buffer of our data. We can't call torch.Tensor.numpy() directly because this internally forces a call to
-        # detach() which throws an error as we are operating in a FakeTensorMode, hence the simplest way to get this raw
-        # buffer is via the indirection: Tensor -> list -> numpy array. This allows us to create a vtensor literal as
-        # desired, but also limits which data types we can support in this function (see TORCH_DTYPE_TO_NPY_TYPE above)
-        np_tensor = np.array(tensor.tolist()).astype(npy_dtype)
+        # a raw buffer of our data. This also limits which data types we can support in this function (see
+        # TORCH_DTYPE_TO_NPY_TYPE above).
+        np_tensor = _tensor_to_ndarray(tensor, npy_dtype)
         # One element constants are more optimizable as splat DenseElementsAttr. DenseResourceElementsAttr does not
         # support splats, so don't use it for that case. In addition, at the time of writing, it has bugs with handling
         # 0d tensors.
@@ -2141,15 +2203,27 @@ def _make_vtensor_literal_op(
                 type=element_type, array=np_tensor, shape=np_tensor.shape
             )
         else:
+            # Note that for real CPU tensors, the blob aliases the tensor's
+            # storage (which is kept alive by the attribute) rather than
+            # holding a copy of it.
             bytes_view = np_tensor.view(npy_dtype)
-            tensor_type = create_mlir_tensor_type(tensor)
-            shape_desc = "_".join([str(d) for d in tensor.shape])
-            blob_name = f"torch_tensor_{shape_desc}_{str(tensor.dtype)}"
-            elements_attr = DenseResourceElementsAttr.get_from_buffer(
-                bytes_view,
-                blob_name,
-                tensor_type,
-            )
+
+            def _create_resource_attr() -> Attribute:
+                tensor_type = create_mlir_tensor_type(tensor)
+                shape_desc = "_".join([str(d) for d in tensor.shape])
+                blob_name = f"torch_tensor_{shape_desc}_{str(tensor.dtype)}"
+                return DenseResourceElementsAttr.get_from_buffer(
+                    bytes_view,
+                    blob_name,
+                    tensor_type,
+                )
+
+            if literal_cache is not None:
+                elements_attr = literal_cache.get_or_create(
+                    tensor.dtype, bytes_view, _create_resource_attr
+                )
+            else:
+                elements_attr = _create_resource_attr()
         mapping.value = elements_attr
     else:
         elements_attr = mapping.value
@@ -2300,6 +2374,68 @@ class RefTracker:
     #    del self._refs[ref_id]
 
 
+class ContentLiteralCache:
+    """Content-addressed cache of tensor literal attributes.
+
+    The RefTracker only uniques literals by the identity of the originating
+    Python object. This cache additionally keys them by (dtype, shape, digest
+    of the raw bytes), so that distinct but byte-identical tensors resolve to
+    the same attribute (and therefore the same resource blob). Candidates with
+    a matching digest are compared bytewise before being shared.
+
+    Attributes belong to the MLIRContext they were created in, so entries are
+    also keyed by the current context: a cache shared between importers with
+    different contexts never returns an attribute from another context.
+
+    Statistics on the savings are available via the `hits` and `bytes_saved`
+    fields.
+    """
+
+    __slots__ = [
+        "_entries",
+        "hits",
+        "bytes_saved",
+    ]
+
+    def __init__(self):
+        self._entries: Dict[
+            Tuple[Context, TorchDtype, Tuple[int, ...], bytes],
+            List[Tuple[np.ndarray, Attribute]],
+        ] = {}
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def get_or_create(
+        self,
+        dtype: TorchDtype,
+        array: np.ndarray,
+        create: Callable[[], Attribute],
+    ) -> Attribute:
+        """Returns the attribute for `array`, invoking `create` on a miss.
+
+        The array must be C-contiguous. Must be called with the context the
+        attribute is created in as the current context.
+        """
+        raw = array.reshape(-1).view(np.uint8)
+        digest = hashlib.blake2b(raw.data, digest_size=16).digest()
+        key = (Context.current, dtype, tuple(array.shape), digest)
+        candidates = self._entries.setdefault(key, [])
+        for existing_raw, attr in candidates:
+            if np.array_equal(existing_raw, raw):
+                self.hits += 1
+                self.bytes_saved += raw.nbytes
+                return attr
+        attr = create()
+        candidates.append((raw, attr))
+        return attr
+
+    def __repr__(self):
+        return (
+            f"<ContentLiteralCache entries={len(self._entries)} hits={self.hits} "
+            f"bytes_saved={self.bytes_saved}>"
+        )
+
+
 ################################################################################
 # Mappings
 ################################################################################
@@ -2338,7 +2474,7 @@ LITERAL_CONVERTER_MAP.map(
 LITERAL_CONVERTER_MAP.map(
     torch.Tensor,
     lambda arg, gni, cc: _make_vtensor_literal_op(
-        arg, cc.tensor_to_vtensor_type(arg), cc._py_attr_tracker
+        arg, cc.tensor_to_vtensor_type(arg), cc._py_attr_tracker, cc._literal_cache
     ).result,
 )
 LITERAL_CONVERTER_MAP.map(
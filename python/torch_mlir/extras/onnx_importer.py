@@ -33,7 +33,12 @@ except ModuleNotFoundError as e:
         "The onnx package (`pip install onnx`) is required to use the onnx importer"
     ) from e
 
-from typing import Optional, List, Dict, Tuple
+from typing import Callable, Optional, List, Dict, Tuple
+import concurrent.futures
+import io
+import mmap
+import multiprocessing
+import os
 import warnings
 
 from dataclasses import dataclass, field
@@ -92,6 +97,13 @@ class Config:
     # making an assumption.
     elide_initialized_inputs: bool = True
 
+    # Directory against which the locations of tensors with external data are
+    # resolved, for tensors whose data has not been loaded into the proto
+    # (i.e. the model was loaded with `load_external_data=False`). Such data
+    # is memory mapped and the resulting resource attributes reference the
+    # mapping directly instead of holding a copy of the weights.
+    external_data_dir: Optional[str] = None
+
     # Some ONNX operators are defined by ONNX functions and will be
     # automatically expanded (see get_operator_function() below) to MLIR
     # functions by the importer. This option allows allowlisting functions that
@@ -139,6 +151,10 @@ class ModelInfo:
         self.config = config
         self.model_proto = model_proto
         assert model_proto.graph, "Model must contain a main Graph"
+        # Opset version by domain. The first import of a domain wins.
+        self.opset_versions: Dict[str, int] = {}
+        for opset_import in model_proto.opset_import:
+            self.opset_versions.setdefault(opset_import.domain, opset_import.version)
         self.main_graph = GraphInfo(self, model_proto.graph)
 
     def create_module(self, context: Optional[Context] = None) -> Module:
@@ -172,6 +188,14 @@ class GraphInfo:
         self.output_map: Dict[str, onnx.ValueInfoProto] = {
             n.name: n for n in graph_proto.output
         }
+        # Type protos of all named values, in order of precedence: value_info,
+        # then graph outputs, then declared inputs. Types of initializers are
+        # synthesized and added on first lookup.
+        self.type_proto_map: Dict[str, onnx.TypeProto] = {
+            n.name: n.type for n in graph_proto.input
+        }
+        self.type_proto_map.update((n.name, n.type) for n in graph_proto.output)
+        self.type_proto_map.update((n.name, n.type) for n in graph_proto.value_info)
 
         # Generate the effective input map, which for old models can be a
         # subset of the input map.
@@ -199,19 +223,17 @@ class GraphInfo:
         # Node outputs don't typically have type information, but shape inference
         # will associate them in the value_info. If not there, it may be a
         # graph output, which must have type information.
-        value_info = (
-            self.value_info_map.get(name)
-            or self.output_map.get(name)
-            or self.declared_input_map.get(name)
-        )
-        if value_info is not None:
-            return value_info.type
+        type_proto = self.type_proto_map.get(name)
+        if type_proto is not None:
+            return type_proto
 
         tensor_proto = self.initializer_map.get(name)
         if tensor_proto is not None:
-            return onnx.helper.make_tensor_type_proto(
+            type_proto = onnx.helper.make_tensor_type_proto(
                 tensor_proto.data_type, tensor_proto.dims
             )
+            self.type_proto_map[name] = type_proto
+            return type_proto
 
         # No type information is associated, this can occur when the value is unused:
         return ""
@@ -272,7 +294,10 @@ class NodeImporter:
         cc = (
             context_cache
             if context_cache is not None
-            else ContextCache(module_op.context)
+            else ContextCache(
+                module_op.context,
+                external_data_dir=graph_info.model_info.config.external_data_dir,
+            )
         )
         mc = module_cache if module_cache is not None else ModuleCache(module_op, cc)
         with module_op.context, Location.name(f"graph:{graph_info.graph_proto.name}"):
@@ -341,12 +366,13 @@ class NodeImporter:
             )
 
     def import_all(self, func=True):
-        """Imports all nodes topologically."""
-        # TODO: Consider pulling in initializers on demand since there can be so
-        # much unused crap.
-        for init in self._gi.initializer_map.values():
-            self.import_initializer(init)
+        """Imports all nodes topologically.
 
+        Initializers are not imported up front: each one is materialized on
+        its first reference (see `resolve_value`), so that initializers which
+        are never used do not end up in the IR. They can be listed with
+        `get_unused_initializers` after the import.
+        """
         self.get_none()
         for node in self._gi.graph_proto.node:
             self.import_node(node)
@@ -354,7 +380,7 @@ class NodeImporter:
         outputs = []
         for output_name in self._gi.output_map.keys():
             try:
-                outputs.append(self._nv_map[output_name])
+                outputs.append(self.resolve_value(output_name))
             except KeyError:
                 raise OnnxImportError(
                     f"Non topologically produced ONNX graph output '{output_name}'"
@@ -365,6 +391,38 @@ class NodeImporter:
             else:
                 Operation.create(name="torch.operator_terminator", operands=outputs)
 
+    def prefetch_operator_functions(
+        self,
+        *,
+        context_factory: Callable[[], Context],
+        max_workers: Optional[int] = None,
+    ):
+        """Imports the operator functions this graph expands to in parallel.
+
+        See `ModuleCache.prefetch_operator_functions`. Must be called before
+        `import_all`.
+        """
+        self._mc.prefetch_operator_functions(
+            self._gi, context_factory=context_factory, max_workers=max_workers
+        )
+
+    def resolve_value(self, name: str) -> Value:
+        """Returns the value bound to `name`, importing its initializer if needed.
+
+        Raises KeyError if `name` is neither bound nor an initializer.
+        """
+        value = self._nv_map.get(name)
+        if value is not None:
+            return value
+        initializer = self._gi.initializer_map[name]
+        return self.import_initializer(initializer)
+
+    def get_unused_initializers(self) -> List[str]:
+        """Returns the names of initializers of this graph that were never used."""
+        return [
+            name for name in self._gi.initializer_map.keys() if name not in self._nv_map
+        ]
+
     def get_none(self):
         if "" in self._nv_map:
             return self._nv_map[""]
@@ -397,7 +455,7 @@ class NodeImporter:
             input_type_protos = []
             for input_name in node.input:
                 try:
-                    input_values.append(self._nv_map[input_name])
+                    input_values.append(self.resolve_value(input_name))
                     # Missing optional arguments will have empty types
                     input_type_protos.append(
                         self._gi.find_type_proto_for_name(input_name)
@@ -417,10 +475,12 @@ class NodeImporter:
                 output_type_protos.append(type_proto)
                 output_types.append(self._cc.type_proto_to_type(type_proto))
 
-            for opset_import in self._gi.model_info.model_proto.opset_import:
-                if opset_import.domain == op_domain:
-                    opset_version = opset_import.version
-                    break
+            try:
+                opset_version = self._gi.model_info.opset_versions[op_domain]
+            except KeyError:
+                raise OnnxImportError(
+                    f"No opset import for domain '{op_domain}' of node: {node}"
+                )
             operator_func_op = self._mc.get_operator_function(
                 op_type,
                 op_domain,
@@ -437,6 +497,19 @@ class NodeImporter:
                 attrs = self.import_attributes(node.attribute)
                 attrs["name"] = StringAttr.get(f"onnx.{op_type}")
                 regions = self.count_regions(node.attribute)
+                if regions:
+                    # Initializers captured from the enclosing scope by the
+                    # subgraphs must be materialized before the op is created,
+                    # so that they dominate their uses in its regions.
+                    for attr in node.attribute:
+                        if attr.type != onnx.AttributeProto.AttributeType.GRAPH:
+                            continue
+                        for name in _get_graph_free_names(attr.g):
+                            if (
+                                name not in self._nv_map
+                                and name in self._gi.initializer_map
+                            ):
+                                self.resolve_value(name)
                 custom_op = Operation.create(
                     name="torch.operator",
                     results=output_types,
@@ -554,7 +627,10 @@ class NodeImporter:
             raise OnnxImportError(
                 f"Unknown ONNX tensor element type to numpy dtype mapping: {initializer.data_type}"
             )
-        raw_data = initializer.raw_data
+        if _has_unloaded_external_data(initializer):
+            raw_data = self._cc.get_external_data(initializer)
+        else:
+            raw_data = initializer.raw_data
         if raw_data:
             return np.frombuffer(raw_data, dtype=dtype).reshape(tuple(initializer.dims))
         else:
@@ -588,14 +664,22 @@ class ContextCache:
         "_list_type_map",
         "_optional_type_map",
         "_vtensor_type_map",
+        "_type_proto_map",
+        "_none_type",
+        "_external_data_dir",
+        "_external_data_maps",
     ]
 
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, *, external_data_dir: Optional[str] = None):
         self._c = context
         self._elem_type_map: Dict[int, IrType] = {}
         self._list_type_map: Dict[str, IrType] = {}
         self._optional_type_map: Dict[str, IrType] = {}
         self._vtensor_type_map: Dict[Tuple[Tuple[Optional[int]], IrType], IrType] = {}
+        self._type_proto_map: Dict[bytes, IrType] = {}
+        self._none_type: Optional[IrType] = None
+        self._external_data_dir = external_data_dir
+        self._external_data_maps: Dict[str, mmap.mmap] = {}
 
     def tensor_element_type(self, elem_type: int) -> IrType:
         t = self._elem_type_map.get(elem_type)
@@ -609,7 +693,9 @@ class ContextCache:
         return t
 
     def get_none_type(self):
-        return IrType.parse("!torch.none", context=self._c)
+        if self._none_type is None:
+            self._none_type = IrType.parse("!torch.none", context=self._c)
+        return self._none_type
 
     def get_list_type(self, element_type: IrType) -> IrType:
         key = str(element_type)
@@ -706,6 +792,18 @@ class ContextCache:
             )
             return self.get_none_type()
 
+        # Structurally identical type protos are very common (i.e. all
+        # activations of a layer), so conversions are interned by their
+        # serialized form, which is much cheaper to compute than walking the
+        # proto.
+        key = tp.SerializeToString()
+        t = self._type_proto_map.get(key)
+        if t is None:
+            t = self._convert_type_proto(tp)
+            self._type_proto_map[key] = t
+        return t
+
+    def _convert_type_proto(self, tp: onnx.TypeProto) -> IrType:
         tt = tp.tensor_type
         if tt.elem_type:
             element_type = self.tensor_element_type(tt.elem_type)
@@ -747,8 +845,51 @@ class ContextCache:
         # https://mlir.llvm.org/docs/LangRef/#identifiers-and-keywords
         return re.sub("[^\w\.]", "_", name)
 
+    def get_external_data(self, tp: onnx.TensorProto) -> memoryview:
+        """Returns a view of the (memory mapped) external data of `tp`.
+
+        Each external data file is mapped once and shared by all tensors
+        stored in it.
+        """
+        if self._external_data_dir is None:
+            raise OnnxImportError(
+                f"Tensor '{tp.name}' has external data which was not loaded and no "
+                f"external data directory was configured"
+            )
+        info = {entry.key: entry.value for entry in tp.external_data}
+        path = os.path.join(self._external_data_dir, info["location"])
+        data_map = self._external_data_maps.get(path)
+        if data_map is None:
+            try:
+                with open(path, "rb") as f:
+                    data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError as e:
+                raise OnnxImportError(
+                    f"Could not map external data file for tensor '{tp.name}': {path}"
+                ) from e
+            self._external_data_maps[path] = data_map
+        offset = int(info.get("offset", 0))
+        length = int(info["length"]) if "length" in info else len(data_map) - offset
+        if offset + length > len(data_map):
+            raise OnnxImportError(
+                f"External data of tensor '{tp.name}' exceeds the bounds of {path}"
+            )
+        return memoryview(data_map)[offset : offset + length]
+
     def tensor_proto_to_attr(self, tp: onnx.TensorProto) -> Attribute:
         tensor_type = self.tensor_proto_to_builtin_type(tp)
+        if _has_unloaded_external_data(tp):
+            # The resource references the mapping rather than a copy of the
+            # data. The mapping itself is page aligned, so the alignment of the
+            # data is bounded by its offset within the file.
+            data = self.get_external_data(tp)
+            offset = int(
+                next((e.value for e in tp.external_data if e.key == "offset"), 0)
+            )
+            alignment = min(offset & -offset, 8) if offset else 8
+            return DenseResourceElementsAttr.get_from_buffer(
+                data, self._sanitize_name(tp.name), tensor_type, alignment=alignment
+            )
         if tp.HasField("raw_data"):
             # Conveniently, DenseResourceElementsAttr shares the raw data
             # format. We just give it maximum numeric alignment.
@@ -766,6 +907,28 @@ class ContextCache:
             return handler(tp)
 
 
+def _has_unloaded_external_data(tp: onnx.TensorProto) -> bool:
+    return (
+        tp.data_location == onnx.TensorProto.DataLocation.EXTERNAL
+        and not tp.HasField("raw_data")
+    )
+
+
+def _get_graph_free_names(graph_proto: onnx.GraphProto) -> set[str]:
+    """Returns the names referenced by a (sub)graph but not defined in it."""
+    defined = {i.name for i in graph_proto.input}
+    defined.update(i.name for i in graph_proto.initializer)
+    free_names = set()
+    for node in graph_proto.node:
+        free_names.update(n for n in node.input if n and n not in defined)
+        for attr in node.attribute:
+            if attr.type == onnx.AttributeProto.AttributeType.GRAPH:
+                free_names.update(_get_graph_free_names(attr.g) - defined)
+        defined.update(node.output)
+    free_names.update(o.name for o in graph_proto.output if o.name not in defined)
+    return free_names
+
+
 def _shallow_copy_and_clear_protobuf_list(protobuf_list) -> list:
     """
     Workaround for .clear() not being available on protobuf lists for some
@@ -940,6 +1103,92 @@ def _specialize_function_and_create_model(
     return model_proto
 
 
+def _get_operator_function_spec(
+    op_name: str,
+    op_domain: str,
+    opset_version: int,
+    input_type_protos: list[onnx.TypeProto],
+    output_type_protos: list[onnx.TypeProto],
+    caller_node: onnx.NodeProto,
+    config: Config,
+) -> Optional[Tuple[str, onnx.defs.OpSchema, int, bool]]:
+    """
+    Helper for ModuleCache::get_operator_function() that determines which
+    function definition (if any) an ONNX operator expands to.
+
+    Returns None for ONNX operators that aren't functions (or aren't expanded),
+    otherwise a tuple of (memoization key, schema, function opset version,
+    is context dependent).
+    """
+
+    allowlists = config.function_expansion_allowlists_by_domain
+    denylists = config.function_expansion_denylists_by_domain
+
+    if allowlists is not None and not (
+        op_domain in allowlists and op_name in allowlists[op_domain]
+    ):
+        return None
+
+    if op_domain in denylists and op_name in denylists[op_domain]:
+        return None
+
+    op_schema = onnx.defs.get_schema(
+        op_name, domain=op_domain, max_inclusive_version=opset_version
+    )
+
+    # The get_schema() lookup above should get the right version of the
+    # operator definition, but the function body can change slightly
+    # within a single operator version, as explained in
+    # https://github.com/onnx/onnx/blob/093a8d335a66ea136eb1f16b3a1ce6237ee353ab/onnx/defs/schema.h#L1070-L1086
+    # There also seem to be cases where a function goes from being not
+    # context-dependent to context-dependent.
+    f = lambda ver: ver <= opset_version
+    ncd_function_version = max(
+        filter(f, op_schema.function_opset_versions),
+        default=None,
+    )
+    cd_function_version = max(
+        filter(f, op_schema.context_dependent_function_opset_versions),
+        default=None,
+    )
+    if ncd_function_version is None and cd_function_version is None:
+        # No relevant function definition
+        return None
+    if ncd_function_version is not None and (
+        cd_function_version is None or cd_function_version < ncd_function_version
+    ):
+        specific_version = ncd_function_version
+        is_context_dependent = False
+    else:
+        specific_version = cd_function_version
+        is_context_dependent = True
+
+    # This is both a key for memoization of function importing and also a
+    # name mangling scheme, so it must include all information needed to
+    # uniquely identify a function and anything it might be parameterized
+    # over.
+    key = repr(
+        (
+            op_name,
+            op_domain,
+            opset_version,
+            input_type_protos,
+            # Though output types can be inferred from input types, it does
+            # not seem to be the case that there's only one legal set of
+            # outputs for a given set of inputs. When attemtping to always
+            # use onnx.shape_inference.infer_function_output_types instead
+            # of the caller-provided types, sometimes IR verification fails
+            output_type_protos,
+            # Avoid including the attributes twice (once on their own and
+            # once as part of the node) for context-dependent functions,
+            # avoid including unused parts of the node for other functions.
+            caller_node if is_context_dependent else caller_node.attribute,
+        )
+    )
+
+    return key, op_schema, specific_version, is_context_dependent
+
+
 class ModuleCache:
     """Caches per-module lookups of various things."""
 
@@ -970,70 +1219,18 @@ class ModuleCache:
         Returns None for ONNX operators that aren't functions.
         """
 
-        allowlists = config.function_expansion_allowlists_by_domain
-        denylists = config.function_expansion_denylists_by_domain
-
-        if allowlists is not None and not (
-            op_domain in allowlists and op_name in allowlists[op_domain]
-        ):
-            return None
-
-        if op_domain in denylists and op_name in denylists[op_domain]:
-            return None
-
-        op_schema = onnx.defs.get_schema(
-            op_name, domain=op_domain, max_inclusive_version=opset_version
-        )
-
-        # The get_schema() lookup above should get the right version of the
-        # operator definition, but the function body can change slightly
-        # within a single operator version, as explained in
-        # https://github.com/onnx/onnx/blob/093a8d335a66ea136eb1f16b3a1ce6237ee353ab/onnx/defs/schema.h#L1070-L1086
-        # There also seem to be cases where a function goes from being not
-        # context-dependent to context-dependent.
-        f = lambda ver: ver <= opset_version
-        ncd_function_version = max(
-            filter(f, op_schema.function_opset_versions),
-            default=None,
-        )
-        cd_function_version = max(
-            filter(f, op_schema.context_dependent_function_opset_versions),
-            default=None,
+        spec = _get_operator_function_spec(
+            op_name,
+            op_domain,
+            opset_version,
+            input_type_protos,
+            output_type_protos,
+            caller_node,
+            config,
         )
-        if ncd_function_version is None and cd_function_version is None:
-            # No relevant function definition
+        if spec is None:
             return None
-        if ncd_function_version is not None and (
-            cd_function_version is None or cd_function_version < ncd_function_version
-        ):
-            specific_version = ncd_function_version
-            is_context_dependent = False
-        else:
-            specific_version = cd_function_version
-            is_context_dependent = True
-
-        # This is both a key for memoization of function importing and also a
-        # name mangling scheme, so it must include all information needed to
-        # uniquely identify a function and anything it might be parameterized
-        # over.
-        key = repr(
-            (
-                op_name,
-                op_domain,
-                opset_version,
-                input_type_protos,
-                # Though output types can be inferred from input types, it does
-                # not seem to be the case that there's only one legal set of
-                # outputs for a given set of inputs. When attemtping to always
-                # use onnx.shape_inference.infer_function_output_types instead
-                # of the caller-provided types, sometimes IR verification fails
-                output_type_protos,
-                # Avoid including the attributes twice (once on their own and
-                # once as part of the node) for context-dependent functions,
-                # avoid including unused parts of the node for other functions.
-                caller_node if is_context_dependent else caller_node.attribute,
-            )
-        )
+        key, op_schema, specific_version, is_context_dependent = spec
 
         existing = self._operator_function_map.get(key)
         if existing is not None:
@@ -1082,6 +1279,135 @@ class ModuleCache:
         self._operator_function_map[key] = func_op
         return func_op
 
+    def prefetch_operator_functions(
+        self,
+        graph_info: GraphInfo,
+        *,
+        context_factory: Callable[[], Context],
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Imports all operator functions that `graph_info` (including its
+        subgraphs) will expand to, using a pool of worker processes.
+
+        Each distinct function is specialized and imported by a worker into a
+        module of its own, built in a context created by `context_factory`
+        (which must be picklable, i.e. a module level function, and return a
+        context with the `torch` dialect registered). The results are merged
+        into this module in the order in which a serial import would have
+        created them, so that a subsequent `NodeImporter.import_all()` finds
+        every function already present and produces the same IR as a serial
+        import.
+
+        Region subgraphs are still imported serially: they reference values of
+        their enclosing scope and cannot be built in isolation.
+        """
+        requests: Dict[str, tuple] = {}
+        _collect_operator_function_requests(graph_info, requests)
+        requests = {
+            key: request
+            for key, request in requests.items()
+            if key not in self._operator_function_map
+        }
+        if not requests:
+            return
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = executor.map(
+                _import_operator_function_in_worker,
+                [context_factory] * len(requests),
+                requests.values(),
+            )
+            for bytecode in results:
+                self._merge_function_module(bytecode)
+
+    def _merge_function_module(self, bytecode: bytes):
+        """Moves functions not yet present from a serialized module into this one."""
+        imported = Module.parse(bytecode, context=self._m.context)
+        ip = InsertionPoint(self._m.regions[0].blocks[0])
+        for op in list(imported.body.operations):
+            # Functions created by the importer are named after their key.
+            key = StringAttr(op.attributes["sym_name"]).value
+            if key in self._operator_function_map:
+                continue
+            op.detach_from_parent()
+            ip.insert(op)
+            self._operator_function_map[key] = op.operation.opview
+
+
+def _collect_operator_function_requests(
+    graph_info: GraphInfo, requests: Dict[str, tuple]
+):
+    """
+    Helper for ModuleCache::prefetch_operator_functions() that walks a graph
+    (and its subgraphs) in import order and records the arguments of
+    ModuleCache::get_operator_function() for each distinct function that
+    NodeImporter::import_node() would expand an operator to.
+    """
+    config = graph_info.model_info.config
+    for node in graph_info.graph_proto.node:
+        if node.op_type == "Constant" and _get_attr(node, "value", False):
+            continue
+        opset_version = graph_info.model_info.opset_versions.get(node.domain)
+        if opset_version is not None:
+            # Mirrors the type proto lookups of NodeImporter::import_node().
+            input_type_protos = [
+                graph_info.find_type_proto_for_name(name) or onnx.TypeProto()
+                for name in node.input
+            ]
+            output_type_protos = [
+                graph_info.find_type_proto_for_name(name) for name in node.output
+            ]
+            spec = _get_operator_function_spec(
+                node.op_type,
+                node.domain,
+                opset_version,
+                input_type_protos,
+                output_type_protos,
+                node,
+                config,
+            )
+            if spec is not None:
+                key = spec[0]
+                if key not in requests:
+                    requests[key] = (
+                        node.op_type,
+                        node.domain,
+                        opset_version,
+                        input_type_protos,
+                        output_type_protos,
+                        node,
+                        config,
+                    )
+                continue
+        # Regions are imported in sorted attribute name order.
+        for attr in sorted(node.attribute, key=lambda a: a.name):
+            if attr.type == onnx.AttributeProto.AttributeType.GRAPH:
+                _collect_operator_function_requests(
+                    GraphInfo(graph_info.model_info, attr.g, is_subgraph=True),
+                    requests,
+                )
+
+
+def _import_operator_function_in_worker(
+    context_factory: Callable[[], Context], request: tuple
+) -> bytes:
+    """
+    Worker for ModuleCache::prefetch_operator_functions(): imports a single
+    operator function (and any functions it expands to in turn) into a fresh
+    module and returns it as bytecode.
+    """
+    context = context_factory()
+    module = Module.create(Location.unknown(context))
+    config = request[-1]
+    cc = ContextCache(context, external_data_dir=config.external_data_dir)
+    ModuleCache(module.operation, cc).get_operator_function(*request)
+    buffer = io.BytesIO()
+    module.operation.write_bytecode(buffer)
+    return buffer.getvalue()
+
 
 ELEM_TYPE_TO_IR_TYPE_CB = {
     onnx.TensorProto.DataType.FLOAT: lambda: F32Type.get(),
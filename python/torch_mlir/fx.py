@@ -3,7 +3,7 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-from typing import Optional, Union, Dict, Tuple, Any, Callable
+from typing import Optional, Union, Dict, List, Tuple, Any, Callable
 from packaging import version
 
 import warnings
@@ -17,30 +17,23 @@ from .extras.fx_importer import FxImporter, FxImporterHooks
 from . import ir
 from .dialects import torch as torch_d
 from .extras.fx_decomp_util import get_decomposition_table
+from .compile_cache import CompilationCache
+from .compiler_session import CompilerSession
 from .compiler_utils import (
+    CompileProfile,
     OutputType,
+    pop_backend_contract_statistics,
     run_pipeline_with_repro_report,
     lower_mlir_module,
 )
 
 
-def _module_lowering(
-    verbose,
-    enable_ir_printing,
-    output_type,
-    torch_mod,
+def _torch_backend_pipeline(
     extra_library_file_name=None,
     backend_legal_ops=None,
+    incremental_backend_contract=False,
+    record_backend_contract_statistics=False,
 ):
-    if verbose:
-        print("\n====================")
-        print("TorchFX IR")
-        print(torch_mod)
-
-    if output_type == OutputType.RAW:
-        return torch_mod
-    # TODO: pass extra_library_file_name by caller
-
     backend_legal_op_arg_str = ""
     if backend_legal_ops is not None:
         if not len(backend_legal_ops) == 0:
@@ -50,21 +43,69 @@ def _module_lowering(
 
     if extra_library_file_name is None:
         extra_library_file_name = ""
+    backend_contract_arg_str = ""
+    if incremental_backend_contract:
+        backend_contract_arg_str += " incremental=true"
+    if record_backend_contract_statistics:
+        backend_contract_arg_str += " record-statistics=true"
     option_string = (
         "{"
         + backend_legal_op_arg_str
         + " extra-library="
         + extra_library_file_name
+        + backend_contract_arg_str
         + "}"
     )
+    return f"builtin.module(func.func(torch-match-quantized-custom-ops), torchdynamo-export-to-torch-backend-pipeline{option_string})"
+
+
+def _compile_context(session: Optional[CompilerSession]) -> ir.Context:
+    if session is not None:
+        return session.begin_compile()
+    context = ir.Context()
+    torch_d.register_dialect(context)
+    return context
+
+
+def _module_lowering(
+    verbose,
+    enable_ir_printing,
+    output_type,
+    torch_mod,
+    extra_library_file_name=None,
+    backend_legal_ops=None,
+    profile=None,
+    session=None,
+    incremental_backend_contract=False,
+    backend_contract_statistics=None,
+):
+    if verbose:
+        print("\n====================")
+        print("TorchFX IR")
+        print(torch_mod)
+
+    if output_type == OutputType.RAW:
+        return torch_mod
+    # TODO: pass extra_library_file_name by caller
 
     run_pipeline_with_repro_report(
         torch_mod,
-        f"builtin.module(func.func(torch-match-quantized-custom-ops), torchdynamo-export-to-torch-backend-pipeline{option_string})",
+        _torch_backend_pipeline(
+            extra_library_file_name,
+            backend_legal_ops,
+            incremental_backend_contract=incremental_backend_contract,
+            record_backend_contract_statistics=backend_contract_statistics is not None,
+        ),
         "Lowering TorchFX IR -> Torch Backend IR",
         enable_ir_printing=enable_ir_printing,
+        profile=profile,
+        session=session,
+    )
+    if backend_contract_statistics is not None:
+        backend_contract_statistics.extend(pop_backend_contract_statistics(torch_mod))
+    return lower_mlir_module(
+        verbose, output_type, torch_mod, profile=profile, session=session
     )
-    return lower_mlir_module(verbose, output_type, torch_mod)
 
 
 def export_and_import(
@@ -83,11 +124,41 @@ def export_and_import(
     verbose: bool = False,
     enable_ir_printing: bool = False,
     backend_legal_ops: Optional[list[str]] = None,
+    compile_cache: Optional[CompilationCache] = None,
+    profile: Optional[CompileProfile] = None,
+    session: Optional[CompilerSession] = None,
+    incremental_backend_contract: bool = False,
+    backend_contract_statistics: Optional[List[Dict[str, Any]]] = None,
     **kwargs,
 ):
-    context = ir.Context()
-    torch_d.register_dialect(context)
+    """Exports `f`, imports it into torch-mlir and lowers it to `output_type`.
+
+    If a `compile_cache` is given (and neither a custom `fx_importer` nor
+    `hooks` are), the lowered module is looked up in / stored to the cache,
+    skipping decomposition, import and lowering on a hit.
+
+    If a `profile` is given, the per-pass profile of every lowering pipeline
+    is recorded in it (see `CompileProfile`).
+
+    If a `session` is given, the module is created in the session's context
+    and the lowering pipelines reuse its parsed pass managers (see
+    `CompilerSession`). A custom `fx_importer` keeps its own context.
+
+    With `incremental_backend_contract`, the lowering runs
+    `torch-lower-to-backend-contract` in its incremental mode. If a
+    `backend_contract_statistics` list is given, the per-iteration statistics
+    of that pass (see `pop_backend_contract_statistics`) are appended to it,
+    and the `compile_cache` is not used.
+    """
+    context = _compile_context(session)
 
+    output_type = OutputType.get(output_type)
+    if fx_importer is not None or hooks is not None:
+        # The result depends on state that cannot be keyed on.
+        compile_cache = None
+    if backend_contract_statistics is not None:
+        # Statistics are only recorded by actually lowering the module.
+        compile_cache = None
     if fx_importer is None:
         fx_importer = FxImporter(context=context, hooks=hooks)
     if isinstance(f, ExportedProgram):
@@ -102,6 +173,26 @@ def export_and_import(
             prog = torch.export.export(f, args, kwargs)
     if decomposition_table is None:
         decomposition_table = get_decomposition_table()
+    if compile_cache is not None:
+        cache_key = compile_cache.make_key(
+            prog,
+            decomposition_table=decomposition_table,
+            pipelines=[
+                _torch_backend_pipeline(
+                    backend_legal_ops=backend_legal_ops,
+                    incremental_backend_contract=incremental_backend_contract,
+                )
+            ],
+            output_type=output_type.value,
+            options=[
+                func_name,
+                experimental_support_mutation,
+                import_symbolic_shape_expressions,
+            ],
+        )
+        cached_module = compile_cache.load(cache_key, context)
+        if cached_module is not None:
+            return cached_module
     if decomposition_table:
         prog = prog.run_decompositions(decomposition_table)
     if enable_graph_printing:
@@ -121,13 +212,20 @@ def export_and_import(
             import_symbolic_shape_expressions=import_symbolic_shape_expressions,
         )
 
-    return _module_lowering(
+    module = _module_lowering(
         verbose,
         enable_ir_printing,
-        OutputType.get(output_type),
+        output_type,
         fx_importer.module,
         backend_legal_ops=backend_legal_ops,
+        profile=profile,
+        session=session,
+        incremental_backend_contract=incremental_backend_contract,
+        backend_contract_statistics=backend_contract_statistics,
     )
+    if compile_cache is not None:
+        compile_cache.store(cache_key, module)
+    return module
 
 
 def stateless_fx_import(
@@ -140,11 +238,14 @@ def stateless_fx_import(
     verbose: bool = False,
     enable_ir_printing: bool = False,
     backend_legal_ops: Optional[list[str]] = None,
+    profile: Optional[CompileProfile] = None,
+    session: Optional[CompilerSession] = None,
+    incremental_backend_contract: bool = False,
+    backend_contract_statistics: Optional[List[Dict[str, Any]]] = None,
 ):
     if enable_graph_printing:
         gm.print_readable()
-    context = ir.Context()
-    torch_d.register_dialect(context)
+    context = _compile_context(session)
     if fx_importer is None:
         fx_importer = FxImporter(context=context, hooks=hooks)
     fx_importer.import_stateless_graph(gm.graph, func_name=model_name)
@@ -154,4 +255,8 @@ def stateless_fx_import(
         OutputType.get(output_type),
         fx_importer.module,
         backend_legal_ops=backend_legal_ops,
+        profile=profile,
+        session=session,
+        incremental_backend_contract=incremental_backend_contract,
+        backend_contract_statistics=backend_contract_statistics,
     )
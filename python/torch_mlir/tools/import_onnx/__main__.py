@@ -21,6 +21,7 @@ import sys
 
 import onnx
 import onnx.version
+from onnx import external_data_helper
 
 from ...extras import onnx_importer
 
@@ -30,29 +31,89 @@ from ...ir import (
 )
 
 
+def _graph_tensors(graph: onnx.GraphProto):
+    """Yields the initializers and tensor attributes of `graph`, recursively."""
+    yield from graph.initializer
+    for node in graph.node:
+        for attr in node.attribute:
+            if attr.HasField("t"):
+                yield attr.t
+            yield from attr.tensors
+            if attr.HasField("g"):
+                yield from _graph_tensors(attr.g)
+            for subgraph in attr.graphs:
+                yield from _graph_tensors(subgraph)
+
+
+def _has_external_data(model: onnx.ModelProto) -> bool:
+    """Whether any tensor of `model` refers to data that was not loaded."""
+    return any(
+        external_data_helper.uses_external_data(tensor)
+        for tensor in _graph_tensors(model.graph)
+    )
+
+
 def main(args: argparse.Namespace):
     config = onnx_importer.Config()
     if args.disable_function_expansion_allowlist:
         config.function_expansion_allowlists_by_domain = None
 
     model_proto = load_onnx_model(args)
-    context = Context()
-    torch_d.register_dialect(context)
+    if args.mmap_external_data:
+        config.external_data_dir = str(get_data_dir(args))
+    context = _create_context()
     model_info = onnx_importer.ModelInfo(model_proto, config=config)
     m = model_info.create_module(context=context).operation
     imp = onnx_importer.NodeImporter.define_function(model_info.main_graph, m)
+    if args.num_workers > 0:
+        # Worker processes unpickle the factory by its module name, and the
+        # `__main__` module of `python -m` cannot be imported by that name.
+        from .__main__ import _create_context as context_factory
+
+        imp.prefetch_operator_functions(
+            context_factory=context_factory, max_workers=args.num_workers
+        )
     imp.import_all()
+    if args.report_unused_initializers:
+        for name in imp.get_unused_initializers():
+            print(f"Unused initializer: {name}", file=sys.stderr)
     if not args.no_verify:
         m.verify()
 
-    # TODO: This isn't very efficient output. If these files ever
-    # get large, enable bytecode and direct binary emission to save
-    # some copies.
     if args.output_file and args.output_file != "-":
-        with open(args.output_file, "wt") as f:
-            print(m.get_asm(assume_verified=not args.no_verify), file=f)
+        with open(args.output_file, "wb") as f:
+            write_module(m, f, args)
+    else:
+        write_module(m, sys.stdout.buffer, args)
+        sys.stdout.buffer.flush()
+
+
+def write_module(m, f, args: argparse.Namespace):
+    """Serializes the module directly to the binary file object `f`.
+
+    The printer streams its output to the file as it goes, rather than first
+    materializing the whole IR as a Python string. With `--emit-bytecode`,
+    resource blobs (i.e. initializers) are written as raw binary instead of
+    being hex-encoded.
+    """
+    if args.emit_bytecode:
+        m.write_bytecode(f)
     else:
-        print(m.get_asm(assume_verified=not args.no_verify))
+        m.print(file=f, binary=True, assume_verified=not args.no_verify)
+        f.write(b"\n")
+
+
+def _create_context() -> Context:
+    context = Context()
+    torch_d.register_dialect(context)
+    return context
+
+
+def get_data_dir(args: argparse.Namespace) -> Path:
+    """Returns the directory that external data locations are relative to."""
+    if args.data_dir is not None:
+        return args.data_dir
+    return Path(os.path.dirname(os.path.abspath(args.input_file)))
 
 
 def load_onnx_model(args: argparse.Namespace) -> onnx.ModelProto:
@@ -79,8 +140,12 @@ def load_onnx_model(args: argparse.Namespace) -> onnx.ModelProto:
     temp_dir.mkdir(exist_ok=True)
 
     # Load the model, with possible external data coming from the default
-    # location, or the location specified on the conmand line.
-    if args.data_dir is None:
+    # location, or the location specified on the conmand line. When external
+    # data is memory mapped, it is left on disk and only referenced by the
+    # importer (see `Config.external_data_dir`).
+    if args.mmap_external_data:
+        raw_model = onnx.load(args.input_file, load_external_data=False)
+    elif args.data_dir is None:
         raw_model = onnx.load(args.input_file)
     else:
         raw_model = onnx.load(args.input_file, load_external_data=False)
@@ -103,7 +168,12 @@ def load_onnx_model(args: argparse.Namespace) -> onnx.ModelProto:
     # Run the checker to test whether the file is above the threshold for
     # in-memory shape inference.  If not, go ahead and do the shape inference.
     try:
-        onnx.checker.check_model(raw_model)
+        # The in-memory checker resolves external data locations relative to
+        # the working directory, so it cannot validate a model whose external
+        # data was left on disk. Such a model proto only holds the graph, which
+        # is well within the in-memory threshold.
+        if not _has_external_data(raw_model):
+            onnx.checker.check_model(raw_model)
         inferred_model = onnx.shape_inference.infer_shapes(
             raw_model, data_prop=args.data_prop
         )
@@ -146,8 +216,9 @@ def load_onnx_model(args: argparse.Namespace) -> onnx.ModelProto:
 
     # Load the temp file and the external data.
     inferred_model = onnx.load(temp_inferred_file, load_external_data=False)
-    data_dir = Path(input_dir if args.temp_dir is None else args.data_dir)
-    onnx.load_external_data_for_model(inferred_model, str(data_dir))
+    if not args.mmap_external_data:
+        data_dir = Path(input_dir if args.temp_dir is None else args.data_dir)
+        onnx.load_external_data_for_model(inferred_model, str(data_dir))
 
     # Remove the inferred shape file unless asked to keep it
     if not args.keep_temps:
@@ -162,6 +233,11 @@ def parse_arguments(argv=None) -> argparse.Namespace:
     parser.add_argument(
         "-o", dest="output_file", help="Output path (or '-' for stdout)"
     )
+    parser.add_argument(
+        "--emit-bytecode",
+        action="store_true",
+        help="Emit MLIR bytecode instead of textual IR",
+    )
     parser.add_argument(
         "--no-verify",
         action="store_true",
@@ -203,12 +279,33 @@ def parse_arguments(argv=None) -> argparse.Namespace:
         " Defaults to the directory of the input file.",
         type=Path,
     )
+    parser.add_argument(
+        "--mmap-external-data",
+        dest="mmap_external_data",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Memory map external data files and reference the mapping from the"
+        " imported resources, instead of reading all external tensors into memory.",
+    )
     parser.add_argument(
         "--opset-version",
         help="Allows specification of a newer opset_version to update the model"
         " to before importing to MLIR. This can sometime assist with shape inference.",
         type=int,
     )
+    parser.add_argument(
+        "--report-unused-initializers",
+        action="store_true",
+        help="Report the names of initializers of the main graph which were"
+        " never referenced (and hence not imported) to stderr.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=0,
+        help="Number of worker processes used to specialize and import ONNX"
+        " function expansions in parallel (0 imports them serially).",
+    )
     parser.add_argument(
         "--disable-function-expansion-allowlist",
         action="store_true",
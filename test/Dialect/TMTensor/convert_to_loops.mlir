@@ -100,6 +100,119 @@ func.func @scan_2d(%0: memref<16x32xi32>, %1: memref<16x32xi32>) {
 // CHECK:             }
 
 
+// -----
+
+func.func @scan_1d_blocked(%0: memref<4096xi32>, %1: memref<4096xi32>) {
+  %c0 = memref.alloc() : memref<i32>
+  tm_tensor.scan dimension(0) inclusive(true)
+    ins(%0 : memref<4096xi32>) outs(%1, %c0 : memref<4096xi32>, memref<i32>) {
+    ^bb0(%arg0 : i32, %arg1 : i32):
+      %sum = arith.addi %arg0, %arg1 : i32
+      tm_tensor.yield %sum : i32
+  }
+  return
+}
+// CHECK-LABEL: func.func @scan_1d_blocked
+// CHECK-SAME:    %[[BUFI:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[BUFO:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C4:.+]] = arith.constant 4 : index
+// CHECK-DAG:     %[[C1024:.+]] = arith.constant 1024 : index
+// CHECK-DAG:     %[[ACC:.+]] = memref.alloc() : memref<i32>
+// CHECK:         scf.parallel (%[[BLOCK:.+]]) = (%[[C0]]) to (%[[C4]]) step (%[[C1]]) {
+// CHECK:           %[[START:.+]] = arith.muli %[[BLOCK]], %[[C1024]] : index
+// CHECK:           %[[FIRST:.+]] = memref.load %[[BUFI]][%[[START]]]
+// CHECK:           memref.store %[[FIRST]], %[[BUFO]][%[[START]]]
+// CHECK:           scf.for %[[POS:.+]] = %{{.+}} to %{{.+}} step %[[C1]] {
+// CHECK:             %[[PREV_POS:.+]] = arith.subi %[[POS]], %[[C1]] : index
+// CHECK:             %[[PREV:.+]] = memref.load %[[BUFO]][%[[PREV_POS]]]
+// CHECK:             %[[ELEM:.+]] = memref.load %[[BUFI]][%[[POS]]]
+// CHECK:             %[[SUM:.+]] = arith.addi %[[PREV]], %[[ELEM]] : i32
+// CHECK:             memref.store %[[SUM]], %[[BUFO]][%[[POS]]]
+// CHECK:         %[[CARRIES:.+]] = memref.alloc() : memref<4xi32>
+// CHECK:         scf.if
+// CHECK:           scf.for %[[B:.+]] = %[[C1]] to %[[C4]] step %[[C1]] iter_args(%[[CARRY:.+]] = %{{.+}}) -> (i32) {
+// CHECK:             memref.store %[[CARRY]], %[[CARRIES]][%[[B]]]
+// CHECK:             %[[BLOCK_SCAN:.+]] = memref.load %[[BUFO]]
+// CHECK:             %[[NEXT:.+]] = arith.addi %[[CARRY]], %[[BLOCK_SCAN]] : i32
+// CHECK:             scf.yield %[[NEXT]] : i32
+// CHECK:           scf.parallel (%[[BLOCK2:.+]]) = (%[[C1]]) to (%[[C4]]) step (%[[C1]]) {
+// CHECK:             scf.for %[[POS2:.+]] =
+// CHECK:               %[[CARRY2:.+]] = memref.load %[[CARRIES]][%[[BLOCK2]]]
+// CHECK:               %[[PARTIAL:.+]] = memref.load %[[BUFO]][%[[POS2]]]
+// CHECK:               %[[TOTAL:.+]] = arith.addi %[[CARRY2]], %[[PARTIAL]] : i32
+// CHECK:               memref.store %[[TOTAL]], %[[BUFO]][%[[POS2]]]
+// CHECK:         memref.dealloc %[[CARRIES]]
+// CHECK:         scf.if
+// CHECK:           %[[LAST:.+]] = memref.load %[[BUFO]]
+// CHECK:           memref.store %[[LAST]], %[[ACC]][]
+
+// -----
+
+func.func @scan_2d_blocked_exclusive(%0: memref<?x?xf32>, %1: memref<?x?xf32>, %2: memref<?xf32>) {
+  tm_tensor.scan dimension(1) inclusive(false) associative
+    ins(%0 : memref<?x?xf32>) outs(%1, %2 : memref<?x?xf32>, memref<?xf32>) {
+    ^bb0(%arg0 : f32, %arg1 : f32):
+      %sum = arith.addf %arg0, %arg1 : f32
+      tm_tensor.yield %sum : f32
+  }
+  return
+}
+// CHECK-LABEL: func.func @scan_2d_blocked_exclusive
+// CHECK-SAME:    %[[BUFI:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[BUFO:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[ACC:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C1024:.+]] = arith.constant 1024 : index
+// CHECK-DAG:     %[[ROWS:.+]] = memref.dim %[[BUFI]], %[[C0]]
+// CHECK-DAG:     %[[LEN:.+]] = memref.dim %[[BUFI]], %[[C1]]
+// CHECK:         %[[NUM_BLOCKS:.+]] = arith.ceildivui %[[LEN]], %[[C1024]] : index
+// CHECK:         scf.parallel (%[[ROW:.+]], %[[BLOCK:.+]]) = (%[[C0]], %[[C0]]) to (%[[ROWS]], %[[NUM_BLOCKS]])
+// CHECK:           %[[START:.+]] = arith.muli %[[BLOCK]], %[[C1024]] : index
+// CHECK:           %[[IS_FIRST:.+]] = arith.cmpi eq, %[[BLOCK]], %[[C0]] : index
+// CHECK:           %[[FIRST:.+]] = scf.if %[[IS_FIRST]] -> (f32) {
+// CHECK:             %[[INIT:.+]] = memref.load %[[ACC]][%[[ROW]]]
+// CHECK:             scf.yield %[[INIT]] : f32
+// CHECK:           } else {
+// CHECK:             %[[PREV_START:.+]] = arith.subi %[[START]], %[[C1]] : index
+// CHECK:             %[[PREV_ELEM:.+]] = memref.load %[[BUFI]][%[[ROW]], %[[PREV_START]]]
+// CHECK:             scf.yield %[[PREV_ELEM]] : f32
+// CHECK:           }
+// CHECK:           memref.store %[[FIRST]], %[[BUFO]][%[[ROW]], %[[START]]]
+// CHECK:           scf.for %[[POS:.+]] =
+// CHECK:             %[[PREV_POS:.+]] = arith.subi %[[POS]], %[[C1]] : index
+// CHECK:             %[[PREV:.+]] = memref.load %[[BUFO]][%[[ROW]], %[[PREV_POS]]]
+// CHECK:             %[[ELEM_POS:.+]] = arith.subi %[[POS]], %[[C1]] : index
+// CHECK:             %[[ELEM:.+]] = memref.load %[[BUFI]][%[[ROW]], %[[ELEM_POS]]]
+// CHECK:             %[[SUM:.+]] = arith.addf %[[PREV]], %[[ELEM]] : f32
+// CHECK:             memref.store %[[SUM]], %[[BUFO]][%[[ROW]], %[[POS]]]
+// CHECK:         %[[CARRIES:.+]] = memref.alloc(%[[ROWS]], %[[NUM_BLOCKS]]) : memref<?x?xf32>
+// CHECK:         scf.if
+// CHECK:           scf.parallel (%[[ROW2:.+]]) = (%[[C0]]) to (%[[ROWS]])
+// CHECK:             scf.for %{{.+}} = %[[C1]] to %[[NUM_BLOCKS]] step %[[C1]] iter_args
+// CHECK:           scf.parallel (%[[ROW3:.+]], %[[BLOCK3:.+]]) = (%[[C0]], %[[C1]]) to (%[[ROWS]], %[[NUM_BLOCKS]])
+// CHECK:         memref.dealloc %[[CARRIES]]
+
+// -----
+
+func.func @scan_1d_float_sum_sequential(%0: memref<4096xf32>, %1: memref<4096xf32>) {
+  %c0 = memref.alloc() : memref<f32>
+  tm_tensor.scan dimension(0) inclusive(true)
+    ins(%0 : memref<4096xf32>) outs(%1, %c0 : memref<4096xf32>, memref<f32>) {
+    ^bb0(%arg0 : f32, %arg1 : f32):
+      %sum = arith.addf %arg0, %arg1 : f32
+      tm_tensor.yield %sum : f32
+  }
+  return
+}
+// Floating-point sums are not associative unless declared so.
+// CHECK-LABEL: func.func @scan_1d_float_sum_sequential
+// CHECK-NOT:     scf.parallel
+// CHECK:         scf.for
+// CHECK-NOT:     scf.parallel
+
 // -----
 
 func.func @scatter_update_scalar_1D(
@@ -120,7 +233,7 @@ func.func @scatter_update_scalar_1D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[C3]]) step (%[[C1]]) {
 // CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<3xi32>
 // CHECK:           %[[T2:.+]] =  memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<3x1xi32>
 // CHECK:           %[[IDX:.+]] = arith.index_cast %[[T2]] : i32 to index
@@ -147,7 +260,7 @@ func.func @scatter_add_scalar_2D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[C3]]) step (%[[C1]]) {
 // CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<3xi32>
 // CHECK:           %[[T2:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<3x2xi32>
 // CHECK:           %[[IDX1:.+]] = arith.index_cast %[[T2]] : i32 to index
@@ -178,13 +291,11 @@ func.func @scatter_update_slice_2D(
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[C2:.+]] = arith.constant 2 : index
 // CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C2]] step %[[C1]] {
-// CHECK:           scf.for %[[J:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]], %[[J:.+]]) = (%[[C0]], %[[C0]]) to (%[[C2]], %[[C3]]) step (%[[C1]], %[[C1]]) {
 // CHECK:             %[[UPDATE:.+]] = memref.load %[[UPDATES]][%[[I]], %[[J]]]
 // CHECK:             %[[INDEX:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]]
 // CHECK:             %[[LOC:.+]] = arith.index_cast %[[INDEX]] : i32 to index
 // CHECK:             memref.store %[[UPDATE]], %[[ORIGINAL]][%[[LOC]], %[[J]]]
-// CHECK:           }
 // CHECK:         }
 
 // -----
@@ -208,7 +319,7 @@ func.func @scatter_add_scalar_1D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[C3]]) step (%[[C1]]) {
 // CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<3xi32>
 // CHECK:           %[[T2:.+]] =  memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<3x1xi32>
 // CHECK:           %[[IDX:.+]] = arith.index_cast %[[T2]] : i32 to index
@@ -237,8 +348,8 @@ func.func @scatter_add_slice_2D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[C2:.+]] = arith.constant 2 : index
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C2]] step %[[C1]] {
-// CHECK:           scf.for %[[J:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
+// CHECK:         scf.parallel (%[[I:.+]], %[[J:.+]]) = (%[[C0]], %[[C0]]) to (%[[C2]], %[[C3]]) step (%[[C1]], %[[C1]]) {
 // CHECK:             %[[UPDATEVAL:.+]] = memref.load %[[UPDATES]][%[[I]], %[[J]]]
 // CHECK:             %[[INDEXVAL:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]]
 // CHECK:             %[[INDEX:.+]] = arith.index_cast %[[INDEXVAL]] : i32 to index
@@ -266,7 +377,7 @@ func.func @scatter_update_scalar_dynamic_1D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[UB:.+]] = memref.dim %[[UPDATES]], %[[C0]] : memref<?xi32>
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[UB]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[UB]]) step (%[[C1]]) {
 // CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<?xi32>
 // CHECK:           %[[T2:.+]] =  memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<?x1xi32>
 // CHECK:           %[[IDX:.+]] = arith.index_cast %[[T2]] : i32 to index
@@ -293,7 +404,7 @@ func.func @scatter_add_scalar_dynamic_2D(
 // CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[UB:.+]] = memref.dim %[[UPDATES]], %[[C0]] : memref<?xi32>
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[UB]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[UB]]) step (%[[C1]]) {
 // CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<?xi32>
 // CHECK:           %[[T2:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<?x2xi32>
 // CHECK:           %[[IDX1:.+]] = arith.index_cast %[[T2]] : i32 to index
@@ -324,8 +435,7 @@ func.func @scatter_update_slice_dynamic_2D(
 // CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
 // CHECK-DAG:     %[[UB1:.+]] = memref.dim %[[UPDATES]], %[[C0]] : memref<?x?xi32>
 // CHECK-DAG:     %[[UB2:.+]] = memref.dim %[[UPDATES]], %[[C1]] : memref<?x?xi32>
-// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[UB1]] step %[[C1]] {
-// CHECK:           scf.for %[[J:.+]] = %[[C0]] to %[[UB2]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[I:.+]], %[[J:.+]]) = (%[[C0]], %[[C0]]) to (%[[UB1]], %[[UB2]]) step (%[[C1]], %[[C1]]) {
 // CHECK:             %[[UPDATEVAL:.+]] = memref.load %[[UPDATES]][%[[I]], %[[J]]]
 // CHECK:             %[[INDEXVAL:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]]
 // CHECK:             %[[INDEX:.+]] = arith.index_cast %[[INDEXVAL]] : i32 to index
@@ -353,9 +463,7 @@ func.func @scatter_partial_slices(%arg0: memref<2x64x12xf32>, %arg1: memref<2x3x
 // CHECK-DAG:     %[[C1:.+]] = arith.constant
 // CHECK-DAG:     %[[C2:.+]] = arith.constant
 // CHECK-DAG:     %[[C12:.+]] = arith.constant
-// CHECK:         scf.for %[[ARG3:.+]] = %[[C0]] to %[[C2]] step %[[C1]] {
-// CHECK-NEXT:       scf.for %[[ARG4:.+]] = %[[C0]] to %[[C1]] step %[[C1]] {
-// CHECK-NEXT:         scf.for %[[ARG5:.+]] = %[[C0]] to %[[C12]] step %[[C1]] {
+// CHECK:         scf.parallel (%[[ARG3:.+]], %[[ARG4:.+]], %[[ARG5:.+]]) = (%[[C0]], %[[C0]], %[[C0]]) to (%[[C2]], %[[C1]], %[[C12]]) step (%[[C1]], %[[C1]], %[[C1]]) {
 // CHECK-NEXT:           %[[LOAD0:.+]] = memref.load %[[ARG1]][%[[ARG3]], %[[C0]]] : memref<2x3xi32>
 // CHECK-NEXT:           %[[CAST0:.+]] = arith.index_cast %[[LOAD0]] : i32 to index
 // CHECK-NEXT:           %[[LOAD1:.+]] = memref.load %[[ARG1]][%[[ARG3]], %[[C1]]] : memref<2x3xi32>
@@ -366,3 +474,302 @@ func.func @scatter_partial_slices(%arg0: memref<2x64x12xf32>, %arg1: memref<2x3x
 // CHECK-NEXT:           %[[ADD2:.+]] = arith.addi %[[CAST2]], %[[ARG5]] : index
 // CHECK-NEXT:           %[[LOAD3:.+]] = memref.load %[[ARG0]][%[[CAST0]], %[[ADD1]], %[[ADD2]]] : memref<2x64x12xf32>
 // CHECK-NEXT:           memref.store %[[LOAD3]], %[[ARG0]][%[[CAST0]], %[[ADD1]], %[[ADD2]]] : memref<2x64x12xf32>
+
+// -----
+
+func.func @scatter_add_slice_2D_repeated_indices(
+    %original: memref<4x3xf32>, %indices: memref<5x1xi32>,
+    %updates: memref<5x3xf32>) {
+  tm_tensor.scatter {dimension_map= array<i64: 0>} unique_indices(false)
+    ins(%updates, %indices : memref<5x3xf32>, memref<5x1xi32>)
+    outs(%original : memref<4x3xf32>)  {
+  ^bb0(%arg0: f32, %arg1: f32):  // no predecessors
+    %0 = arith.addf %arg1, %arg0 : f32
+    tm_tensor.yield %0 : f32
+  }
+  return
+}
+// CHECK-LABEL: func.func @scatter_add_slice_2D_repeated_indices
+// CHECK-SAME:    %[[ORIGINAL:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[INDICES:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[UPDATES:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
+// CHECK-DAG:     %[[C5:.+]] = arith.constant 5 : index
+// CHECK:         scf.parallel (%[[I:.+]], %[[J:.+]]) = (%[[C0]], %[[C0]]) to (%[[C5]], %[[C3]]) step (%[[C1]], %[[C1]]) {
+// CHECK:           %[[UPDATEVAL:.+]] = memref.load %[[UPDATES]][%[[I]], %[[J]]]
+// CHECK:           %[[INDEXVAL:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]]
+// CHECK:           %[[INDEX:.+]] = arith.index_cast %[[INDEXVAL]] : i32 to index
+// CHECK-NOT:       memref.load %[[ORIGINAL]]
+// CHECK:           memref.atomic_rmw addf %[[UPDATEVAL]], %[[ORIGINAL]][%[[INDEX]], %[[J]]]
+// CHECK-NOT:       memref.store
+
+// -----
+
+func.func @scatter_count_scalar_1D_repeated_indices(
+    %original: memref<8xi32>, %indices: memref<3x1xi32>,
+    %updates: memref<3xi32>) {
+  %one = arith.constant 1 : i32
+  tm_tensor.scatter {dimension_map= array<i64: 0>} unique_indices(false)
+    ins(%updates, %indices : memref<3xi32>, memref<3x1xi32>)
+    outs(%original : memref<8xi32>)  {
+  ^bb0(%arg0: i32, %arg1: i32):  // no predecessors
+    %0 = arith.addi %arg1, %one : i32
+    tm_tensor.yield %0 : i32
+  }
+  return
+}
+// CHECK-LABEL: func.func @scatter_count_scalar_1D_repeated_indices
+// CHECK-SAME:    %[[ORIGINAL:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[INDICES:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[UPDATES:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[ONE:.+]] = arith.constant 1 : i32
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
+// CHECK:         scf.parallel (%[[I:.+]]) = (%[[C0]]) to (%[[C3]])
+// CHECK:           %[[T2:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<3x1xi32>
+// CHECK:           %[[IDX:.+]] = arith.index_cast %[[T2]] : i32 to index
+// CHECK:           memref.atomic_rmw addi %[[ONE]], %[[ORIGINAL]][%[[IDX]]]
+
+// -----
+
+func.func @scatter_mul_scalar_1D_repeated_indices(
+    %original: memref<8xf32>, %indices: memref<3x1xi32>,
+    %updates: memref<3xf32>) {
+  tm_tensor.scatter {dimension_map= array<i64: 0>} unique_indices(false)
+    ins(%updates, %indices : memref<3xf32>, memref<3x1xi32>)
+    outs(%original : memref<8xf32>)  {
+  ^bb0(%arg0: f32, %arg1: f32):  // no predecessors
+    %0 = arith.mulf %arg1, %arg0 : f32
+    tm_tensor.yield %0 : f32
+  }
+  return
+}
+// CHECK-LABEL: func.func @scatter_mul_scalar_1D_repeated_indices
+// CHECK-SAME:    %[[ORIGINAL:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[INDICES:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[UPDATES:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C3:.+]] = arith.constant 3 : index
+// CHECK-NOT:     scf.parallel
+// CHECK:         scf.for %[[I:.+]] = %[[C0]] to %[[C3]] step %[[C1]] {
+// CHECK:           %[[T1:.+]] = memref.load %[[UPDATES]][%[[I]]] : memref<3xf32>
+// CHECK:           %[[T2:.+]] = memref.load %[[INDICES]][%[[I]], %[[C0]]] : memref<3x1xi32>
+// CHECK:           %[[IDX:.+]] = arith.index_cast %[[T2]] : i32 to index
+// CHECK:           %[[ORI:.+]] = memref.load %[[ORIGINAL]][%[[IDX]]] : memref<8xf32>
+// CHECK:           %[[MUL:.+]] = arith.mulf %[[ORI]], %[[T1]] : f32
+// CHECK:           memref.store %[[MUL]], %[[ORIGINAL]][%[[IDX]]]
+
+// -----
+
+func.func @sort_1d_static_small(%arg0: memref<8xi32>) {
+  tm_tensor.sort dimension(0) outs(%arg0 : memref<8xi32>) {
+  ^bb0(%arg1: i32, %arg2: i32):
+    %0 = arith.cmpi sle, %arg1, %arg2 : i32
+    tm_tensor.yield %0 : i1
+  }
+  return
+}
+// CHECK-LABEL: func.func @sort_1d_static_small
+// CHECK-SAME:    %[[BUF:[a-zA-Z0-9]+]]
+// CHECK-NOT:     memref.alloc
+// CHECK:         scf.parallel
+// CHECK:         scf.for %[[RUN:.+]] =
+// CHECK:           scf.for %[[I:.+]] =
+// CHECK:             %[[KEY:.+]] = memref.load %[[BUF]][%[[I]]]
+// CHECK:             %[[POS:.+]] = scf.while (%[[J:.+]] = %[[I]]) : (index) -> index {
+// CHECK:               %[[NOT_FIRST:.+]] = arith.cmpi ugt, %[[J]], %[[RUN]] : index
+// CHECK:               %[[PRECEDES:.+]] = scf.if %[[NOT_FIRST]] -> (i1) {
+// CHECK:                 %[[PREV:.+]] = memref.load %[[BUF]]
+// CHECK:                 arith.cmpi sle, %[[KEY]], %[[PREV]] : i32
+// CHECK:                 arith.cmpi sle, %[[PREV]], %[[KEY]] : i32
+// CHECK:               scf.condition(%[[PRECEDES]]) %[[J]] : index
+// CHECK:             memref.store %[[KEY]], %[[BUF]][%[[POS]]]
+// CHECK-NOT:     memref.dealloc
+
+// -----
+
+func.func @sort_2d_dynamic(%arg0: memref<?x?xf32>, %arg1: memref<?x?xi64>) {
+  tm_tensor.sort dimension(1) outs(%arg0, %arg1 : memref<?x?xf32>, memref<?x?xi64>) {
+  ^bb0(%arg2: f32, %arg3: f32, %arg4: i64, %arg5: i64):
+    %0 = arith.cmpf olt, %arg2, %arg3 : f32
+    tm_tensor.yield %0 : i1
+  }
+  return
+}
+// CHECK-LABEL: func.func @sort_2d_dynamic
+// CHECK-SAME:    %[[VALUES:[a-zA-Z0-9]+]]
+// CHECK-SAME:    %[[INDICES:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C16:.+]] = arith.constant 16 : index
+// CHECK:         scf.parallel (%[[ROW:.+]]) = (%[[C0]]) to (%{{.+}}) step (%[[C1]]) {
+// CHECK:             %[[SIZE:.+]] = memref.dim %[[VALUES]], %[[C1]]
+// CHECK:             %[[SCRATCH0:.+]] = memref.alloc(%[[SIZE]]) : memref<?xf32>
+// CHECK:             %[[OTHER0:.+]] = memref.alloc(%[[SIZE]]) : memref<?xf32>
+// CHECK:             %[[SCRATCH1:.+]] = memref.alloc(%[[SIZE]]) : memref<?xi64>
+// CHECK:             %[[OTHER1:.+]] = memref.alloc(%[[SIZE]]) : memref<?xi64>
+// CHECK:             scf.for %[[POS:.+]] = %[[C0]] to %[[SIZE]] step %[[C1]] {
+// CHECK:               memref.load %[[VALUES]][%[[ROW]], %[[POS]]]
+// CHECK:               memref.load %[[INDICES]][%[[ROW]], %[[POS]]]
+// CHECK:             scf.for %{{.+}} = %[[C0]] to %[[SIZE]] step %[[C16]] {
+// CHECK:             %[[SORTED:.+]]:5 = scf.while
+// CHECK:               arith.cmpi ult, %{{.+}}, %[[SIZE]] : index
+// CHECK:               scf.condition
+// CHECK:             } do {
+// CHECK:               scf.for
+// CHECK:                 scf.for
+// CHECK:                   scf.if
+// CHECK:                     arith.cmpf olt
+// CHECK:                     arith.cmpf olt
+// CHECK:                   arith.select
+// CHECK:             scf.for %[[POS2:.+]] = %[[C0]] to %[[SIZE]] step %[[C1]] {
+// CHECK:               memref.load %[[SORTED]]#1[%[[POS2]]]
+// CHECK:               memref.load %[[SORTED]]#2[%[[POS2]]]
+// CHECK:               memref.store %{{.+}}, %[[VALUES]][%[[ROW]], %[[POS2]]]
+// CHECK:               memref.store %{{.+}}, %[[INDICES]][%[[ROW]], %[[POS2]]]
+// CHECK:             memref.dealloc %[[SCRATCH0]]
+// CHECK:             memref.dealloc %[[SCRATCH1]]
+// CHECK:             memref.dealloc %[[OTHER0]]
+// CHECK:             memref.dealloc %[[OTHER1]]
+
+// -----
+
+func.func @sort_2d_dim0(%arg0: memref<?x?xf32>) {
+  tm_tensor.sort dimension(0) outs(%arg0 : memref<?x?xf32>) {
+  ^bb0(%arg1: f32, %arg2: f32):
+    %0 = arith.cmpf olt, %arg1, %arg2 : f32
+    tm_tensor.yield %0 : i1
+  }
+  return
+}
+// The single iteration along the sort dimension does not stop the columns
+// from being sorted in parallel.
+// CHECK-LABEL: func.func @sort_2d_dim0
+// CHECK-SAME:    %[[VALUES:[a-zA-Z0-9]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[COLS:.+]] = memref.dim %[[VALUES]], %[[C1]]
+// CHECK:         scf.parallel (%[[ROW:[a-zA-Z0-9_]+]], %[[COL:[a-zA-Z0-9_]+]]) = (%[[C0]], %[[C0]]) to (%[[C1]], %[[COLS]]) step (%[[C1]], %[[C1]]) {
+// CHECK:           %[[SIZE:.+]] = memref.dim %[[VALUES]], %[[C0]]
+// CHECK:           scf.for %[[POS:.+]] = %[[C0]] to %[[SIZE]] step %[[C1]] {
+// CHECK:             memref.load %[[VALUES]][%[[POS]], %[[COL]]]
+// CHECK:           scf.while
+// CHECK:           scf.for %[[POS2:.+]] = %[[C0]] to %[[SIZE]] step %[[C1]] {
+// CHECK:             memref.store %{{.+}}, %[[VALUES]][%[[POS2]], %[[COL]]]
+// CHECK-NOT:     scf.parallel
+
+// -----
+
+func.func @topk_1d_heap(%input_values: memref<64xf32>, %out_values: memref<4xf32>, %out_indices: memref<4xi32>) {
+  tm_tensor.topk
+        dimension(0)
+        ins(%input_values : memref<64xf32>)
+        outs(%out_values, %out_indices : memref<4xf32>, memref<4xi32>) {
+        ^bb0(%arg0: f32, %arg1: f32):  // no predecessors
+          %0 = arith.cmpf ogt, %arg0, %arg1 : f32
+          tm_tensor.yield %0 : i1
+        }
+  return
+}
+// CHECK-LABEL: func.func @topk_1d_heap
+// CHECK-SAME:    %[[INPUT:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[OUT_V:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[OUT_I:[a-zA-Z0-9_]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C4:.+]] = arith.constant 4 : index
+// CHECK-DAG:     %[[C64:.+]] = arith.constant 64 : index
+// CHECK-NOT:     memref.alloc
+// CHECK:         scf.parallel
+// CHECK:         scf.for
+// CHECK:           scf.while
+// CHECK:         scf.for %[[IV:.+]] = %[[C0]] to %[[C64]] step %[[C1]] {
+// CHECK:           %[[V:.+]] = memref.load %[[INPUT]][%[[IV]]]
+// CHECK:           %[[I:.+]] = arith.index_cast %[[IV]] : index to i32
+// CHECK:           %[[ROOT_V:.+]] = memref.load %[[OUT_V]][%[[C0]]]
+// CHECK:           %[[ROOT_I:.+]] = memref.load %[[OUT_I]][%[[C0]]]
+// CHECK:           arith.cmpf ogt, %[[V]], %[[ROOT_V]] : f32
+// CHECK:           arith.cmpf ogt, %[[ROOT_V]], %[[V]] : f32
+// CHECK:           arith.cmpi slt, %[[I]], %[[ROOT_I]] : i32
+// CHECK:           scf.if
+// CHECK:             memref.store %[[V]], %[[OUT_V]][%[[C0]]]
+// CHECK:             memref.store %[[I]], %[[OUT_I]][%[[C0]]]
+// CHECK:             scf.while
+// CHECK:         scf.for %{{.+}} = %[[C1]] to %[[C4]] step %[[C1]] {
+// CHECK:           scf.while
+// CHECK-NOT:     memref.dealloc
+
+// -----
+
+func.func @topk_1d_sort(%input_values: memref<8xf32>, %out_values: memref<3xf32>, %out_indices: memref<3xi32>) {
+  tm_tensor.topk
+        dimension(0)
+        ins(%input_values : memref<8xf32>)
+        outs(%out_values, %out_indices : memref<3xf32>, memref<3xi32>) {
+        ^bb0(%arg0: f32, %arg1: f32):  // no predecessors
+          %0 = arith.cmpf ogt, %arg0, %arg1 : f32
+          tm_tensor.yield %0 : i1
+        }
+  return
+}
+// CHECK-LABEL: func.func @topk_1d_sort
+// CHECK-SAME:    %[[INPUT:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[OUT_V:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[OUT_I:[a-zA-Z0-9_]+]]
+// CHECK:         scf.parallel
+// CHECK:         %[[SCRATCH_V:.+]] = memref.alloc(%{{.+}}) : memref<?xf32>
+// CHECK:         %[[OTHER_V:.+]] = memref.alloc(%{{.+}}) : memref<?xf32>
+// CHECK:         %[[SCRATCH_I:.+]] = memref.alloc(%{{.+}}) : memref<?xi32>
+// CHECK:         %[[OTHER_I:.+]] = memref.alloc(%{{.+}}) : memref<?xi32>
+// CHECK:         scf.while
+// CHECK:         memref.dealloc %[[SCRATCH_V]]
+// CHECK:         memref.dealloc %[[SCRATCH_I]]
+// CHECK:         memref.dealloc %[[OTHER_V]]
+// CHECK:         memref.dealloc %[[OTHER_I]]
+
+// -----
+
+func.func @attention_bool_mask(%query: memref<2x128x16xf32>, %key: memref<2x512x16xf32>, %value: memref<2x512x8xf32>, %mask: memref<2x128x512xi1>, %output: memref<2x128x8xf32>) {
+  tm_tensor.attention
+    ins(%query, %key, %value, %mask : memref<2x128x16xf32>, memref<2x512x16xf32>, memref<2x512x8xf32>, memref<2x128x512xi1>)
+    outs(%output : memref<2x128x8xf32>)
+  return
+}
+// CHECK-LABEL: func.func @attention_bool_mask
+// CHECK-SAME:    %[[QUERY:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[KEY:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[VALUE:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[MASK:[a-zA-Z0-9_]+]]
+// CHECK-SAME:    %[[OUTPUT:[a-zA-Z0-9_]+]]
+// CHECK-DAG:     %[[C0:.+]] = arith.constant 0 : index
+// CHECK-DAG:     %[[C1:.+]] = arith.constant 1 : index
+// CHECK-DAG:     %[[C2:.+]] = arith.constant 2 : index
+// CHECK-DAG:     %[[C64:.+]] = arith.constant 64 : index
+// CHECK-DAG:     %[[C128:.+]] = arith.constant 128 : index
+// CHECK-DAG:     %[[C512:.+]] = arith.constant 512 : index
+// CHECK:         scf.parallel (%[[B:.+]], %[[M:.+]]) = (%[[C0]], %[[C0]]) to (%[[C2]], %[[C128]]) step (%[[C1]], %[[C1]]) {
+// CHECK:           %[[SCORES:.+]] = memref.alloc() : memref<64xf32>
+// CHECK:           %[[STATS:.+]]:2 = scf.for %[[TILE:.+]] = %[[C0]] to %[[C512]] step %[[C64]]
+// CHECK:             %[[TILE_MAX:.+]] = scf.for %[[J:.+]] =
+// CHECK:               %[[KEY_IDX:.+]] = arith.addi %[[TILE]], %[[J]] : index
+// CHECK:               scf.for
+// CHECK:                 memref.load %[[QUERY]][%[[B]], %[[M]],
+// CHECK:                 memref.load %[[KEY]][%[[B]], %[[KEY_IDX]],
+// CHECK:               memref.load %[[MASK]][%[[B]], %[[M]], %[[KEY_IDX]]]
+// CHECK:               memref.store %{{.+}}, %[[SCORES]][%[[J]]]
+// CHECK:               arith.maximumf
+// CHECK:             math.exp
+// CHECK:             scf.for
+// CHECK:               math.exp
+// CHECK:             scf.for
+// CHECK:               arith.mulf
+// CHECK:             scf.for
+// CHECK:               scf.for
+// CHECK:                 memref.load %[[VALUE]][%[[B]],
+// CHECK:           arith.cmpf oeq, %[[STATS]]#1
+// CHECK:           scf.for
+// CHECK:             arith.divf %{{.+}}, %[[STATS]]#1
+// CHECK:           memref.dealloc %[[SCORES]]
@@ -0,0 +1,54 @@
+// RUN: torch-mlir-opt -torch-lower-to-backend-contract="incremental record-statistics" -split-input-file %s | FileCheck %s
+// RUN: torch-mlir-opt -pass-pipeline='builtin.module(torchdynamo-export-to-torch-backend-pipeline{incremental=true record-statistics=true})' -split-input-file %s | FileCheck %s --check-prefix=PIPELINE
+
+// The TorchDynamo export pipeline passes the options on to the pass.
+// PIPELINE: module attributes {torch.backend_contract_statistics = "[{\22functions\22:2,{{.*}}\22iteration\22:1,
+// CHECK: module attributes {torch.backend_contract_statistics = "[{\22functions\22:2,\22illegal_ops\22:0,\22iteration\22:1,{{.*}}\22skipped_functions\22:0,{{.*}}}]"}
+// CHECK-LABEL: func.func @legal(
+// CHECK:         torch.aten.tanh %{{.*}} : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+// CHECK-LABEL: func.func @refined(
+// CHECK-SAME:      -> !torch.vtensor<[2,3],f32>
+// CHECK:         torch.aten.tanh %{{.*}} : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+module {
+  func.func @legal(%arg0: !torch.vtensor<[2,3],f32>) -> !torch.vtensor<[2,3],f32> {
+    %0 = torch.aten.tanh %arg0 : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+    return %0 : !torch.vtensor<[2,3],f32>
+  }
+  func.func @refined(%arg0: !torch.vtensor<[2,3],f32>) -> !torch.vtensor {
+    %0 = torch.aten.tanh %arg0 : !torch.vtensor<[2,3],f32> -> !torch.vtensor
+    return %0 : !torch.vtensor
+  }
+}
+
+// -----
+
+// The decomposition of `aten.einsum` creates an `aten.sum.dim_IntList` of
+// unknown rank, so @reduce needs a second iteration. The functions that are
+// already legal are skipped in that iteration and put back in place.
+
+// PIPELINE: module attributes {torch.backend_contract_statistics = "[{\22functions\22:3,{{.*}}\22iteration\22:1,
+// CHECK: module attributes {torch.backend_contract_statistics = "[{\22functions\22:3,{{.*}}\22iteration\22:1,{{.*}}\22skipped_functions\22:0,{{.*}}},{\22functions\22:1,\22illegal_ops\22:0,\22iteration\22:2,{{.*}}\22skipped_functions\22:2,{{.*}}}]"}
+// CHECK-LABEL: func.func @first(
+// CHECK:         torch.aten.tanh
+// CHECK-LABEL: func.func @reduce(
+// CHECK-NOT:     torch.aten.einsum
+// CHECK:         torch.aten.sum.dim_IntList %{{.*}} : !torch.vtensor<[3,4],f32>, !torch.list<int>, !torch.bool, !torch.none -> !torch.vtensor<[3],f32>
+// CHECK-LABEL: func.func @last(
+// CHECK:         torch.aten.exp
+module {
+  func.func @first(%arg0: !torch.vtensor<[2,3],f32>) -> !torch.vtensor<[2,3],f32> {
+    %0 = torch.aten.tanh %arg0 : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+    return %0 : !torch.vtensor<[2,3],f32>
+  }
+  func.func @reduce(%arg0: !torch.vtensor<[3,4],f32>) -> !torch.vtensor<[3],f32> {
+    %0 = torch.prim.ListConstruct %arg0 : (!torch.vtensor<[3,4],f32>) -> !torch.list<vtensor>
+    %str = torch.constant.str "ij->i"
+    %none = torch.constant.none
+    %1 = torch.aten.einsum %str, %0, %none : !torch.str, !torch.list<vtensor>, !torch.none -> !torch.vtensor<[3],f32>
+    return %1 : !torch.vtensor<[3],f32>
+  }
+  func.func @last(%arg0: !torch.vtensor<[2,3],f32>) -> !torch.vtensor<[2,3],f32> {
+    %0 = torch.aten.exp %arg0 : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+    return %0 : !torch.vtensor<[2,3],f32>
+  }
+}
@@ -0,0 +1,124 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import json
+import os
+import tempfile
+
+from torch_mlir import ir
+from torch_mlir.compiler_utils import (
+    CompileProfile,
+    TorchMlirCompilerError,
+    run_pipeline_with_repro_report,
+)
+from torch_mlir.dialects import torch as torch_d
+
+
+def run(f):
+    print(f"{f.__name__}")
+    print("-" * len(f.__name__))
+    f()
+    print()
+
+
+ASM = """
+func.func @main(%arg0: !torch.tensor) -> !torch.tensor {
+  return %arg0 : !torch.tensor
+}
+"""
+
+
+def parse():
+    context = ir.Context()
+    torch_d.register_dialect(context)
+    return ir.Module.parse(ASM, context=context)
+
+
+@run
+# CHECK-LABEL: test_success_leaves_no_repro
+# CHECK: repros: 0
+def test_success_leaves_no_repro():
+    with tempfile.TemporaryDirectory() as repro_dir:
+        run_pipeline_with_repro_report(
+            parse(), "builtin.module(symbol-dce)", "success", repro_dir=repro_dir
+        )
+        print("repros:", len(os.listdir(repro_dir)))
+
+
+@run
+# CHECK-LABEL: test_failures_write_distinct_repros
+# CHECK: repros: 2
+# CHECK: original IR: True
+def test_failures_write_distinct_repros():
+    with tempfile.TemporaryDirectory() as repro_dir:
+        for _ in range(2):
+            try:
+                run_pipeline_with_repro_report(
+                    parse(),
+                    "builtin.module(torch-verify-backend-contract-no-decompositions)",
+                    "failure",
+                    repro_dir=repro_dir,
+                )
+            except TorchMlirCompilerError as e:
+                assert repro_dir in str(e)
+        repros = sorted(os.listdir(repro_dir))
+        print("repros:", len(repros))
+        with open(os.path.join(repro_dir, repros[0])) as f:
+            print("original IR:", "!torch.tensor" in f.read())
+
+
+def flatten(passes):
+    for p in passes:
+        yield p
+        yield from flatten(p["children"])
+
+
+@run
+# CHECK-LABEL: test_profile
+# CHECK: stages: 1
+# CHECK: canonicalize: count=1 ops_before=2
+# CHECK: symbol-dce: count=1 ops_before=3
+# CHECK: json round-trip: True
+def test_profile():
+    profile = CompileProfile()
+    run_pipeline_with_repro_report(
+        parse(),
+        "builtin.module(func.func(canonicalize),symbol-dce)",
+        "profiled",
+        profile=profile,
+    )
+    print("stages:", len(profile.stages))
+    for p in flatten(profile.stages[0]["passes"]):
+        if p["pass"] in ("canonicalize", "symbol-dce"):
+            print(f"{p['pass']}: count={p['count']} ops_before={p['ops_before']}")
+    print("json round-trip:", json.loads(profile.to_json()) == profile.to_dict())
+
+
+@run
+# CHECK-LABEL: test_profile_multithreaded
+# CHECK: canonicalize: nodes=1 count=8
+# CHECK: cse: nodes=1 count=8
+def test_profile_multithreaded():
+    context = ir.Context()
+    torch_d.register_dialect(context)
+    context.enable_multithreading(True)
+    module = ir.Module.parse(
+        "".join(ASM.replace("@main", f"@f{i}") for i in range(8)), context=context
+    )
+    profile = CompileProfile()
+    run_pipeline_with_repro_report(
+        module,
+        "builtin.module(func.func(canonicalize,cse))",
+        "profiled",
+        profile=profile,
+    )
+    # Passes run on the functions by the clones of the nested pipeline are
+    # recorded under the same node.
+    passes = list(flatten(profile.stages[0]["passes"]))
+    for name in ("canonicalize", "cse"):
+        nodes = [p for p in passes if p["pass"] == name]
+        print(f"{name}: nodes={len(nodes)} count={sum(p['count'] for p in nodes)}")
@@ -17,8 +17,10 @@ from torch._functorch.aot_autograd import (
     set_model_name,
 )
 
-from torch_mlir import fx
+from torch_mlir import fx, ir
 from torch_mlir.compiler_utils import run_pipeline_with_repro_report
+from torch_mlir.dialects import torch as torch_d
+from torch_mlir.extras.fx_importer import ContentLiteralCache, FxImporter
 
 
 def run(f):
@@ -230,3 +232,145 @@ def test_stack_trace():
     m = fx.export_and_import(Basic(), x, y, func_name="test_stack_trace")
     mlir_asm = m.operation.get_asm(enable_debug_info=True)
     print(mlir_asm)
+
+
+@run
+# CHECK-LABEL: test_import_frozen_non_contiguous_literal
+# CHECK:     torch.vtensor.literal(dense_resource<torch_tensor_3_2_torch.int32> : tensor<3x2xsi32>) : !torch.vtensor<[3,2],si32>
+#
+# The non-contiguous constant must be materialized in its logical (row-major)
+# element order.
+# CHECK: dialect_resources:
+# CHECK: torch_tensor_3_2_torch.int32: "0x{{[0-9A-F]+}}000000000300000001000000040000000200000005000000"
+def test_import_frozen_non_contiguous_literal():
+    class Basic(nn.Module):
+        def __init__(self):
+            super().__init__()
+            # A plain tensor attribute is lifted as a constant and frozen;
+            # registered buffers would stay function arguments.
+            self.b = torch.arange(6, dtype=torch.int32).reshape(2, 3).t()
+
+        def forward(self, x):
+            return x + self.b
+
+    m = fx.export_and_import(
+        Basic(),
+        torch.ones(3, 2, dtype=torch.int32),
+        func_name="test_import_frozen_non_contiguous_literal",
+    )
+    print(m)
+
+
+@run
+# CHECK-LABEL: test_import_frozen_content_deduplicated_literals
+# CHECK:     %[[a:.+]] = torch.vtensor.literal(dense_resource<[[BLOB:torch_tensor_3_4_torch.float32]]> : tensor<3x4xf32>)
+# CHECK:     %[[b:.+]] = torch.vtensor.literal(dense_resource<[[BLOB]]> : tensor<3x4xf32>)
+# CHECK:     hits: 1, bytes_saved: 48
+def test_import_frozen_content_deduplicated_literals():
+    class Basic(nn.Module):
+        def __init__(self):
+            super().__init__()
+            # Two distinct constants with the same contents.
+            self.a = torch.full((3, 4), 2.0)
+            self.b = torch.full((3, 4), 2.0)
+
+        def forward(self, x):
+            return x * self.a + self.b
+
+    context = ir.Context()
+    torch_d.register_dialect(context)
+    cache = ContentLiteralCache()
+    m = fx.export_and_import(
+        Basic(),
+        torch.randn(3, 4),
+        fx_importer=FxImporter(context=context, literal_cache=cache),
+        func_name="test_import_frozen_content_deduplicated_literals",
+    )
+    print(m)
+    print(f"hits: {cache.hits}, bytes_saved: {cache.bytes_saved}")
+
+
+@run
+# CHECK-LABEL: test_import_frozen_literal_cache_across_contexts
+# CHECK:     torch.vtensor.literal(dense_resource<torch_tensor_3_4_torch.float32> : tensor<3x4xf32>)
+# CHECK:     torch.vtensor.literal(dense_resource<torch_tensor_3_4_torch.float32> : tensor<3x4xf32>)
+# CHECK:     hits: 0
+def test_import_frozen_literal_cache_across_contexts():
+    class Basic(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.a = torch.full((3, 4), 2.0)
+
+        def forward(self, x):
+            return x * self.a
+
+    # Each import has its own context, so nothing can be shared between them.
+    cache = ContentLiteralCache()
+    for _ in range(2):
+        context = ir.Context()
+        torch_d.register_dialect(context)
+        m = fx.export_and_import(
+            Basic(),
+            torch.randn(3, 4),
+            fx_importer=FxImporter(context=context, literal_cache=cache),
+            func_name="test_import_frozen_literal_cache_across_contexts",
+        )
+        m.operation.verify()
+        print(m)
+    print(f"hits: {cache.hits}")
+
+
+@run
+# CHECK-LABEL: test_import_frozen_neg_view_literal
+# CHECK:     torch.vtensor.literal(dense_resource<torch_tensor_4_torch.float32> : tensor<4xf32>) : !torch.vtensor<[4],f32>
+#
+# The negative bit of the constant must be applied to the imported values.
+# CHECK: dialect_resources:
+# CHECK: torch_tensor_4_torch.float32: "0x{{[0-9A-F]+}}000080BF000000C0000040C0000080C0"
+def test_import_frozen_neg_view_literal():
+    class Basic(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.b = torch._neg_view(torch.arange(1.0, 5.0))
+
+        def forward(self, x):
+            return x + self.b
+
+    m = fx.export_and_import(
+        Basic(), torch.ones(4), func_name="test_import_frozen_neg_view_literal"
+    )
+    print(m)
+
+
+@run
+# CHECK-LABEL: test_backend_contract_statistics
+# CHECK: iterations: True
+# CHECK: keys: ['functions', 'illegal_ops', 'iteration', 'pass_times_ms', 'skipped_functions', 'time_ms']
+# CHECK: illegal_ops: 0
+# CHECK: attribute removed: True
+# CHECK: func.func @test_backend_contract_statistics
+def test_backend_contract_statistics():
+    class Basic(nn.Module):
+        def __init__(self):
+            super().__init__()
+
+        def forward(self, x):
+            return torch.tanh(x) + 1.0
+
+    statistics = []
+    m = fx.export_and_import(
+        Basic(),
+        torch.randn(3, 4),
+        output_type="torch",
+        func_name="test_backend_contract_statistics",
+        incremental_backend_contract=True,
+        backend_contract_statistics=statistics,
+    )
+    print("iterations:", len(statistics) >= 1)
+    print("keys:", sorted(statistics[0]))
+    print("illegal_ops:", statistics[-1]["illegal_ops"])
+    print(
+        "attribute removed:",
+        "torch.backend_contract_statistics" not in m.operation.attributes,
+    )
+    print(m)
@@ -0,0 +1,138 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import tempfile
+
+import torch
+import torch.nn as nn
+
+from torch_mlir import fx
+from torch_mlir.compile_cache import CompilationCache
+
+
+def run(f):
+    print(f"{f.__name__}")
+    print("-" * len(f.__name__))
+    f()
+    print()
+
+
+class Basic(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.w = nn.Parameter(torch.randn(4, 4))
+
+    def forward(self, x):
+        return torch.tanh(x) @ self.w
+
+
+@run
+# CHECK-LABEL: test_cache_hit
+# CHECK: CacheStats(hits=0, misses=1, stores=1, evictions=0)
+# CHECK: CacheStats(hits=1, misses=1, stores=1, evictions=0)
+# CHECK: identical: True
+def test_cache_hit():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompilationCache(cache_dir)
+        model = Basic()
+        x = torch.randn(3, 4)
+        m1 = fx.export_and_import(
+            model, x, output_type="linalg-on-tensors", compile_cache=cache
+        )
+        print(cache.stats)
+        m2 = fx.export_and_import(
+            model, x, output_type="linalg-on-tensors", compile_cache=cache
+        )
+        print(cache.stats)
+        print("identical:", str(m1) == str(m2))
+
+
+@run
+# CHECK-LABEL: test_cache_key_components
+# CHECK: CacheStats(hits=0, misses=4, stores=4, evictions=0)
+def test_cache_key_components():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompilationCache(cache_dir)
+        model = Basic()
+        fx.export_and_import(model, torch.randn(3, 4), compile_cache=cache)
+        # Different input shape.
+        fx.export_and_import(model, torch.randn(5, 4), compile_cache=cache)
+        # Different output type.
+        fx.export_and_import(
+            model, torch.randn(3, 4), output_type="torch", compile_cache=cache
+        )
+        # Different weights.
+        with torch.no_grad():
+            model.w.add_(1.0)
+        fx.export_and_import(model, torch.randn(3, 4), compile_cache=cache)
+        print(cache.stats)
+
+
+@run
+# CHECK-LABEL: test_cache_eviction_and_invalidation
+# CHECK: evictions_positive: True
+# CHECK: within_bound: True
+# CHECK: size_after_invalidate: 0
+def test_cache_eviction_and_invalidation():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = CompilationCache(cache_dir, max_size_bytes=1)
+        fx.export_and_import(Basic(), torch.randn(3, 4), compile_cache=cache)
+        fx.export_and_import(Basic(), torch.randn(3, 4), compile_cache=cache)
+        print("evictions_positive:", cache.stats.evictions > 0)
+        print("within_bound:", cache.size_bytes() <= cache.max_size_bytes)
+        cache.max_size_bytes = 1 << 30
+        fx.export_and_import(Basic(), torch.randn(3, 4), compile_cache=cache)
+        cache.invalidate()
+        print("size_after_invalidate:", cache.size_bytes())
+
+
+@run
+# CHECK-LABEL: test_cache_key_decomposition_function
+# CHECK: same_function: True
+# CHECK: other_function: False
+def test_cache_key_decomposition_function():
+    prog = torch.export.export(Basic(), (torch.randn(3, 4),))
+
+    def tanh_as_sigmoid(x):
+        return 2 * torch.sigmoid(2 * x) - 1
+
+    def tanh_as_exp(x):
+        return (torch.exp(2 * x) - 1) / (torch.exp(2 * x) + 1)
+
+    def key(fn):
+        return CompilationCache.make_key(
+            prog,
+            decomposition_table={torch.ops.aten.tanh.default: fn},
+            pipelines=[],
+            output_type="torch",
+        )
+
+    print("same_function:", key(tanh_as_sigmoid) == key(tanh_as_sigmoid))
+    print("other_function:", key(tanh_as_sigmoid) == key(tanh_as_exp))
+
+
+@run
+# CHECK-LABEL: test_cache_key_neg_view_constant
+# CHECK: same_values: True
+def test_cache_key_neg_view_constant():
+    class AddConstant(nn.Module):
+        def __init__(self, c):
+            super().__init__()
+            self.c = c
+
+        def forward(self, x):
+            return x + self.c
+
+    def key(c):
+        prog = torch.export.export(AddConstant(c), (torch.randn(4),))
+        return CompilationCache.make_key(
+            prog, decomposition_table=None, pipelines=[], output_type="torch"
+        )
+
+    # A negative view keys like the tensor holding the negated values.
+    neg_view = key(torch._neg_view(torch.arange(1.0, 5.0)))
+    print("same_values:", neg_view == key(-torch.arange(1.0, 5.0)))
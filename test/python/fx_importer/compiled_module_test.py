@@ -0,0 +1,124 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn as nn
+
+from torch_mlir.compiled_module import CompiledModule
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+    RefBackendLinalgOnTensorsBackend,
+)
+
+
+def run(f):
+    print(f"{f.__name__}")
+    print("-" * len(f.__name__))
+    f()
+    print()
+
+
+class Basic(nn.Module):
+    def forward(self, x):
+        return torch.tanh(x) * 2.0
+
+
+def check(compiled, x):
+    return torch.allclose(compiled(x), torch.tanh(x) * 2.0, rtol=1e-5, atol=1e-6)
+
+
+@run
+# CHECK-LABEL: test_static_shapes
+# CHECK: correct: True
+# CHECK: CacheStats(hits=1, misses=2, stores=2, evictions=0)
+def test_static_shapes():
+    compiled = CompiledModule(Basic(), RefBackendLinalgOnTensorsBackend())
+    correct = all(
+        check(compiled, x)
+        for x in [torch.randn(3, 4), torch.randn(3, 4), torch.randn(5, 4)]
+    )
+    print("correct:", correct)
+    print(compiled.stats)
+
+
+@run
+# CHECK-LABEL: test_buckets
+# CHECK: correct: True
+# CHECK: CacheStats(hits=3, misses=2, stores=2, evictions=0)
+def test_buckets():
+    compiled = CompiledModule(
+        Basic(),
+        RefBackendLinalgOnTensorsBackend(),
+        dynamic_dims={0: [0]},
+        buckets=[8, 64],
+    )
+    # 3, 5 and 8 share the first bucket; 9 and 64 the second one.
+    correct = all(check(compiled, torch.randn(n, 4)) for n in [3, 5, 8, 9, 64])
+    print("correct:", correct)
+    print(compiled.stats)
+
+
+@run
+# CHECK-LABEL: test_lru_eviction
+# CHECK: CacheStats(hits=1, misses=4, stores=4, evictions=2)
+# CHECK: entries: 2
+def test_lru_eviction():
+    compiled = CompiledModule(
+        Basic(), RefBackendLinalgOnTensorsBackend(), max_entries=2
+    )
+    # The hit on 2 makes 3 the least recently used entry when 4 comes in.
+    for n in [2, 3, 2, 4, 3]:
+        compiled(torch.randn(n))
+    print(compiled.stats)
+    print("entries:", len(compiled))
+
+
+@run
+# CHECK-LABEL: test_concurrent_compilation
+# CHECK: correct: True
+# CHECK: CacheStats(hits=3, misses=1, stores=1, evictions=0)
+def test_concurrent_compilation():
+    compiled = CompiledModule(Basic(), RefBackendLinalgOnTensorsBackend())
+    x = torch.randn(3, 4)
+    # Callers of a signature that is being compiled wait for that compilation.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: check(compiled, x), range(4)))
+    print("correct:", all(results))
+    print(compiled.stats)
+
+
+@run
+# CHECK-LABEL: test_signature
+# CHECK: sizes 2 to 4 share a bucket: True
+# CHECK: single size bucket is static: True
+# CHECK: lists: True False
+# CHECK: TypeError: CompiledModule arguments must be tensors
+def test_signature():
+    compiled = CompiledModule(
+        Basic(), RefBackendLinalgOnTensorsBackend(), dynamic_dims={0: [0]}
+    )
+    keys = {compiled._signature([torch.randn(n, 4)])[0] for n in [2, 3, 4]}
+    print("sizes 2 to 4 share a bucket:", len(keys) == 1)
+    compiled = CompiledModule(
+        Basic(),
+        RefBackendLinalgOnTensorsBackend(),
+        dynamic_dims={0: [0]},
+        buckets=[2, 8],
+    )
+    key, dynamic_shapes = compiled._signature([torch.randn(2, 4)])
+    print("single size bucket is static:", dynamic_shapes == (None,))
+    x = torch.randn(3)
+    print(
+        "lists:",
+        compiled._signature([x, [1, 2]])[0] == compiled._signature([x, [1, 2]])[0],
+        compiled._signature([x, [1, 2]])[0] == compiled._signature([x, [1, 3]])[0],
+    )
+    try:
+        compiled._signature([x, [{1, 2}]])
+    except TypeError as e:
+        print("TypeError:", e)
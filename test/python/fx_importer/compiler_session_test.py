@@ -0,0 +1,80 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn as nn
+
+from torch_mlir import fx
+from torch_mlir.compiler_session import CompilerSession
+
+
+def run(f):
+    print(f"{f.__name__}")
+    print("-" * len(f.__name__))
+    f()
+    print()
+
+
+class Basic(nn.Module):
+    def forward(self, x):
+        return torch.tanh(x) + 1.0
+
+
+@run
+# CHECK-LABEL: test_session_reuse
+# CHECK: same_context: True
+# CHECK: identical: True
+# CHECK: pooled: 2
+def test_session_reuse():
+    session = CompilerSession()
+    x = torch.randn(3, 4)
+    m1 = fx.export_and_import(
+        Basic(), x, output_type="linalg-on-tensors", session=session
+    )
+    m2 = fx.export_and_import(
+        Basic(), x, output_type="linalg-on-tensors", session=session
+    )
+    print("same_context:", m1.context is m2.context is session.context)
+    print("identical:", str(m1) == str(m2))
+    # One pass manager for each of the two lowering pipelines.
+    print("pooled:", sum(len(pms) for pms in session._idle_pass_managers.values()))
+
+
+@run
+# CHECK-LABEL: test_session_recycle
+# CHECK: recycled: True
+# CHECK: old_module_valid: True
+def test_session_recycle():
+    session = CompilerSession(recycle_after=1)
+    x = torch.randn(3, 4)
+    m1 = fx.export_and_import(Basic(), x, output_type="torch", session=session)
+    m2 = fx.export_and_import(Basic(), x, output_type="torch", session=session)
+    print("recycled:", m1.context is not m2.context)
+    print("old_module_valid:", "torch.aten.tanh" in str(m1))
+
+
+@run
+# CHECK-LABEL: test_session_concurrent
+# CHECK: identical: True
+def test_session_concurrent():
+    session = CompilerSession()
+    x = torch.randn(3, 4)
+    expected = str(fx.export_and_import(Basic(), x, output_type="linalg-on-tensors"))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        modules = list(
+            executor.map(
+                lambda _: str(
+                    fx.export_and_import(
+                        Basic(), x, output_type="linalg-on-tensors", session=session
+                    )
+                ),
+                range(8),
+            )
+        )
+    print("identical:", all(m == expected for m in modules))
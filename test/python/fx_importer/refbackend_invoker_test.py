@@ -0,0 +1,106 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from torch_mlir import fx
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import (
+    RefBackendLinalgOnTensorsBackend,
+)
+
+
+def run(f):
+    print(f"{f.__name__}")
+    print("-" * len(f.__name__))
+    f()
+    print()
+
+
+class Basic(nn.Module):
+    def forward(self, x):
+        return torch.tanh(x) * 2.0, x.sum()
+
+
+def load_basic():
+    module = fx.export_and_import(
+        Basic(), torch.randn(16, 8), output_type="linalg-on-tensors"
+    )
+    backend = RefBackendLinalgOnTensorsBackend()
+    return backend.load(backend.compile(module))
+
+
+def check(inputs, results):
+    for x, (y, s) in zip(inputs, results):
+        if not np.allclose(y, np.tanh(x) * 2.0, rtol=1e-5, atol=1e-6):
+            return False
+        if not np.allclose(s, x.sum(), rtol=1e-4):
+            return False
+    return True
+
+
+@run
+# CHECK-LABEL: test_concurrent_invoke
+# CHECK: results: 64
+# CHECK: correct: True
+def test_concurrent_invoke():
+    invoker = load_basic()
+    inputs = [np.random.rand(16, 8).astype(np.float32) for _ in range(64)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda x: invoker.main(x), inputs))
+    print("results:", len(results))
+    print("correct:", check(inputs, results))
+
+
+@run
+# CHECK-LABEL: test_invoke_batch
+# CHECK: results: 10
+# CHECK: correct: True
+def test_invoke_batch():
+    invoker = load_basic()
+    inputs = [np.random.rand(16, 8).astype(np.float32) for _ in range(10)]
+    results = invoker.invoke_batch("main", [(x,) for x in inputs])
+    print("results:", len(results))
+    print("correct:", check(inputs, results))
+
+
+@run
+# CHECK-LABEL: test_optimized_tier
+# CHECK: correct: True
+def test_optimized_tier():
+    class MatmulTanh(nn.Module):
+        def forward(self, a, b):
+            return torch.tanh(torch.mm(a, b))
+
+    a = torch.randn(37, 64)
+    b = torch.randn(64, 29)
+    module = fx.export_and_import(MatmulTanh(), a, b, output_type="linalg-on-tensors")
+    backend = RefBackendLinalgOnTensorsBackend(optimize=True, tile_size=16)
+    invoker = backend.load(backend.compile(module))
+    result = invoker.main(a.numpy(), b.numpy())
+    expected = torch.tanh(torch.mm(a, b)).numpy()
+    print("correct:", np.allclose(result, expected, rtol=1e-4, atol=1e-5))
+
+
+@run
+# CHECK-LABEL: test_invoke_tensors
+# CHECK: types: Tensor Tensor
+# CHECK: correct: True
+# CHECK: strided_correct: True
+def test_invoke_tensors():
+    invoker = load_basic()
+    x = torch.randn(16, 8)
+    y, s = invoker.invoke_tensors("main", [x])
+    print("types:", type(y).__name__, type(s).__name__)
+    print("correct:", check([x.numpy()], [(y.numpy(), s.numpy())]))
+    # A non-contiguous input is copied once before the call.
+    x_t = torch.randn(8, 16).t()
+    y_t, s_t = invoker.invoke_tensors("main", [x_t])
+    print("strided_correct:", check([x_t.numpy()], [(y_t.numpy(), s_t.numpy())]))
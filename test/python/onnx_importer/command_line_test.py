@@ -19,6 +19,8 @@ import unittest.mock
 import onnx
 
 from torch_mlir.tools.import_onnx import __main__
+from torch_mlir.dialects import torch as torch_d
+from torch_mlir.ir import Context, Module
 
 # For ONNX models
 
@@ -110,6 +112,29 @@ class CommandLineTest(unittest.TestCase):
         args = __main__.parse_arguments([str(model_file), "-o", str(mlir_file)])
         __main__.main(args)
 
+    def run_model_bytecode(self, onnx_model: onnx.ModelProto, model_name: str):
+        run_path = self.get_run_path(model_name)
+        model_file = run_path / f"{model_name}-b.onnx"
+        mlir_file = run_path / f"{model_name}-b.torch.mlirbc"
+        text_file = run_path / f"{model_name}-b.torch.mlir"
+        onnx.save(onnx_model, model_file)
+        __main__.main(
+            __main__.parse_arguments(
+                [str(model_file), "-o", str(mlir_file), "--emit-bytecode"]
+            )
+        )
+        __main__.main(__main__.parse_arguments([str(model_file), "-o", str(text_file)]))
+        # The bytecode must round-trip to the same IR as the textual output.
+        # Each module is parsed into its own context, as resource blob keys are
+        # uniqued per context.
+        modules = []
+        for contents in [mlir_file.read_bytes(), text_file.read_text()]:
+            context = Context()
+            torch_d.register_dialect(context)
+            modules.append(str(Module.parse(contents, context=context)))
+        from_bytecode, from_text = modules
+        self.assertEqual(from_bytecode, from_text)
+
     def run_model_extern(self, onnx_model: onnx.ModelProto, model_name: str):
         run_path = self.get_run_path(model_name)
         model_file = run_path / f"{model_name}-e.onnx"
@@ -141,6 +166,22 @@ class CommandLineTest(unittest.TestCase):
         )
         __main__.main(args)
 
+        # Eagerly loaded (default) and memory mapped external data must
+        # produce the same IR.
+        mmap_mlir_file = run_path / f"{model_name}-e-mmap.torch.mlir"
+        args = __main__.parse_arguments(
+            [
+                str(model_file),
+                "-o",
+                str(mmap_mlir_file),
+                "--mmap-external-data",
+                "--data-dir",
+                str(run_path),
+            ]
+        )
+        __main__.main(args)
+        self.assertEqual(mlir_file.read_text(), mmap_mlir_file.read_text())
+
     def test_all(self):
         for model_func in ALL_MODELS:
             model_name = model_func.__name__
@@ -150,6 +191,8 @@ class CommandLineTest(unittest.TestCase):
                     self.run_model_intern(model, model_name)
                 with self.subTest("External data"):
                     self.run_model_extern(model, model_name)
+                with self.subTest("Bytecode"):
+                    self.run_model_bytecode(model, model_name)
 
 
 if __name__ == "__main__":
@@ -13,7 +13,7 @@ graph = make_graph(
     name="graph",
     inputs=[],
     nodes=[],
-    outputs=[],
+    outputs=[make_tensor_value_info("bool_tensor", onnx.TensorProto.BOOL, [2, 2])],
     initializer=[
         # CHECK{LITERAL}: torch.operator "onnx.Constant"() {torch.onnx.value = dense<[[true, false], [false, true]]> : tensor<2x2xi1>} : () -> !torch.vtensor<[2,2],i1>
         make_tensor(
@@ -0,0 +1,77 @@
+# Licensed under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+
+# RUN: %PYTHON %s %t.onnx
+# RUN: %PYTHON -m torch_mlir.tools.import_onnx %t.onnx --report-unused-initializers > %t.mlir 2> %t.err
+# RUN: FileCheck %s < %t.mlir
+# RUN: FileCheck %s --check-prefix=UNUSED < %t.err
+
+# Initializers are imported on first use. One captured by a subgraph must
+# be materialized in the enclosing block ahead of the op owning the region.
+
+# CHECK-LABEL: func.func @graph
+# CHECK-NOT: dense_resource<unused>
+# CHECK: %[[B:[0-9]+]] = torch.operator "onnx.Constant"() {torch.onnx.value = dense_resource<b>
+# CHECK: torch.operator "onnx.Mul"(%arg1, %[[B]])
+# CHECK: %[[W:[0-9]+]] = torch.operator "onnx.Constant"() {torch.onnx.value = dense_resource<w>
+# CHECK: torch.operator "onnx.If"
+# CHECK: torch.operator "onnx.Add"(%arg1, %[[B]])
+# CHECK: torch.operator "onnx.Add"(%arg1, %[[W]])
+# CHECK-NOT: dense_resource<unused>
+
+# UNUSED: Unused initializer: unused
+# UNUSED-NOT: Unused initializer
+
+import numpy
+import onnx
+from onnx import numpy_helper
+from onnx.helper import make_graph, make_node, make_tensor_value_info
+
+FLOAT = onnx.TensorProto.FLOAT
+
+
+def initializer(name):
+    return numpy_helper.from_array(numpy.ones([4], dtype=numpy.float32), name=name)
+
+
+then_branch = make_graph(
+    name="then_branch",
+    inputs=[],
+    nodes=[make_node("Add", ["x", "w"], ["then_out"])],
+    outputs=[make_tensor_value_info("then_out", FLOAT, [4])],
+)
+else_branch = make_graph(
+    name="else_branch",
+    inputs=[],
+    nodes=[make_node("Add", ["x", "b"], ["else_out"])],
+    outputs=[make_tensor_value_info("else_out", FLOAT, [4])],
+)
+graph = make_graph(
+    name="graph",
+    inputs=[
+        make_tensor_value_info("cond", onnx.TensorProto.BOOL, []),
+        make_tensor_value_info("x", FLOAT, [4]),
+    ],
+    nodes=[
+        make_node("Mul", ["x", "b"], ["y"]),
+        make_node(
+            "If",
+            ["cond"],
+            ["z"],
+            then_branch=then_branch,
+            else_branch=else_branch,
+        ),
+    ],
+    outputs=[
+        make_tensor_value_info("y", FLOAT, [4]),
+        make_tensor_value_info("z", FLOAT, [4]),
+    ],
+    initializer=[initializer("unused"), initializer("b"), initializer("w")],
+)
+model = onnx.helper.make_model(graph)
+
+import sys
+
+out_file_path = sys.argv[1]
+onnx.save(model, out_file_path)